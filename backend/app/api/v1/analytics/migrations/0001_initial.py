@@ -0,0 +1,58 @@
+# Generated by Django 6.0.2 on 2026-10-17 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('catalog', '0002_stock_shards'),
+        ('orders', '0005_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('watermark', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('currency', models.CharField(max_length=8)),
+                ('status', models.CharField(choices=[('created', 'Created'), ('paid', 'Paid'), ('canceled', 'Canceled')], max_length=16)),
+                ('orders', models.PositiveIntegerField()),
+                ('units', models.BigIntegerField()),
+                ('revenue_cents', models.BigIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'bucket'], name='analytics_saleshour_product')],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'product', 'currency', 'status'), name='analytics_saleshour_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('currency', models.CharField(max_length=8)),
+                ('status', models.CharField(choices=[('created', 'Created'), ('paid', 'Paid'), ('canceled', 'Canceled')], max_length=16)),
+                ('orders', models.PositiveIntegerField()),
+                ('units', models.BigIntegerField()),
+                ('revenue_cents', models.BigIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'bucket'], name='analytics_salesminute_product')],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'product', 'currency', 'status'), name='analytics_salesminute_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from django.db import models
+
+from app.api.v1.catalog.models import Product
+from app.api.v1.orders.models import Order
+
+
+class SalesRollup(models.Model):
+    """Order lines of one bucket, product, currency and order status; rebuilt by rollups.py, never edited."""
+    bucket = models.DateTimeField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    currency = models.CharField(max_length=8)
+    status = models.CharField(max_length=16, choices=Order.Status.choices)
+    orders = models.PositiveIntegerField()
+    units = models.BigIntegerField()
+    revenue_cents = models.BigIntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class SalesMinute(SalesRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "product", "currency", "status"],
+                name="analytics_salesminute_key",
+            ),
+        ]
+        indexes = [models.Index(fields=["product", "bucket"], name="analytics_salesminute_product")]
+
+    def __str__(self) -> str:
+        return f"SalesMinute(bucket={self.bucket}, product={self.product_id}, status={self.status})"
+
+
+class SalesHour(SalesRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "product", "currency", "status"],
+                name="analytics_saleshour_key",
+            ),
+        ]
+        indexes = [models.Index(fields=["product", "bucket"], name="analytics_saleshour_product")]
+
+    def __str__(self) -> str:
+        return f"SalesHour(bucket={self.bucket}, product={self.product_id}, status={self.status})"
+
+
+class RollupWatermark(models.Model):
+    """Orders written (Order.updated_at) before `watermark` are in the rollups named `name`."""
+    name = models.CharField(max_length=64, primary_key=True)
+    watermark = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"RollupWatermark(name={self.name}, watermark={self.watermark})"
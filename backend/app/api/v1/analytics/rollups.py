@@ -0,0 +1,183 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+
+from app.api.v1.analytics.models import RollupWatermark, SalesHour, SalesMinute, SalesRollup
+from app.api.v1.orders.models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+_WATERMARK = "sales"
+# incremental runs take it exclusively (and skip when busy), backfill workers share it
+_LOCK_KEY = 7_400_251
+_STATUSES = [value for value, _ in Order.Status.choices]
+
+# Bucket ranges are passed as two arrays (lo, hi) and must not overlap.
+_DELETE = """
+DELETE FROM {table} AS rollup
+USING unnest(%s::timestamptz[], %s::timestamptz[]) AS r(lo, hi)
+WHERE rollup.bucket >= r.lo AND rollup.bucket < r.hi
+"""
+
+_ROLL_UP_MINUTES = f"""
+INSERT INTO {SalesMinute._meta.db_table} (bucket, product_id, currency, status, orders, units, revenue_cents)
+SELECT date_trunc('minute', o.created_at), i.product_id, o.currency, o.status,
+       count(DISTINCT o.id), sum(i.qty), sum(i.qty::bigint * i.price_cents)
+FROM unnest(%s::timestamptz[], %s::timestamptz[]) AS r(lo, hi)
+JOIN {Order._meta.db_table} AS o
+    ON o.status = ANY(%s) AND o.created_at >= r.lo AND o.created_at < r.hi
+JOIN {OrderItem._meta.db_table} AS i ON i.order_id = o.id
+GROUP BY 1, 2, 3, 4
+"""
+
+# hours come from the minute rollup only, the order tables are read once per change;
+# an order sits in one minute, so its per-product counts add up
+_ROLL_UP_HOURS = f"""
+INSERT INTO {SalesHour._meta.db_table} (bucket, product_id, currency, status, orders, units, revenue_cents)
+SELECT date_trunc('hour', m.bucket), m.product_id, m.currency, m.status,
+       sum(m.orders), sum(m.units), sum(m.revenue_cents)
+FROM unnest(%s::timestamptz[], %s::timestamptz[]) AS r(lo, hi)
+JOIN {SalesMinute._meta.db_table} AS m ON m.bucket >= r.lo AND m.bucket < r.hi
+GROUP BY 1, 2, 3, 4
+"""
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _ranges(starts: Iterable[datetime], size: timedelta) -> List[List[datetime]]:
+    starts = sorted(set(starts))
+    return [starts, [start + size for start in starts]]
+
+
+def _rebuild(cursor, minutes: List[List[datetime]], hours: List[List[datetime]]) -> Tuple[int, int]:
+    """Replaces the minute rows of `minutes` from the order tables, then the hour rows of `hours` from them."""
+    cursor.execute(_DELETE.format(table=SalesMinute._meta.db_table), minutes)
+    # the status list lets the (status, created_at) index serve the created_at ranges
+    cursor.execute(_ROLL_UP_MINUTES, [*minutes, _STATUSES])
+    minute_rows = cursor.rowcount
+    cursor.execute(_DELETE.format(table=SalesHour._meta.db_table), hours)
+    cursor.execute(_ROLL_UP_HOURS, hours)
+    return minute_rows, cursor.rowcount
+
+
+# ---- Incremental ----
+def roll_up_sales() -> Dict[str, int]:
+    """
+    Recomputes the minutes holding an order written (created or moved to another
+    status) since the watermark, and their hours. The scan starts
+    ANALYTICS_ROLLUP_OVERLAP_SECONDS before the watermark, for transactions
+    that committed after a run had passed their timestamp. One transaction per
+    run, so readers see the rollups before or after it, never half of it.
+    """
+    stats = {"minutes": 0, "hours": 0, "minute_rows": 0, "hour_rows": 0}
+    started = timezone.now()
+    _, created = RollupWatermark.objects.get_or_create(name=_WATERMARK, defaults={"watermark": started})
+    if created:
+        logger.info("Sales rollups start at %s, run rollup_sales to backfill earlier orders", started)
+        return stats
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [_LOCK_KEY])
+        if not cursor.fetchone()[0]:
+            # another run or a backfill is at it
+            return stats
+        state = RollupWatermark.objects.select_for_update().get(name=_WATERMARK)
+        since = state.watermark - timedelta(seconds=settings.ANALYTICS_ROLLUP_OVERLAP_SECONDS)
+        minutes = set(
+            Order.objects
+            .filter(updated_at__gte=since)
+            .annotate(minute=TruncMinute("created_at", tzinfo=dt_timezone.utc))
+            .values_list("minute", flat=True)
+            .distinct()
+        )
+        if minutes:
+            hours = {floor_hour(minute) for minute in minutes}
+            stats["minute_rows"], stats["hour_rows"] = _rebuild(cursor, _ranges(minutes, MINUTE), _ranges(hours, HOUR))
+            stats["minutes"], stats["hours"] = len(minutes), len(hours)
+        state.watermark = started
+        state.save(update_fields=["watermark"])
+    return stats
+
+
+# ---- Backfill ----
+def rebuild_range(start: datetime, end: datetime) -> Dict[str, int]:
+    """
+    Recomputes both rollups over [start, end), hour-aligned, in one transaction.
+    Backfill workers on disjoint ranges run side by side, incremental runs
+    wait until they are done.
+    """
+    if floor_hour(start) != start or floor_hour(end) != end or end <= start:
+        raise ValueError("Backfill ranges must be whole, non-empty hours.")
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock_shared(%s)", [_LOCK_KEY])
+        minute_rows, hour_rows = _rebuild(cursor, [[start], [end]], [[start], [end]])
+    return {"minute_rows": minute_rows, "hour_rows": hour_rows}
+
+
+def ensure_watermark(moment: datetime) -> None:
+    """Starts incremental runs at `moment` unless they already run; a backfill covers what is before it."""
+    RollupWatermark.objects.get_or_create(name=_WATERMARK, defaults={"watermark": moment})
+
+
+# ---- Reads ----
+def _model(granularity: str) -> Tuple[Type[SalesRollup], timedelta]:
+    if granularity == "minute":
+        return SalesMinute, MINUTE
+    if granularity == "hour":
+        return SalesHour, HOUR
+    raise ValueError(f"Unknown granularity {granularity}.")
+
+
+def sales_series(
+        granularity: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+        product_id: Optional[int] = None,
+        status: Optional[str] = None,
+        currency: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Units, orders and revenue per bucket, currency and status over [since, until), summed over products."""
+    model, size = _model(granularity)
+    until = until or timezone.now()
+    if until <= since or (until - since) / size > settings.ANALYTICS_MAX_POINTS:
+        raise ValueError(f"Range must hold between 1 and {settings.ANALYTICS_MAX_POINTS} {granularity}s.")
+    qs = model.objects.filter(bucket__gte=since, bucket__lt=until)
+    if product_id is not None:
+        qs = qs.filter(product_id=product_id)
+    if status is not None:
+        qs = qs.filter(status=status)
+    if currency is not None:
+        qs = qs.filter(currency=currency)
+    return list(
+        qs.values("bucket", "currency", "status")
+        .annotate(total_orders=Sum("orders"), total_units=Sum("units"), total_revenue=Sum("revenue_cents"))
+        .order_by("bucket", "currency", "status")
+    )
+
+
+def top_products(
+        since: datetime,
+        until: Optional[datetime] = None,
+        status: str = Order.Status.PAID,
+        limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """Products by revenue over the whole hours in [since, until), from the hour rollup."""
+    until = until or timezone.now()
+    return list(
+        SalesHour.objects
+        .filter(bucket__gte=since, bucket__lt=until, status=status)
+        .values("product_id", "currency")
+        .annotate(total_orders=Sum("orders"), total_units=Sum("units"), total_revenue=Sum("revenue_cents"))
+        .order_by("-total_revenue", "product_id")[:limit]
+    )
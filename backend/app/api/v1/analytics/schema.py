@@ -0,0 +1,122 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, NewType, Optional
+
+import strawberry
+from asgiref.sync import sync_to_async
+from graphql import GraphQLError
+from strawberry.types import Info
+
+from app.api.v1.analytics import rollups
+from app.api.v1.catalog.schema import ProductType
+from app.api.v1.common.pagination import clamp_page_size
+from app.api.v1.orders.schema import OrderStatusEnum
+
+# revenue sums overflow GraphQL's 32-bit Int
+BigInt = strawberry.scalar(
+    NewType("BigInt", int),
+    serialize=int,
+    parse_value=int,
+    description="Integer beyond the 32-bit range of Int.",
+)
+
+
+# ---- Enums ----
+@strawberry.enum
+class GranularityEnum(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+
+
+# ---- Types ----
+@strawberry.type
+class SalesPointType:
+    bucket: datetime
+    currency: str
+    status: OrderStatusEnum
+    # summed over products, an order counts once per product it holds
+    orders: int
+    units: BigInt
+    revenue_cents: BigInt
+
+
+@strawberry.type
+class ProductSalesType:
+    product_id: int
+    currency: str
+    orders: int
+    units: BigInt
+    revenue_cents: BigInt
+
+    @strawberry.field
+    async def product(self, info: Info) -> Optional[ProductType]:
+        return await info.context.loaders.product.load(self.product_id)
+
+
+async def _require_staff(info: Info) -> None:
+    user = await info.context.request.auser()
+    if not user.is_staff:
+        raise GraphQLError("Not allowed to read sales analytics.")
+
+
+# ---- Query ----
+@strawberry.type
+class AnalyticsQuery:
+    # both read the SalesMinute / SalesHour rollups only, never Order or OrderItem
+
+    @strawberry.field
+    async def sales_series(
+            self,
+            info: Info,
+            granularity: GranularityEnum,
+            since: datetime,
+            until: Optional[datetime] = None,
+            product_id: Optional[int] = None,
+            status: Optional[OrderStatusEnum] = None,
+            currency: Optional[str] = None,
+    ) -> List[SalesPointType]:
+        await _require_staff(info)
+        try:
+            rows = await sync_to_async(rollups.sales_series)(
+                granularity.value,
+                since,
+                until,
+                product_id=product_id,
+                status=status.value if status else None,
+                currency=currency,
+            )
+        except ValueError as exc:
+            raise GraphQLError(str(exc)) from exc
+        return [
+            SalesPointType(
+                bucket=row["bucket"],
+                currency=row["currency"],
+                status=OrderStatusEnum(row["status"]),
+                orders=row["total_orders"],
+                units=row["total_units"],
+                revenue_cents=row["total_revenue"],
+            )
+            for row in rows
+        ]
+
+    @strawberry.field
+    async def top_products(
+            self,
+            info: Info,
+            since: datetime,
+            until: Optional[datetime] = None,
+            status: OrderStatusEnum = OrderStatusEnum.PAID,
+            limit: int = 10,
+    ) -> List[ProductSalesType]:
+        await _require_staff(info)
+        rows = await sync_to_async(rollups.top_products)(since, until, status.value, clamp_page_size(limit))
+        return [
+            ProductSalesType(
+                product_id=row["product_id"],
+                currency=row["currency"],
+                orders=row["total_orders"],
+                units=row["total_units"],
+                revenue_cents=row["total_revenue"],
+            )
+            for row in rows
+        ]
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from app.api.v1.analytics.rollups import roll_up_sales
+
+
+@shared_task(name="analytics.roll_up_sales")
+def roll_up_sales_task() -> dict:
+    return roll_up_sales()
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class V1CatalogConfig(AppConfig):
     big_auto_field = "django.db.models.BigAutoField"
     name = "app.api.v1.catalog"
+
+    def ready(self) -> None:
+        # registers outbox handlers that invalidate the catalog cache and push stock levels
+        from app.api.v1.catalog import cache, live  # noqa: F401
+        from app.core.logging import install_sql_instrumentation
+
+        # SQL timing for GraphQL tracing, idle unless an operation is being traced
+        install_sql_instrumentation()
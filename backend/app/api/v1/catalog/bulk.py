@@ -0,0 +1,272 @@
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from app.api.v1.catalog.cache import invalidate_products, shard_totals
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.catalog.services import set_stock_levels
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+COLUMNS = ("sku", "title", "price_cents", "currency", "is_active", "available")
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+_FALSE = {"0", "false", "f", "no", "n"}
+
+_STAGING = "catalog_import_staging"
+# price_cents and available are integer columns, a larger value would fail the whole chunk's COPY
+_INT_MAX = 2 ** 31 - 1
+
+# The staging table lives for one chunk transaction, so pooled connections never keep it.
+_CREATE_STAGING = f"""
+CREATE TEMP TABLE {_STAGING} (
+    line bigint,
+    sku text,
+    title text,
+    price_cents integer,
+    currency text,
+    is_active boolean,
+    available integer
+) ON COMMIT DROP
+"""
+
+# One statement per chunk: last line wins for a SKU repeated in the chunk, products
+# are upserted by sku, Stock rows are created for new products and overwritten where
+# the feed has a level. Sharded stocks keep their rows, the caller spreads the level.
+_UPSERT = f"""
+WITH staged AS (
+    SELECT DISTINCT ON (sku) * FROM {_STAGING} ORDER BY sku, line DESC
+), products AS (
+    INSERT INTO {Product._meta.db_table} (sku, title, price_cents, currency, is_active)
+    SELECT sku, title, price_cents, currency, is_active FROM staged
+    ON CONFLICT (sku) DO UPDATE SET
+        title = EXCLUDED.title,
+        price_cents = EXCLUDED.price_cents,
+        currency = EXCLUDED.currency,
+        is_active = EXCLUDED.is_active
+    RETURNING id, sku, (xmax = 0) AS inserted
+), stocks AS (
+    INSERT INTO {Stock._meta.db_table} AS stock (product_id, available, shards)
+    SELECT products.id, COALESCE(staged.available, 0), 0
+    FROM products JOIN staged USING (sku)
+    WHERE staged.available IS NOT NULL OR products.inserted
+    ON CONFLICT (product_id) DO UPDATE SET available = EXCLUDED.available
+    WHERE stock.shards = 0
+    RETURNING product_id
+)
+SELECT products.id, products.sku, products.inserted, staged.available, COALESCE(stock.shards, 0)
+FROM products
+JOIN staged USING (sku)
+LEFT JOIN {Stock._meta.db_table} AS stock ON stock.product_id = products.id
+"""
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_s(self) -> float:
+        return round(self.rows / self.seconds, 1) if self.seconds else 0.0
+
+
+def format_for(path: str) -> str:
+    """csv or jsonl from the file extension, jsonl for stdin/stdout ('-')."""
+    if path == "-":
+        return "jsonl"
+    suffix = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    if suffix in ("json", "ndjson"):
+        suffix = "jsonl"
+    if suffix not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}, pass --format.")
+    return suffix
+
+
+# ---- Reading ----
+def _to_bool(value: Any, line: int) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ImportRowError(line, f"is_active must be a boolean, got {value!r}")
+
+
+def _to_int(value: Any, name: str, line: int) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(line, f"{name} must be an integer, got {value!r}") from None
+    if not 0 <= number <= _INT_MAX:
+        raise ImportRowError(line, f"{name} must be between 0 and {_INT_MAX}")
+    return number
+
+
+def normalize_row(raw: Optional[Dict[str, Any]], line: int) -> Tuple:
+    """Feed record -> staging row (line, sku, title, price_cents, currency, is_active, available)."""
+    if raw is None:
+        raise ImportRowError(line, "not a JSON object")
+    sku = str(raw.get("sku") or "").strip()
+    if not sku or len(sku) > Product._meta.get_field("sku").max_length:
+        raise ImportRowError(line, "sku is missing or too long")
+    title = str(raw.get("title") or "").strip()
+    if not title:
+        raise ImportRowError(line, "title is missing")
+    available = raw.get("available")
+    is_active = raw.get("is_active")
+    return (
+        line,
+        sku,
+        title[:Product._meta.get_field("title").max_length],
+        _to_int(raw.get("price_cents"), "price_cents", line),
+        str(raw.get("currency") or "EUR").strip().upper()[:Product._meta.get_field("currency").max_length],
+        _to_bool(is_active, line) if is_active not in (None, "") else True,
+        _to_int(available, "available", line) if available not in (None, "") else None,
+    )
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Yields (line number, record) one at a time, the file is never held in
+    memory. Undecodable JSONL lines come out as None and are rejected later.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError:
+            record = None
+        yield line, record if isinstance(record, dict) else None
+
+
+def _chunks(
+        records: Iterable[Tuple[int, Optional[Dict[str, Any]]]],
+        size: int,
+        stats: ImportStats,
+) -> Iterator[List[Tuple]]:
+    chunk: List[Tuple] = []
+    for line, record in records:
+        try:
+            chunk.append(normalize_row(record, line))
+        except ImportRowError as exc:
+            stats.rejected += 1
+            logger.warning("Rejected catalog row, %s", exc)
+            continue
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---- Import ----
+def upsert_chunk(rows: List[Tuple], mirror: bool = True) -> Tuple[int, int]:
+    """
+    Upserts staging rows (see normalize_row) in one transaction and returns
+    (created, updated). `mirror` pushes stock levels to shards and live
+    counters and drops cached payloads; seeding a fresh catalog skips it.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(_CREATE_STAGING)
+        with cursor.copy(f"COPY {_STAGING} (line, {', '.join(COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+        cursor.execute(_UPSERT)
+        upserted = cursor.fetchall()
+
+        if mirror:
+            levels = {pid: available for pid, _, _, available, _ in upserted if available is not None}
+            sharded = [pid for pid, _, _, available, shards in upserted if shards and available is not None]
+            set_stock_levels(levels, sharded=sharded)
+            invalidate_products([sku for _, sku, _, _, _ in upserted])
+
+    created = sum(1 for _, _, inserted, _, _ in upserted if inserted)
+    return created, len(upserted) - created
+
+
+def import_catalog(
+        records: Iterable[Tuple[int, Optional[Dict[str, Any]]]],
+        chunk_size: int,
+        stats: Optional[ImportStats] = None,
+) -> Iterator[ImportStats]:
+    """
+    Upserts feed records chunk by chunk and yields the running stats after each
+    one. Per chunk: one COPY into a temp staging table and one upsert statement
+    for Product and Stock, in its own transaction, so memory and transaction
+    size depend on `chunk_size` only.
+    """
+    stats = stats or ImportStats()
+    started = time.perf_counter()
+    for rows in _chunks(records, chunk_size, stats):
+        created, updated = upsert_chunk(rows)
+        stats.rows += len(rows)
+        stats.created += created
+        stats.updated += updated
+        stats.seconds = time.perf_counter() - started
+        yield stats
+
+
+# ---- Export ----
+def iter_catalog(chunk_size: int) -> Iterator[Dict[str, Any]]:
+    """Every product with its stock level (shard sum for sharded SKUs), keyset-paged on id."""
+    last_id = 0
+    while True:
+        rows = list(
+            Product.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list(
+                "id", "sku", "title", "price_cents", "currency", "is_active", "stock__available", "stock__shards"
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        totals = shard_totals([row[0] for row in rows if row[7]])
+        for product_id, sku, title, price_cents, currency, is_active, available, _ in rows:
+            yield {
+                "sku": sku,
+                "title": title,
+                "price_cents": price_cents,
+                "currency": currency,
+                "is_active": is_active,
+                "available": totals.get(product_id, available),
+            }
+        last_id = rows[-1][0]
+
+
+def write_records(records: Iterable[Dict[str, Any]], stream: IO[str], fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({**record, "available": "" if record["available"] is None else record["available"]})
+            count += 1
+        return count
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
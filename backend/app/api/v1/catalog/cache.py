@@ -0,0 +1,362 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from app.api.v1.catalog.models import Product, Stock, StockShard
+from app.api.v1.common.outbox import register_handler
+from app.api.v1.common.redis import get_redis
+from app.api.v1.common.stats import BatchedCounters, read_counters
+from app.core.db import primary_reads
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_KEY_PREFIX = "catalog:product:"
+PAGE_KEY_PREFIX = "catalog:page:"
+PAGE_GENERATION_KEY = "catalog:page:gen"
+# product id -> page keys holding it, so a stock change drops only those pages
+PAGE_INDEX_KEY_PREFIX = "catalog:page-index:"
+STATS_KEY = "catalog:cache:stats"
+SHARD_COUNT_KEY_PREFIX = "catalog:shards:"
+SHARD_LEVEL_KEY_PREFIX = "catalog:shard-level:"
+
+_PRODUCT_FIELDS = ("id", "sku", "title", "price_cents", "currency", "is_active")
+_NOT_FOUND = {"missing": True}
+
+
+class _LocalLRU:
+    """Process-local tier, bounded by size and a short TTL since peers cannot invalidate it."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class CatalogCache:
+    """
+    Read-through cache of ProductType payloads keyed by sku and by products page:
+    an in-process LRU in front of Redis, then Postgres. Only one loader per key
+    runs at a time, in this process (Event) and across processes (Redis lock).
+    """
+
+    def __init__(self) -> None:
+        self.local = _LocalLRU(settings.CATALOG_CACHE_LOCAL_SIZE, settings.CATALOG_CACHE_LOCAL_TTL)
+        self.stats = BatchedCounters(STATS_KEY)
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+
+    def get(self, key: str, load: Callable[[], Any], index: bool = False) -> Any:
+        """`index`: the value is a page of product payloads, recorded per product for invalidate_stock."""
+        value = self.local.get(key)
+        if value is not None:
+            self.stats.incr("local_hits")
+            return value
+
+        raw = get_redis().get(key)
+        if raw is not None:
+            self.stats.incr("redis_hits")
+            value = json.loads(raw)
+            self.local.set(key, value)
+            return value
+
+        self.stats.incr("misses")
+        return self._load_once(key, load, index)
+
+    def _load_once(self, key: str, load: Callable[[], Any], index: bool) -> Any:
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            event.wait(settings.CATALOG_CACHE_LOCK_SECONDS)
+            value = self.local.get(key)
+            if value is not None:
+                return value
+            return self._fill(key, load, index)
+
+        try:
+            return self._fill(key, load, index)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _fill(self, key: str, load: Callable[[], Any], index: bool) -> Any:
+        client = get_redis()
+        lock_key = f"{key}:lock"
+        lock_ms = int(settings.CATALOG_CACHE_LOCK_SECONDS * 1000)
+        if not client.set(lock_key, 1, nx=True, px=lock_ms):
+            # another process is loading this key, wait for its result
+            deadline = time.monotonic() + settings.CATALOG_CACHE_LOCK_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                raw = client.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    self.local.set(key, value)
+                    return value
+            self.stats.incr("lock_timeouts")
+
+        try:
+            # a lagging replica could refill a payload the last invalidation just dropped
+            with primary_reads():
+                value = load()
+            pipe = client.pipeline(transaction=False)
+            pipe.set(key, json.dumps(value), ex=settings.CATALOG_CACHE_TTL)
+            if index:
+                for payload in value:
+                    pipe.sadd(page_index_key(payload["id"]), key)
+                    pipe.expire(page_index_key(payload["id"]), settings.CATALOG_CACHE_TTL)
+            pipe.execute()
+            self.local.set(key, value)
+            return value
+        finally:
+            client.delete(lock_key)
+
+    def page_generation(self) -> int:
+        generation = self.local.get(PAGE_GENERATION_KEY)
+        if generation is None:
+            generation = int(get_redis().get(PAGE_GENERATION_KEY) or 0)
+            self.local.set(PAGE_GENERATION_KEY, generation)
+        return generation
+
+    def invalidate_pages(self) -> None:
+        get_redis().incr(PAGE_GENERATION_KEY)
+        self.local.delete([PAGE_GENERATION_KEY])
+
+    def invalidate_stock(self, product_ids: Iterable[int], skus: Iterable[str]) -> None:
+        """
+        Drops the payloads of `skus` and the pages holding `product_ids`, for
+        changes that only move stock: no page gains or loses a product, so the
+        other pages and the page generation stay.
+        """
+        index_keys = [page_index_key(product_id) for product_id in product_ids]
+        if not index_keys:
+            return
+        client = get_redis()
+        keys = [product_key(sku) for sku in skus] + sorted(client.sunion(index_keys))
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(*index_keys)
+        if keys:
+            pipe.delete(*keys)
+        pipe.execute()
+        self.local.delete(keys)
+
+    def invalidate(self, skus: Iterable[str]) -> None:
+        keys = [product_key(sku) for sku in skus]
+        if not keys:
+            return
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.incr(PAGE_GENERATION_KEY)
+        pipe.execute()
+        self.local.delete(keys + [PAGE_GENERATION_KEY])
+
+
+@lru_cache(maxsize=1)
+def get_catalog_cache() -> CatalogCache:
+    return CatalogCache()
+
+
+def product_key(sku: str) -> str:
+    return f"{PRODUCT_KEY_PREFIX}{sku}"
+
+
+def page_index_key(product_id: int) -> str:
+    return f"{PAGE_INDEX_KEY_PREFIX}{product_id}"
+
+
+# ---- Payloads ----
+def _to_payload(product: Product) -> Dict[str, Any]:
+    payload = {name: getattr(product, name) for name in _PRODUCT_FIELDS}
+    stock = getattr(product, "stock", None)
+    payload["stock"] = {"id": stock.id, "available": stock.available} if stock is not None else None
+    return payload
+
+
+def _from_payload(payload: Dict[str, Any]) -> Product:
+    product = Product(**{name: payload[name] for name in _PRODUCT_FIELDS})
+    product._state.adding = False
+    stock = None
+    if payload["stock"] is not None:
+        stock = Stock(id=payload["stock"]["id"], product_id=product.id, available=payload["stock"]["available"])
+        stock._state.adding = False
+        stock._state.fields_cache["product"] = product
+    # the type resolvers read these caches before falling back to a loader
+    product._state.fields_cache["stock"] = stock
+    return product
+
+
+# ---- Read-through ----
+def get_product(sku: str) -> Optional[Product]:
+    def load() -> Dict[str, Any]:
+        product = Product.objects.select_related("stock").filter(sku=sku).first()
+        if product is None:
+            return _NOT_FOUND
+        apply_shard_levels([getattr(product, "stock", None)])
+        return _to_payload(product)
+
+    payload = get_catalog_cache().get(product_key(sku), load)
+    return None if payload == _NOT_FOUND else _from_payload(payload)
+
+
+def get_products_page(
+        is_active: Optional[bool],
+        limit: int,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+) -> List[Product]:
+    """Offset page, or a keyset page seeking past `after_id` when it is given."""
+    cache = get_catalog_cache()
+    key = f"{PAGE_KEY_PREFIX}{cache.page_generation()}:{is_active}:{limit}:{offset}:{after_id}"
+
+    def load() -> List[Dict[str, Any]]:
+        qs = Product.objects.select_related("stock").all().order_by("id")
+        if is_active is not None:
+            qs = qs.filter(is_active=is_active)
+        if after_id is not None:
+            qs = qs.filter(id__gt=after_id)
+        products = list(qs[offset: offset + limit])
+        apply_shard_levels(getattr(product, "stock", None) for product in products)
+        return [_to_payload(product) for product in products]
+
+    return [_from_payload(payload) for payload in cache.get(key, load, index=True)]
+
+
+# ---- Sharded stock ----
+def _read_local(prefix: str, product_ids: Iterable[int]) -> Tuple[Dict[int, int], List[int]]:
+    local = get_catalog_cache().local
+    found: Dict[int, int] = {}
+    missing: List[int] = []
+    for product_id in product_ids:
+        value = local.get(f"{prefix}{product_id}")
+        if value is None:
+            missing.append(product_id)
+        else:
+            found[product_id] = value
+    return found, missing
+
+
+def shard_counts(product_ids: Iterable[int]) -> Dict[int, int]:
+    """product_id -> Stock.shards (0 when not sharded), held in the local tier for LOCAL_TTL."""
+    counts, missing = _read_local(SHARD_COUNT_KEY_PREFIX, product_ids)
+    if missing:
+        found = dict(Stock.objects.filter(product_id__in=missing).values_list("product_id", "shards"))
+        local = get_catalog_cache().local
+        for product_id in missing:
+            counts[product_id] = found.get(product_id, 0)
+            local.set(f"{SHARD_COUNT_KEY_PREFIX}{product_id}", counts[product_id])
+    return counts
+
+
+def shard_totals(product_ids: Iterable[int]) -> Dict[int, int]:
+    """Live sum of the shards per product, products without shards are left out."""
+    return dict(
+        StockShard.objects.filter(product_id__in=list(product_ids))
+        .values("product_id")
+        .annotate(total=Sum("available"))
+        .values_list("product_id", "total")
+    )
+
+
+def apply_shard_levels(stocks: Iterable[Optional[Stock]]) -> None:
+    """
+    Reports the shard sum as `available` on sharded Stock rows. The sum is kept
+    in the local tier for LOCAL_TTL, so a hot SKU costs one aggregate query per
+    process and interval however often it is read.
+    """
+    sharded = [stock for stock in stocks if stock is not None and stock.shards]
+    if not sharded:
+        return
+    levels, missing = _read_local(SHARD_LEVEL_KEY_PREFIX, {stock.product_id for stock in sharded})
+    if missing:
+        totals = shard_totals(missing)
+        local = get_catalog_cache().local
+        for product_id, total in totals.items():
+            levels[product_id] = total
+            local.set(f"{SHARD_LEVEL_KEY_PREFIX}{product_id}", total)
+    for stock in sharded:
+        # unsharded since the row was read, its own column is current
+        if stock.product_id in levels:
+            stock.available = levels[stock.product_id]
+
+
+def forget_shards(product_ids: Iterable[int]) -> None:
+    """Drops this process's cached layout and sums, peers pick up a reshard within LOCAL_TTL."""
+    keys = []
+    for product_id in product_ids:
+        keys += [f"{SHARD_COUNT_KEY_PREFIX}{product_id}", f"{SHARD_LEVEL_KEY_PREFIX}{product_id}"]
+    get_catalog_cache().local.delete(keys)
+
+
+# ---- Invalidation ----
+def invalidate_products(skus: Iterable[str]) -> None:
+    """Drops cached payloads once the surrounding transaction commits."""
+    skus = list(skus)
+    transaction.on_commit(lambda: get_catalog_cache().invalidate(skus))
+
+
+def invalidate_stock(product_ids: Iterable[int]) -> None:
+    """Drops the payloads and pages of products whose stock moved, once the surrounding transaction commits."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    skus = list(Product.objects.filter(id__in=product_ids).values_list("sku", flat=True))
+    transaction.on_commit(lambda: get_catalog_cache().invalidate_stock(product_ids, skus))
+
+
+def cache_stats() -> Dict[str, int]:
+    return {field: int(value) for field, value in read_counters(STATS_KEY).items()}
+
+
+@register_handler("catalog.product_changed")
+def _invalidate_from_events(payloads: List[Dict[str, Any]]) -> None:
+    # a product edit can move it between pages (is_active filter), every page goes
+    product_ids = {pid for payload in payloads for pid in payload.get("product_ids", [])}
+    if product_ids:
+        skus = Product.objects.filter(id__in=product_ids).values_list("sku", flat=True)
+        get_catalog_cache().invalidate(skus)
+
+
+@register_handler("order.created")
+@register_handler("order.status_changed")
+@register_handler("reservation.placed")
+@register_handler("reservation.released")
+@register_handler("reservation.expired")
+def _invalidate_stock_from_events(payloads: List[Dict[str, Any]]) -> None:
+    invalidate_stock(pid for payload in payloads for pid in payload.get("product_ids", []))
@@ -0,0 +1,18 @@
+from typing import Any, Dict, List
+
+from app.api.v1.catalog.services import stock_levels
+from app.api.v1.common.live import STOCK_CHANNEL, publish
+from app.api.v1.common.outbox import register_handler
+
+
+@register_handler("order.created")
+@register_handler("order.status_changed")
+@register_handler("catalog.product_changed")
+@register_handler("reservation.placed")
+@register_handler("reservation.released")
+@register_handler("reservation.expired")
+def _publish_stock(payloads: List[Dict[str, Any]]) -> None:
+    # levels are read once the batch is committed, a burst on one SKU goes out as one value
+    product_ids = {pid for payload in payloads for pid in payload.get("product_ids", [])}
+    if product_ids:
+        publish(STOCK_CHANNEL, stock_levels(product_ids))
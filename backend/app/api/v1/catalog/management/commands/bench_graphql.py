@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import strawberry
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import path
+from strawberry.django.views import GraphQLView as SyncGraphQLView
+from strawberry.types import ExecutionResult
+
+from app.api.v1.common.stats import percentile
+from app.api.v1.schema import schema
+from app.api.v1.views import GraphQLContext
+from app_project.urls import urlpatterns as app_urlpatterns
+
+DEFAULT_QUERY = "{ products(limit: 20) { id sku priceCents stock { available } } }"
+SYNC_PATH = "/graphql/sync/"
+
+
+class _BlockingSchema:
+    """
+    The schema as strawberry's sync view calls it. The resolvers are async, so
+    execute_sync runs each operation to completion on the request thread, which
+    stays taken for the whole request.
+    """
+
+    def __init__(self, wrapped: strawberry.Schema) -> None:
+        self._wrapped = wrapped
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._wrapped, name)
+
+    def execute_sync(self, *args, **kwargs) -> ExecutionResult:
+        return async_to_sync(self._wrapped.execute)(*args, **kwargs)
+
+
+class _SyncView(SyncGraphQLView):
+    def get_context(self, request: HttpRequest, response: HttpResponse) -> GraphQLContext:
+        return GraphQLContext(request=request, response=response)
+
+
+# the app's routes plus the sync baseline, the URLconf of the run
+urlpatterns = [
+    *app_urlpatterns,
+    path("graphql/sync/", _SyncView.as_view(schema=_BlockingSchema(schema))),
+]
+
+
+def _summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares GraphQL throughput of strawberry's sync view under the WSGI handler "
+        "(thread per request) with the async view under the ASGI handler (requests "
+        "multiplexed on one event loop)"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--mode",
+            choices=["wsgi", "asgi", "both"],
+            default="both",
+            help="wsgi: the sync view, asgi: the app's async view (default: both).",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=5000,
+            help="Total requests per mode (default: 5000).",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="WSGI worker threads, the sync concurrency ceiling (default: 8).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=500,
+            help="In-flight ASGI requests on the event loop (default: 500).",
+        )
+        parser.add_argument(
+            "--query",
+            default=DEFAULT_QUERY,
+            help="GraphQL document to send.",
+        )
+        parser.add_argument(
+            "--trace-rate",
+            type=float,
+            default=None,
+            help="TRACING_SAMPLE_RATE for the run, compare 0 and 1 to measure tracing overhead "
+            "(default: the configured rate).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        body = json.dumps({"query": options["query"]})
+        modes = ["wsgi", "asgi"] if options["mode"] == "both" else [options["mode"]]
+
+        overrides = {"RATE_LIMIT_ENABLED": False, "ROOT_URLCONF": __name__}
+        if options["trace_rate"] is not None:
+            overrides["TRACING_SAMPLE_RATE"] = options["trace_rate"]
+
+        with override_settings(**overrides):
+            for mode in modes:
+                if mode == "wsgi":
+                    result = self._run_wsgi(body, options["requests"], options["threads"])
+                else:
+                    result = asyncio.run(self._run_asgi(body, options["requests"], options["concurrency"]))
+                self.stdout.write(self.style.SUCCESS(f"{mode}: {result}"))
+
+    @staticmethod
+    def _run_wsgi(body: str, total: int, threads: int) -> Dict[str, float]:
+        # a schema the sync path cannot run would only time error responses
+        probe = Client().post(SYNC_PATH, body, content_type="application/json").json()
+        if probe.get("errors"):
+            raise CommandError(f"The sync view failed the query: {probe['errors']}")
+
+        def worker(count: int) -> List[float]:
+            client = Client()
+            latencies = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    client.post(SYNC_PATH, body, content_type="application/json")
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            chunks = list(pool.map(worker, [total // threads] * threads))
+        elapsed = time.perf_counter() - started
+        return _summary([latency for chunk in chunks for latency in chunk], elapsed)
+
+    @staticmethod
+    async def _run_asgi(body: str, total: int, concurrency: int) -> Dict[str, float]:
+        client = AsyncClient()
+        latencies: List[float] = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await client.post("/graphql/", body, content_type="application/json")
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return _summary(latencies, elapsed)
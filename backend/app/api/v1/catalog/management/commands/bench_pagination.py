@@ -0,0 +1,65 @@
+import time
+from typing import Callable, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.api.v1.catalog.models import Product
+from app.api.v1.common.stats import percentile
+
+
+class Command(BaseCommand):
+    help = "Compares products page latency by depth: OFFSET vs keyset seek on id (run on a seeded catalog)"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--depths",
+            type=int,
+            nargs="+",
+            default=[0, 1_000, 10_000, 100_000, 1_000_000],
+            help="Row offsets to measure, deeper than the catalog are skipped.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=50,
+            help="Rows per page (default: 50).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Samples per depth and strategy (default: 20).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        size: int = options["page_size"]
+        repeat: int = options["repeat"]
+        total = Product.objects.count()
+        if total == 0:
+            raise CommandError("Catalog is empty, run seed_catalog first.")
+
+        qs = Product.objects.select_related("stock").order_by("id")
+        for depth in options["depths"]:
+            if depth >= total:
+                continue
+            # the cursor a client would hold after paging to `depth`
+            after_id = Product.objects.order_by("id").values_list("id", flat=True)[depth - 1] if depth else 0
+
+            offset_ms = self._sample(lambda: list(qs[depth: depth + size]), repeat)
+            keyset_ms = self._sample(lambda: list(qs.filter(id__gt=after_id)[:size]), repeat)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"depth={depth}: offset p50={percentile(offset_ms, 0.5):.3f}ms "
+                    f"p99={percentile(offset_ms, 0.99):.3f}ms | keyset p50={percentile(keyset_ms, 0.5):.3f}ms "
+                    f"p99={percentile(keyset_ms, 0.99):.3f}ms"
+                )
+            )
+
+    @staticmethod
+    def _sample(run: Callable[[], list], repeat: int) -> List[float]:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,131 @@
+import statistics
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.catalog.cache import shard_totals
+from app.api.v1.catalog.services import load_stock, reserve_stock, sync_stock_to_db
+from app.api.v1.catalog.sharding import reshard
+from app.api.v1.common.redis import InsufficientStock, get_stock_engine, stock_key
+from app.api.v1.common.stats import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks stock reservation on one hot SKU: Redis Lua engine vs Stock row locks, "
+        "and the row-lock path over sharded counters"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--backend",
+            choices=["redis", "db", "both"],
+            default="both",
+            help="Which reservation path to measure (default: both).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=32,
+            help="Concurrent buyers, one thread and DB connection each (default: 32).",
+        )
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=5000,
+            help="Total reservation attempts across all workers (default: 5000).",
+        )
+        parser.add_argument(
+            "--stock",
+            type=int,
+            default=2000,
+            help="Initial stock of the hot SKU, lower than --attempts to exercise sell-out (default: 2000).",
+        )
+        parser.add_argument(
+            "--shards",
+            default="",
+            help="Comma-separated shard counts to run the db backend with, e.g. 1,4,16; "
+            "throughput should grow with the count until --workers stop contending.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        backends = ["redis", "db"] if options["backend"] == "both" else [options["backend"]]
+        runs = [(backend, 0) for backend in backends]
+        if options["shards"]:
+            runs = [("db", int(count)) for count in options["shards"].split(",")]
+        for backend, shards in runs:
+            result = self._run(backend, options["workers"], options["attempts"], options["stock"], shards)
+            label = f"{backend} x{shards} shards" if shards else backend
+            self.stdout.write(self.style.SUCCESS(f"{label}: {result}"))
+
+    def _run(self, backend: str, workers: int, attempts: int, initial: int, shards: int = 0) -> Dict[str, float]:
+        product = Product.objects.create(
+            sku=f"BENCH-{uuid.uuid4().hex[:12]}",
+            title="Bench hot SKU",
+            price_cents=100,
+        )
+        Stock.objects.create(product=product, available=initial)
+        if shards:
+            reshard(product.id, shards)
+        quantities = {product.id: 1}
+
+        latencies: List[float] = []
+        counts = {"sold": 0, "rejected": 0}
+        lock = threading.Lock()
+        per_worker = attempts // workers
+
+        def buyer() -> None:
+            local: List[float] = []
+            sold = rejected = 0
+            try:
+                for _ in range(per_worker):
+                    started = time.perf_counter()
+                    try:
+                        with reserve_stock(quantities):
+                            pass
+                        sold += 1
+                    except InsufficientStock:
+                        rejected += 1
+                    local.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local)
+                counts["sold"] += sold
+                counts["rejected"] += rejected
+
+        with override_settings(STOCK_BACKEND=backend):
+            if backend == "redis":
+                load_stock([product.id])
+
+            threads = [threading.Thread(target=buyer) for _ in range(workers)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+
+            if backend == "redis":
+                sync_stock_to_db()
+
+        remaining = shard_totals([product.id]).get(product.id, Stock.objects.get(product=product).available)
+        product.delete()
+        get_stock_engine().client.delete(stock_key(product.id))
+
+        return {
+            "ops_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "sold": counts["sold"],
+            "rejected": counts["rejected"],
+            "oversold": max(0, counts["sold"] - initial),
+            "remaining": remaining,
+        }
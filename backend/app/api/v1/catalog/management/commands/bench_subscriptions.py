@@ -0,0 +1,97 @@
+import asyncio
+import statistics
+import time
+import tracemalloc
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.api.v1.common.live import STOCK_CHANNEL, LiveHub
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the live-update fan-out of one ASGI worker: memory per idle stockChanged "
+        "subscriber and the time to push a round of levels to all of them, with per-SKU "
+        "coalescing (in process, no Redis and no sockets)"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--subscribers",
+            type=int,
+            default=50_000,
+            help="Idle subscribers on this worker (default: 50000).",
+        )
+        parser.add_argument(
+            "--skus",
+            type=int,
+            default=100,
+            help="SKUs watched, subscribers are spread evenly over them (default: 100).",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=20,
+            help="Rounds of one new level per SKU (default: 20).",
+        )
+        parser.add_argument(
+            "--publish-rate",
+            type=float,
+            default=10.0,
+            help="Rounds per second, above the push cap to exercise coalescing (default: 10).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if min(options["subscribers"], options["skus"], options["rounds"]) <= 0 or options["publish_rate"] <= 0:
+            raise ValueError("Invalid arguments, all must be > 0.")
+        result = asyncio.run(self._run(options["subscribers"], options["skus"], options["rounds"], options["publish_rate"]))
+        self.stdout.write(self.style.SUCCESS(f"stockChanged fan-out: {result}"))
+
+    @staticmethod
+    async def _run(subscribers: int, skus: int, rounds: int, publish_rate: float) -> Dict[str, float]:
+        hub = LiveHub({STOCK_CHANNEL: 1 / settings.LIVE_STOCK_MAX_PUSHES_PER_SECOND}, listen=False)
+        received = [0]
+
+        async def current() -> None:
+            return None
+
+        async def subscriber(key: int) -> None:
+            async for _ in hub.stream(STOCK_CHANNEL, key, current):
+                received[0] += 1
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tasks = [asyncio.create_task(subscriber(n % skus)) for n in range(subscribers)]
+        while hub.subscribers < subscribers:
+            await asyncio.sleep(0)
+        idle_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        fanouts: List[float] = []
+        started = time.perf_counter()
+        for level in range(rounds):
+            round_started = time.perf_counter()
+            for key in range(skus):
+                hub.dispatch(STOCK_CHANNEL, key, level)
+            # woken subscribers run before this task resumes
+            await asyncio.sleep(0)
+            fanouts.append(time.perf_counter() - round_started)
+            await asyncio.sleep(max(0.0, 1 / publish_rate - fanouts[-1]))
+        # the last coalesced window closes
+        await asyncio.sleep(1 / settings.LIVE_STOCK_MAX_PUSHES_PER_SECOND)
+        elapsed = time.perf_counter() - started
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {
+            "subscribers": subscribers,
+            "idle_bytes_per_subscriber": round(idle_bytes / subscribers),
+            "fanout_ms_p50": round(statistics.median(fanouts) * 1000, 2),
+            "fanout_ms_max": round(max(fanouts) * 1000, 2),
+            "published_per_sku_per_s": round(rounds / elapsed, 2),
+            "pushed_per_subscriber_per_s": round(received[0] / subscribers / elapsed, 2),
+        }
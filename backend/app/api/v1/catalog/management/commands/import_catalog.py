@@ -0,0 +1,49 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+from app.api.v1.catalog.bulk import FORMATS, ImportStats, format_for, import_catalog, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a merchant feed (CSV or JSONL: sku, title, price_cents, currency, is_active, "
+        "available) into Product and Stock, upserting by sku in chunks via COPY"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("path", help="Feed file, '-' for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default=None,
+            help="Feed format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Rows per COPY and transaction (default: 10000).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        path = options["path"]
+        try:
+            fmt = options["format"] or format_for(path)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be > 0.")
+
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        stats = ImportStats()
+        try:
+            for stats in import_catalog(read_records(stream, fmt), options["chunk_size"], stats):
+                self.stdout.write(f"{stats.rows} rows, {stats.rows_per_s} rows/s")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported: rows={stats.rows}, created={stats.created}, updated={stats.updated}, "
+            f"rejected={stats.rejected}, {stats.rows_per_s} rows/s"
+        ))
@@ -1,24 +1,192 @@
+import bisect
+import itertools
+import multiprocessing
 import random
-import string
-from typing import List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
 
-from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.analytics.models import RollupWatermark, SalesHour, SalesMinute
+from app.api.v1.catalog.bulk import upsert_chunk
+from app.api.v1.catalog.cache import PRODUCT_KEY_PREFIX, get_catalog_cache
+from app.api.v1.catalog.models import Product, Stock, StockShard
+from app.api.v1.catalog.services import merge_quantities, reserve_stock, stock_levels
+from app.api.v1.common.redis import STOCK_KEY_PREFIX, InsufficientStock, get_redis
+from app.api.v1.orders.models import IdempotencyKey, Order, OrderItem, OrderSummary, OutboxEvent, Reservation
+from app.api.v1.orders.summaries import SUMMARY_KEY_PREFIX
 
+User = get_user_model()
 
-def _rand_suffix(n: int = 6) -> str:
-    alphabet = string.ascii_letters + string.digits
-    return "".join(random.choice(alphabet) for _ in range(n))
+_MASK = (1 << 64) - 1
 
+# order status mix of a drop some days after launch
+_STATUSES = (Order.Status.PAID.value, Order.Status.CREATED.value, Order.Status.CANCELED.value)
+_STATUS_WEIGHTS = (70, 20, 10)
+_ORDER_DAYS = 30
 
-def _make_sku(i: int) -> str:
-    return f"FS-{i:04d}-{_rand_suffix(6)}"
+
+def _mix(seed: int, i: int) -> int:
+    """splitmix64 of (seed, i): a fast, well spread, reproducible 64-bit value per row."""
+    z = (seed * 0x9E3779B97F4A7C15 + i) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+def _make_sku(i: int, h: int) -> str:
+    # unique by i, the hash part only keeps SKUs from looking sequential
+    return f"FS-{i:08d}-{h & 0xFFFFFF:06X}"
+
+
+def _ranges(start: int, stop: int, size: int) -> List[Tuple[int, int]]:
+    return [(lo, min(lo + size, stop)) for lo in range(start, stop, size)]
+
+
+# ---- Worker state ----
+# filled once per worker process by _init_worker, read by the chunk functions
+_popular: Sequence[Tuple[int, int]] = ()
+_users: Sequence[int] = ()
+_cdf: List[float] = []
+
+
+def _init_worker(popular: Sequence[Tuple[int, int]], users: Sequence[int], zipf_s: float) -> None:
+    global _popular, _users, _cdf
+    _popular, _users = popular, users
+    if popular:
+        # P(rank r) ~ 1 / r^s, the head of the catalog takes most of the traffic
+        weights = itertools.accumulate(1 / (rank ** zipf_s) for rank in range(1, len(popular) + 1))
+        _cdf = list(weights)
+
+
+def _pick_product(rng: random.Random) -> Tuple[int, int]:
+    return _popular[bisect.bisect_left(_cdf, rng.random() * _cdf[-1])]
+
+
+# ---- Chunks (run in workers) ----
+def _seed_products(
+        seed: int,
+        start: int,
+        stop: int,
+        min_price: int,
+        max_price: int,
+        max_stock: int,
+        mirror: bool,
+) -> int:
+    span = max_price - min_price + 1
+    rows = []
+    for i in range(start, stop):
+        h = _mix(seed, i)
+        rows.append((
+            i,
+            _make_sku(i, h),
+            f"FlashSale Product #{i}",
+            min_price + h % span,
+            "EUR",
+            True,
+            (h >> 32) % (max_stock + 1),
+        ))
+    created, _ = upsert_chunk(rows, mirror=mirror)
+    connection.close()
+    return created
+
+
+def _seed_orders(seed: int, start: int, stop: int) -> int:
+    rng = random.Random(_mix(seed, start))
+    now = timezone.now()
+    count = stop - start
+    with transaction.atomic(), connection.cursor() as cursor:
+        # ids up front, so orders and their items go in with one COPY each
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Order._meta.db_table, count],
+        )
+        order_ids = [row[0] for row in cursor.fetchall()]
+
+        orders, items, summaries = [], [], []
+        for order_id in order_ids:
+            lines: Dict[int, Tuple[int, int]] = {}
+            for _ in range(rng.randint(1, 3)):
+                product_id, price_cents = _pick_product(rng)
+                lines[product_id] = (rng.randint(1, 2), price_cents)
+            total = sum(qty * price_cents for qty, price_cents in lines.values())
+            status = rng.choices(_STATUSES, _STATUS_WEIGHTS)[0]
+            created_at = now - timedelta(seconds=rng.random() * _ORDER_DAYS * 86400)
+            user_id = rng.choice(_users)
+            orders.append((order_id, user_id, status, total, "EUR", created_at, created_at))
+            summaries.append((order_id, user_id, status, total, "EUR", sum(qty for qty, _ in lines.values()), created_at))
+            items += [(order_id, pid, qty, price_cents) for pid, (qty, price_cents) in lines.items()]
+
+        with cursor.copy(
+                f"COPY {Order._meta.db_table} (id, user_id, status, total_cents, currency, created_at, updated_at) FROM STDIN"
+        ) as copy:
+            for row in orders:
+                copy.write_row(row)
+        with cursor.copy(
+                f"COPY {OrderItem._meta.db_table} (order_id, product_id, qty, price_cents) FROM STDIN"
+        ) as copy:
+            for row in items:
+                copy.write_row(row)
+        # no outbox events for seeded orders, so their summaries go in directly
+        with cursor.copy(
+                f"COPY {OrderSummary._meta.db_table} "
+                "(order_id, user_id, status, total_cents, currency, item_count, created_at) FROM STDIN"
+        ) as copy:
+            for row in summaries:
+                copy.write_row(row)
+    connection.close()
+    return count
+
+
+def _seed_reservations(seed: int, start: int, stop: int) -> int:
+    rng = random.Random(_mix(seed, -start - 1))
+    now = timezone.now()
+    ttl = settings.RESERVATION_TTL_SECONDS
+    candidates = []
+    for _ in range(start, stop):
+        product_id, _ = _pick_product(rng)
+        qty = rng.randint(1, 2)
+        candidates.append((rng.choice(_users), product_id, qty, now - timedelta(seconds=rng.random() * ttl)))
+
+    # keep the holds the stock can cover, as checkout sees it
+    left = stock_levels({product_id for _, product_id, _, _ in candidates})
+    holds = []
+    for hold in candidates:
+        if left.get(hold[1], 0) >= hold[2]:
+            left[hold[1]] -= hold[2]
+            holds.append(hold)
+
+    while holds:
+        taken = merge_quantities((product_id, qty) for _, product_id, qty, _ in holds)
+        try:
+            # the path place_hold takes: live counters or shards, and the relay invalidates caches
+            with reserve_stock(taken), connection.cursor() as cursor:
+                with cursor.copy(
+                        f"COPY {Reservation._meta.db_table} (user_id, product_id, qty, created_at) FROM STDIN"
+                ) as copy:
+                    for row in holds:
+                        copy.write_row(row)
+                OutboxEvent.objects.create(topic="reservation.placed", payload={"product_ids": sorted(taken)})
+            break
+        except InsufficientStock as exc:
+            # another worker took it since the levels were read
+            holds = [hold for hold in holds if hold[1] != exc.product_id]
+    connection.close()
+    return len(holds)
 
 
 class Command(BaseCommand):
-    help = "Seeds catalog with products and stocks"
+    help = (
+        "Seeds the catalog with deterministic SKUs, in parallel chunks committed one by one, "
+        "and optionally users, orders and live holds with Zipf-skewed product popularity"
+    )
 
     def add_arguments(self, parser) -> None:
         parser.add_argument(
@@ -30,7 +198,12 @@ class Command(BaseCommand):
         parser.add_argument(
             "--truncate",
             action="store_true",
-            help="Delete all Product/Stock before seeding.",
+            help="Empty the catalog and its holds before seeding; refused while orders exist unless --with-orders.",
+        )
+        parser.add_argument(
+            "--with-orders",
+            action="store_true",
+            help="With --truncate: also delete all orders, their summaries, sales rollups and idempotency keys.",
         )
         parser.add_argument(
             "--min-price",
@@ -50,18 +223,71 @@ class Command(BaseCommand):
             default=50,
             help="Max available stock per product (default: 50).",
         )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=1,
+            help="Same seed, same SKUs, prices and stock (default: 1).",
+        )
+        parser.add_argument(
+            "--start",
+            type=int,
+            default=1,
+            help="First product number; seeding a later range adds SKUs without clashing (default: 1).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes, one DB connection each (default: 1, in process).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Rows per COPY and commit (default: 10000).",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=0,
+            help="Buyer accounts for --orders/--reservations (default: 1000 when either is set).",
+        )
+        parser.add_argument(
+            "--orders",
+            type=int,
+            default=0,
+            help="Orders to create, 1-3 items each (default: 0).",
+        )
+        parser.add_argument(
+            "--reservations",
+            type=int,
+            default=0,
+            help="Live holds to create, taking their stock; holds the stock cannot cover are skipped (default: 0).",
+        )
+        parser.add_argument(
+            "--zipf-s",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of product popularity, higher is more skewed (default: 1.1).",
+        )
+        parser.add_argument(
+            "--popular",
+            type=int,
+            default=100_000,
+            help="Products ranked for popularity, the rest get no orders (default: 100000).",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options) -> None:
         count: int = options["count"]
-        truncate: bool = options["truncate"]
         min_price: int = options["min_price"]
         max_price: int = options["max_price"]
         max_stock: int = options["max_stock"]
+        seed: int = options["seed"]
+        chunk_size: int = options["chunk_size"]
 
-        if count <= 0:
-            self.stdout.write(self.style.WARNING("Nothing to do: --count must be > 0"))
-            return
+        if count < 0 or options["orders"] < 0 or options["reservations"] < 0:
+            raise ValueError("Invalid counts, must be >= 0.")
 
         if min_price < 0 or max_price < 0 or min_price > max_price:
             raise ValueError("Invalid price range. Ensure 0 <= min-price <= max-price.")
@@ -69,53 +295,120 @@ class Command(BaseCommand):
         if max_stock < 0:
             raise ValueError("Invalid --max-stock, must be >= 0.")
 
-        if truncate:
-            deleted_products, _ = Product.objects.all().delete()
-            self.stdout.write(self.style.WARNING(f"Truncated catalog, deleted products: {deleted_products}"))
-
-        existing_skus = set(Product.objects.values_list("sku", flat=True))
-
-        products_to_create: List[Product] = []
-        target_total = count
+        if chunk_size <= 0 or options["workers"] <= 0:
+            raise ValueError("Invalid --chunk-size or --workers, must be > 0.")
 
-        i = 1
-        while len(products_to_create) < target_total:
-            sku = _make_sku(i)
-            i += 1
-            if sku in existing_skus:
-                continue
+        if options["truncate"]:
+            self._truncate(options["with_orders"])
 
-            price_cents = random.randint(min_price, max_price)
-            currency = "EUR"
-            is_active = True
+        if count:
+            start = options["start"]
+            # a rerun over existing SKUs must reach their counters and shards, after --truncate there are none
+            mirror = not options["truncate"]
+            created = self._run(
+                "products",
+                _seed_products,
+                [
+                    (seed, lo, hi, min_price, max_price, max_stock, mirror)
+                    for lo, hi in _ranges(start, start + count, chunk_size)
+                ],
+                options,
+            )
+            self.stdout.write(self.style.SUCCESS(f"Seeded: products={created} (of {count} SKUs)"))
 
-            title = f"FlashSale Product #{len(products_to_create) + 1}"
+        if not (options["orders"] or options["reservations"]):
+            return
 
-            products_to_create.append(
-                Product(
-                    sku=sku,
-                    title=title,
-                    price_cents=price_cents,
-                    currency=currency,
-                    is_active=is_active,
-                )
-            )
-            existing_skus.add(sku)
+        users = self._users(seed, options["users"] or 1000)
+        popular = list(
+            Product.objects.filter(is_active=True)
+            .order_by("id")
+            .values_list("id", "price_cents")[:options["popular"]]
+        )
+        if not popular:
+            self.stdout.write(self.style.WARNING("No active products, skipping orders and holds."))
+            return
+        # popularity rank independent of id order, the same for a given seed
+        random.Random(seed).shuffle(popular)
+        init = (popular, users, options["zipf_s"])
 
-        Product.objects.bulk_create(products_to_create, batch_size=500)
+        for name, fn, total in (
+                ("orders", _seed_orders, options["orders"]),
+                ("reservations", _seed_reservations, options["reservations"]),
+        ):
+            if total:
+                done = self._run(name, fn, [(seed, lo, hi) for lo, hi in _ranges(0, total, chunk_size)], options, init)
+                self.stdout.write(self.style.SUCCESS(f"Seeded: {name}={done}"))
 
-        created_skus = [p.sku for p in products_to_create]
-        created_products = list(Product.objects.filter(sku__in=created_skus).only("id", "sku"))
+    def _run(
+            self,
+            name: str,
+            fn: Callable[..., int],
+            chunks: List[Tuple],
+            options: dict,
+            init: Tuple = ((), (), 1.0),
+    ) -> int:
+        started = time.perf_counter()
+        done = 0
+        for result in self._map(fn, chunks, options["workers"], init):
+            done += result
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{name}: {done} rows, {round(done / elapsed, 1) if elapsed else 0.0} rows/s")
+        return done
 
-        stocks_to_create: List[Stock] = []
-        for p in created_products:
-            available = random.randint(0, max_stock)
-            stocks_to_create.append(Stock(product_id=p.id, available=available))
+    @staticmethod
+    def _map(fn: Callable[..., int], chunks: List[Tuple], workers: int, init: Tuple) -> Iterator[int]:
+        if workers == 1:
+            _init_worker(*init)
+            for chunk in chunks:
+                yield fn(*chunk)
+            return
+        # forked workers must not share the parent's connections or pool, each opens its own
+        for conn in connections.all():
+            conn.close()
+            if hasattr(conn, "close_pool"):
+                conn.close_pool()
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=init,
+        ) as pool:
+            yield from pool.map(fn, *zip(*chunks)) if chunks else ()
 
-        Stock.objects.bulk_create(stocks_to_create, batch_size=500)
+    def _truncate(self, with_orders: bool) -> None:
+        if not with_orders and Order.objects.exists():
+            raise CommandError(
+                "Orders reference the catalog; pass --with-orders as well to delete them, "
+                "their summaries, sales rollups and idempotency keys."
+            )
+        models = [
+            Product, Stock, StockShard, Reservation,
+            Order, OrderItem, OrderSummary, IdempotencyKey,
+            SalesMinute, SalesHour, RollupWatermark,
+        ]
+        # no CASCADE: a table referencing these that is not listed makes it fail instead of emptying it too
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(model._meta.db_table for model in models)}")
+        # stock counters have no TTL and cached payloads would outlive their rows
+        client = get_redis()
+        dropped = 0
+        for pattern in (f"{STOCK_KEY_PREFIX}*", f"{SUMMARY_KEY_PREFIX}*", f"{PRODUCT_KEY_PREFIX}*"):
+            keys = list(client.scan_iter(match=pattern, count=1000))
+            for lo in range(0, len(keys), 1000):
+                dropped += client.delete(*keys[lo:lo + 1000])
+        get_catalog_cache().invalidate_pages()
+        self.stdout.write(self.style.WARNING(
+            f"Truncated catalog, holds, orders and sales rollups; dropped {dropped} Redis stock and cache keys."
+        ))
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Seeded: products={len(created_products)}, stocks={len(stocks_to_create)}"
+    def _users(self, seed: int, count: int) -> List[int]:
+        prefix = f"seed-{seed}-"
+        # one unusable hash for all, hashing per account would dominate the run
+        password = make_password(None)
+        for lo, hi in _ranges(0, count, 10_000):
+            User.objects.bulk_create(
+                [User(username=f"{prefix}{i}", password=password) for i in range(lo, hi)],
+                ignore_conflicts=True,
             )
-        )
\ No newline at end of file
+        return list(User.objects.filter(username__startswith=prefix).values_list("id", flat=True)[:count])
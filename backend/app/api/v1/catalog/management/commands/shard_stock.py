@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.api.v1.catalog.models import Product
+from app.api.v1.catalog.sharding import reshard
+
+
+class Command(BaseCommand):
+    help = (
+        "Splits a hot SKU's stock over N StockShard rows, or merges it back into its "
+        "Stock row, while checkout keeps running (db stock backend only)"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("sku", help="SKU of the product to reshard.")
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--shards",
+            type=int,
+            default=16,
+            help="Number of sub-counters (default: 16).",
+        )
+        group.add_argument(
+            "--unshard",
+            action="store_true",
+            help="Merge the shards back into the Stock row.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        shards = 0 if options["unshard"] else options["shards"]
+        if shards < 0:
+            raise CommandError("--shards must be >= 0.")
+        if shards and settings.STOCK_BACKEND == "redis":
+            # checkout reserves from the single Redis counter, table shards would not spread that hotspot
+            raise CommandError(
+                "STOCK_BACKEND is redis: checkout reserves from the product's Redis counter, which shards do "
+                "not split. Shard on the db backend; --unshard still merges shards left from it."
+            )
+        product = Product.objects.filter(sku=options["sku"]).first()
+        if product is None:
+            raise CommandError(f"Product {options['sku']} not found.")
+
+        total = reshard(product.id, shards)
+        layout = f"{shards} shards" if shards else "its Stock row"
+        self.stdout.write(self.style.SUCCESS(f"{product.sku}: {total} in stock, now held in {layout}"))
@@ -15,6 +15,23 @@ class Product(models.Model):
 class Stock(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="stock")
     available = models.IntegerField(default=0)
+    # 0: `available` is the stock. N: the stock lives in N StockShard rows and
+    # `available` is a snapshot from the last reshard or stock write (see catalog.sharding)
+    shards = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self) -> str:
         return f"{self.product.sku}: {self.available}"
+
+
+class StockShard(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_shards")
+    index = models.PositiveSmallIntegerField()
+    available = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "index"], name="catalog_stockshard_product_index"),
+        ]
+
+    def __str__(self) -> str:
+        return f"StockShard(product={self.product_id}, index={self.index}, available={self.available})"
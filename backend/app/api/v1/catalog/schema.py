@@ -1,10 +1,25 @@
-from typing import List, Optional
+from typing import AsyncGenerator, List, Optional
 import strawberry
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from graphql import GraphQLError
 from strawberry import auto
 from strawberry.types import Info
 from strawberry_django import type as dj_type
+from strawberry_django.resolvers import django_resolver
 
 from app.api.v1.catalog.models import Stock, Product
+from app.api.v1.catalog import cache
+from app.api.v1.catalog.services import product_changed, set_stock_level, stock_levels
+from app.api.v1.common.live import STOCK_CHANNEL, get_hub
+from app.api.v1.common.loaders import load_related
+from app.api.v1.common.pagination import (
+    Connection,
+    build_connection,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+)
 
 
 # ---- Types ----
@@ -17,42 +32,75 @@ class ProductType:
     currency: auto
     is_active: auto
 
-    stock: Optional["StockType"]
+    @strawberry.field
+    async def stock(self, info: Info) -> Optional["StockType"]:
+        return await load_related(self, "stock", info.context.loaders.stock_by_product, self.id)
 
 
 @dj_type(Stock)
 class StockType:
     id: auto
-    product: auto
     available: auto
 
+    @strawberry.field
+    async def product(self, info: Info) -> ProductType:
+        return await load_related(self, "product", info.context.loaders.product, self.product_id)
+
+
+@strawberry.type
+class StockLevelType:
+    sku: str
+    available: int
+
 
 # ---- Query ----
 @strawberry.type
 class CatalogQuery:
     @strawberry.field
-    def product(self, info: Info, sku: str) -> Optional[ProductType]:
-        # avoid N+1
-        return (
-            Product.objects.select_related("stock")
-            .filter(sku=sku)
-            .first()
-        )
+    async def product(self, info: Info, sku: str) -> Optional[ProductType]:
+        return await sync_to_async(cache.get_product)(sku)
 
     @strawberry.field
-    def products(
+    async def products(
             self,
             info: Info,
             is_active: Optional[bool] = None,
             limit: int = 50,
             offset: int = 0,
     ) -> List[ProductType]:
-        qs = Product.objects.select_related("stock").all().order_by("id")
+        return await sync_to_async(cache.get_products_page)(is_active, clamp_page_size(limit), offset)
 
-        if is_active is not None:
-            qs = qs.filter(is_active=is_active)
+    @strawberry.field
+    async def products_connection(
+            self,
+            info: Info,
+            is_active: Optional[bool] = None,
+            first: int = 50,
+            after: Optional[str] = None,
+    ) -> Connection[ProductType]:
+        # seeks on id, latency does not depend on how deep the page is
+        first = clamp_page_size(first)
+        after_id = decode_cursor(after, int)[0] if after else None
+        rows = await sync_to_async(cache.get_products_page)(is_active, first + 1, after_id=after_id)
+        return build_connection(rows, first, lambda product: encode_cursor(product.id))
 
-        return list(qs[offset: offset + limit])
+
+# ---- Subscriptions ----
+@strawberry.type
+class CatalogSubscription:
+    @strawberry.subscription
+    async def stock_changed(self, info: Info, sku: str) -> AsyncGenerator[StockLevelType, None]:
+        """The current level, then every change, at most LIVE_STOCK_MAX_PUSHES_PER_SECOND times a second."""
+        product = await sync_to_async(cache.get_product)(sku)
+        if product is None:
+            raise GraphQLError("Product not found.")
+
+        async def current() -> Optional[int]:
+            levels = await sync_to_async(stock_levels)([product.id])
+            return levels.get(product.id)
+
+        async for available in get_hub().stream(STOCK_CHANNEL, product.id, current):
+            yield StockLevelType(sku=product.sku, available=available)
 
 
 # ---- Inputs ----
@@ -76,6 +124,8 @@ class StockSetInput:
 @strawberry.type
 class CatalogMutation:
     @strawberry.mutation
+    @django_resolver
+    @transaction.atomic
     def create_product(self, info: Info, data: ProductCreateInput) -> ProductType:
         product = Product.objects.create(
             sku=data.sku,
@@ -85,12 +135,18 @@ class CatalogMutation:
             is_active=data.is_active,
         )
         Stock.objects.create(product=product, available=data.available)
+        set_stock_level(product.id, data.available)
+        product_changed(product)
         return Product.objects.select_related("stock").get(pk=product.pk)
 
     @strawberry.mutation
+    @django_resolver
+    @transaction.atomic
     def get_stock(self, info: Info, data: StockSetInput) -> ProductType:
         product = Product.objects.get(sku=data.sku)
         stock, _ = Stock.objects.get_or_create(product=product)
         stock.available = data.available
         stock.save(update_fields=["available"])
-        return stock
+        set_stock_level(product.id, stock.available)
+        product_changed(product)
+        return Product.objects.select_related("stock").get(pk=product.pk)
@@ -0,0 +1,300 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from app.api.v1.catalog.cache import invalidate_products, invalidate_stock, shard_counts, shard_totals
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.catalog.sharding import restock_shards, set_shard_total, take_from_shards
+from app.api.v1.common.redis import InsufficientStock, StockNotLoaded, get_stock_engine
+from app.api.v1.orders.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def merge_quantities(items: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    quantities: Counter = Counter()
+    for product_id, qty in items:
+        if qty <= 0:
+            raise ValueError(f"Invalid qty for product {product_id}, must be > 0.")
+        quantities[product_id] += qty
+    return dict(quantities)
+
+
+def _uses_redis() -> bool:
+    return settings.STOCK_BACKEND == "redis"
+
+
+def load_stock(product_ids: Iterable[int]) -> None:
+    levels = dict(
+        Stock.objects.filter(product_id__in=list(product_ids)).values_list("product_id", "available")
+    )
+    levels.update(shard_totals(levels))
+    get_stock_engine().load(levels)
+
+
+def stock_levels(product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Available stock per product as checkout sees it: the live counters with
+    the redis backend, the Stock row or its shard sum otherwise (and for
+    counters not loaded). Unknown products are left out.
+    """
+    product_ids = list(product_ids)
+    levels: Dict[int, int] = {}
+    if _uses_redis():
+        levels = {pid: value for pid, value in get_stock_engine().get(product_ids).items() if value is not None}
+    missing = [pid for pid in product_ids if pid not in levels]
+    if missing:
+        rows = dict(Stock.objects.filter(product_id__in=missing).values_list("product_id", "available"))
+        rows.update(shard_totals(rows))
+        levels.update(rows)
+    return levels
+
+
+def _reserve_redis(quantities: Mapping[int, int]) -> None:
+    if not quantities:
+        return
+    engine = get_stock_engine()
+    try:
+        engine.reserve(quantities)
+    except StockNotLoaded:
+        # cold counters, warm the whole cart once and retry
+        load_stock(quantities)
+        try:
+            engine.reserve(quantities)
+        except StockNotLoaded as exc:
+            raise InsufficientStock(exc.product_id, quantities[exc.product_id], 0) from exc
+
+
+def _reserve_rows(quantities: Mapping[int, int]) -> None:
+    if not quantities:
+        return
+    product_ids = sorted(quantities)
+    # one query, rows locked in product_id order so overlapping carts cannot deadlock
+    levels: Dict[int, int] = {}
+    sharded: Dict[int, int] = {}
+    for product_id, available, shards in (
+            Stock.objects.select_for_update()
+            .filter(product_id__in=product_ids)
+            .order_by("product_id")
+            .values_list("product_id", "available", "shards")
+    ):
+        if shards:
+            sharded[product_id] = shards
+        else:
+            levels[product_id] = available
+    for product_id in product_ids:
+        available = levels.get(product_id, 0)
+        if product_id not in sharded and available < quantities[product_id]:
+            raise InsufficientStock(product_id, quantities[product_id], available)
+
+    if levels:
+        Stock.objects.filter(product_id__in=list(levels)).update(
+            available=Case(
+                *[When(product_id=pid, then=F("available") - quantities[pid]) for pid in levels],
+                output_field=IntegerField(),
+            )
+        )
+    # sharded since the layout was cached; the row lock held here keeps them sharded
+    for product_id, shards in sharded.items():
+        take_from_shards(product_id, shards, quantities[product_id])
+
+
+def _reserve_db(quantities: Mapping[int, int]) -> None:
+    if not quantities:
+        return
+    counts = shard_counts(quantities)
+    # sharded SKUs skip their Stock row lock and take from one random shard instead
+    _reserve_rows({pid: qty for pid, qty in quantities.items() if not counts[pid]})
+    unsharded = {
+        pid: qty
+        for pid, qty in sorted(quantities.items())
+        if counts[pid] and not take_from_shards(pid, counts[pid], qty)
+    }
+    # unsharded since the layout was cached
+    _reserve_rows(unsharded)
+
+
+@contextmanager
+def reserve_stock(quantities: Mapping[int, int]) -> Iterator[None]:
+    """
+    Takes `quantities` (product_id -> qty) out of stock and runs the block in a
+    transaction. With the redis backend the counters are credited back if the
+    block fails, with the db backend the rollback does it.
+    """
+    if not _uses_redis():
+        with transaction.atomic():
+            _reserve_db(quantities)
+            yield
+        return
+
+    _reserve_redis(quantities)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        _release_redis(quantities)
+        raise
+
+
+def _restock_db(quantities: Mapping[int, int]) -> None:
+    if not quantities:
+        return
+    counts = shard_counts(quantities)
+    rows = {
+        pid: qty
+        for pid, qty in quantities.items()
+        if not (counts[pid] and restock_shards(pid, counts[pid], qty))
+    }
+    if not rows:
+        return
+    updated = Stock.objects.filter(product_id__in=list(rows), shards=0).update(
+        available=Case(
+            *[When(product_id=pid, then=F("available") + qty) for pid, qty in rows.items()],
+            output_field=IntegerField(),
+        )
+    )
+    if updated < len(rows):
+        # sharded since the layout was cached (or no Stock row at all)
+        for product_id, shards in Stock.objects.filter(product_id__in=list(rows), shards__gt=0).values_list(
+                "product_id", "shards"
+        ):
+            restock_shards(product_id, shards, rows[product_id])
+
+
+def _release_redis(quantities: Mapping[int, int]) -> None:
+    missing = get_stock_engine().release(quantities)
+    # counters evicted since the reservation, the table is the only copy left
+    _restock_db({pid: quantities[pid] for pid in missing})
+
+
+def restock(quantities: Mapping[int, int]) -> None:
+    """
+    Returns stock taken earlier (expired holds, canceled orders). Runs inside the
+    caller's transaction: the db backend updates rows in it, the redis backend
+    credits the counters once it commits.
+    """
+    if not quantities:
+        return
+    if _uses_redis():
+        quantities = dict(quantities)
+        transaction.on_commit(lambda: _release_redis(quantities))
+    else:
+        _restock_db(quantities)
+
+
+def set_stock_level(product_id: int, available: int) -> None:
+    """Mirrors an explicit stock write (admin, catalog mutation) into the shards and the live counter."""
+    set_stock_levels({product_id: available})
+
+
+def set_stock_levels(levels: Mapping[int, int], sharded: Optional[Iterable[int]] = None) -> None:
+    """
+    set_stock_level for many products, one counter write for all of them.
+    `sharded`: the sharded products among `levels` when the caller already
+    knows them, looked up otherwise.
+    """
+    if not levels:
+        return
+    if sharded is None:
+        sharded = [pid for pid, shards in shard_counts(levels).items() if shards]
+    for product_id in sharded:
+        set_shard_total(product_id, levels[product_id])
+    if _uses_redis():
+        levels = dict(levels)
+        transaction.on_commit(lambda: get_stock_engine().load(levels, overwrite=True))
+
+
+def product_changed(product: Product) -> None:
+    """Drops cached catalog payloads for `product` and tells outbox consumers about the change."""
+    invalidate_products([product.sku])
+    OutboxEvent.objects.create(
+        topic="catalog.product_changed",
+        payload={"product_ids": [product.id], "sku": product.sku},
+    )
+
+
+def _write_levels(levels: Mapping[int, int]) -> int:
+    if not levels:
+        return 0
+    written = Stock.objects.filter(product_id__in=list(levels)).update(
+        available=Case(
+            *[When(product_id=pid, then=Value(available)) for pid, available in levels.items()],
+            output_field=IntegerField(),
+        )
+    )
+    # the Stock row of a sharded product only keeps a snapshot, the level goes to its shards
+    for product_id in shard_totals(levels):
+        with transaction.atomic():
+            set_shard_total(product_id, levels[product_id])
+    # cached payloads read the Stock row, without this they keep the level from before the write-back
+    invalidate_stock(levels)
+    return written
+
+
+def sync_stock_to_db(batch_size: int | None = None) -> int:
+    """Writes back counters touched since the last run, one UPDATE per batch."""
+    batch_size = batch_size or settings.STOCK_SYNC_BATCH_SIZE
+    engine = get_stock_engine()
+    synced = 0
+    while True:
+        product_ids = engine.pop_dirty(batch_size)
+        if not product_ids:
+            break
+        levels = {pid: available for pid, available in engine.get(product_ids).items() if available is not None}
+        synced += _write_levels(levels)
+        if len(product_ids) < batch_size:
+            break
+    return synced
+
+
+def reconcile_stock(batch_size: int | None = None) -> Dict[str, int]:
+    """
+    Walks the Stock table against the live counters. Missing counters are
+    loaded from the table, drifted rows are overwritten from Redis, which is
+    authoritative while it holds a counter.
+    """
+    batch_size = batch_size or settings.STOCK_SYNC_BATCH_SIZE
+    engine = get_stock_engine()
+    stats = {"checked": 0, "loaded": 0, "repaired": 0}
+
+    sync_stock_to_db(batch_size)
+
+    rows = Stock.objects.order_by("product_id").values_list("product_id", "available")
+    batch: List[Tuple[int, int]] = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _reconcile_batch(engine, batch, stats)
+            batch = []
+    if batch:
+        _reconcile_batch(engine, batch, stats)
+
+    if stats["loaded"] or stats["repaired"]:
+        logger.warning("Stock reconciliation: %s", stats)
+    return stats
+
+
+def _reconcile_batch(engine, batch: List[Tuple[int, int]], stats: Dict[str, int]) -> None:
+    db_levels = dict(batch)
+    db_levels.update(shard_totals(db_levels))
+    live = engine.get(db_levels)
+    dirty = engine.is_dirty(db_levels)
+
+    missing = {pid: available for pid, available in db_levels.items() if live[pid] is None}
+    drifted = {
+        pid: live[pid]
+        for pid, available in db_levels.items()
+        if live[pid] is not None and live[pid] != available and not dirty[pid]
+    }
+
+    engine.load(missing)
+    _write_levels(drifted)
+
+    stats["checked"] += len(batch)
+    stats["loaded"] += len(missing)
+    stats["repaired"] += len(drifted)
@@ -0,0 +1,107 @@
+import random
+from typing import List
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from app.api.v1.catalog.cache import forget_shards, invalidate_products
+from app.api.v1.catalog.models import Stock, StockShard
+from app.api.v1.common.redis import InsufficientStock
+
+
+def _spread(product_id: int, indexes: List[int], total: int) -> None:
+    """Splits `total` evenly over the locked shards `indexes`."""
+    share, extra = divmod(total, len(indexes))
+    StockShard.objects.filter(product_id=product_id).update(
+        available=Case(
+            *[When(index=index, then=Value(share + (n < extra))) for n, index in enumerate(indexes)],
+            output_field=IntegerField(),
+        )
+    )
+
+
+def _locked_shards(product_id: int) -> List[tuple]:
+    # index order, so rebalances of the same product cannot deadlock
+    return list(
+        StockShard.objects.select_for_update()
+        .filter(product_id=product_id)
+        .order_by("index")
+        .values_list("index", "available")
+    )
+
+
+def take_from_shards(product_id: int, shards: int, qty: int) -> bool:
+    """
+    Takes `qty` from one random shard, a single-row conditional UPDATE, so
+    buyers of the same SKU contend on 1/`shards` of the traffic each. When
+    that shard is drained the product's shards are locked and rebalanced,
+    which only fails once the whole product is short. Returns False when the
+    product turns out not to be sharded (unsharded since `shards` was read).
+    """
+    index = random.randrange(shards)
+    updated = (
+        StockShard.objects
+        .filter(product_id=product_id, index=index, available__gte=qty)
+        .update(available=F("available") - qty)
+    )
+    if updated:
+        return True
+
+    rows = _locked_shards(product_id)
+    if not rows:
+        return False
+    total = sum(available for _, available in rows)
+    if total < qty:
+        raise InsufficientStock(product_id, qty, total)
+    _spread(product_id, [index for index, _ in rows], total - qty)
+    return True
+
+
+def restock_shards(product_id: int, shards: int, qty: int) -> bool:
+    """Credits `qty` to a random shard; False when the product has no shards."""
+    for index in (random.randrange(shards), 0):
+        # shard 0 always exists, the random one may not after a reshard to fewer shards
+        if StockShard.objects.filter(product_id=product_id, index=index).update(available=F("available") + qty):
+            return True
+    return False
+
+
+def set_shard_total(product_id: int, total: int) -> bool:
+    """Overwrites the product's sharded stock with `total`; False when it has no shards."""
+    rows = _locked_shards(product_id)
+    if not rows:
+        return False
+    _spread(product_id, [index for index, _ in rows], total)
+    return True
+
+
+@transaction.atomic
+def reshard(product_id: int, shards: int) -> int:
+    """
+    Moves the product's stock into `shards` StockShard rows, or back into the
+    Stock row when `shards` is 0, and returns the amount moved. Runs online:
+    the Stock row lock is taken first, as checkout does, then every shard, so
+    in-flight purchases finish against the old layout and later ones see the
+    new one once this commits.
+    """
+    if shards < 0:
+        raise ValueError("shards must be >= 0.")
+    stock = Stock.objects.select_for_update().select_related("product").get(product_id=product_id)
+    rows = _locked_shards(product_id)
+    total = sum(available for _, available in rows) if stock.shards else stock.available
+
+    StockShard.objects.filter(product_id=product_id).delete()
+    if shards:
+        share, extra = divmod(total, shards)
+        StockShard.objects.bulk_create([
+            StockShard(product_id=product_id, index=index, available=share + (index < extra))
+            for index in range(shards)
+        ])
+    # for a sharded product `available` stays as a snapshot for direct table readers
+    stock.available = total
+    stock.shards = shards
+    stock.save(update_fields=["available", "shards"])
+
+    transaction.on_commit(lambda: forget_shards([product_id]))
+    invalidate_products([stock.product.sku])
+    return total
@@ -0,0 +1,13 @@
+from celery import shared_task
+
+from app.api.v1.catalog.services import reconcile_stock, sync_stock_to_db
+
+
+@shared_task(name="catalog.sync_stock", ignore_result=True)
+def sync_stock() -> int:
+    return sync_stock_to_db()
+
+
+@shared_task(name="catalog.reconcile_stock")
+def reconcile_stock_task() -> dict:
+    return reconcile_stock()
@@ -0,0 +1,282 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterator, Optional, Set, Tuple
+
+from django.conf import settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLSchema,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_composite_type,
+    value_from_ast_untyped,
+)
+from strawberry.extensions import SchemaExtension
+
+from app.api.v1.common.extensions import operation_scope
+from app.api.v1.common.persisted_queries import query_hash
+
+# arguments that bound how many items a field returns
+SIZE_ARGUMENTS = ("limit", "first")
+
+
+class QueryTooComplex(GraphQLError):
+    def __init__(self, message: str, cost: int, depth: int) -> None:
+        super().__init__(
+            message,
+            extensions={
+                "code": "QUERY_TOO_COMPLEX",
+                "cost": cost,
+                "maxCost": settings.QUERY_MAX_COST,
+                "depth": depth,
+                "maxDepth": settings.QUERY_MAX_DEPTH,
+            },
+        )
+
+
+@dataclass
+class _Analysis:
+    cost: int = 0
+    depth: int = 0
+    # variables feeding limit/first, the cost only holds for their current values
+    size_variables: Set[str] = field(default_factory=set)
+
+
+class _CostAnalyzer:
+    """
+    Cost of a field = its weight + list multiplier x cost of its selections.
+
+    Weights come from QUERY_COST_WEIGHTS ("Type.field"), otherwise 1 for fields
+    returning objects (a resolver, usually a query or a loader batch) and 0 for
+    scalars. A list field is multiplied by its limit/first argument, capped at
+    PAGINATION_MAX_PAGE_SIZE as the resolvers do; a size argument on a non-list
+    field (connections) carries down to the first list below it (edges). Lists
+    without a size use QUERY_COST_DEFAULT_LIST_SIZE.
+    """
+
+    def __init__(
+            self,
+            schema: GraphQLSchema,
+            fragments: Dict[str, FragmentDefinitionNode],
+            variables: Dict[str, Any],
+            variable_defaults: Dict[str, Any],
+    ) -> None:
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+        self.variable_defaults = variable_defaults
+        self.weights: Dict[str, int] = settings.QUERY_COST_WEIGHTS
+        self.max_page = settings.PAGINATION_MAX_PAGE_SIZE
+        self.default_list_size = settings.QUERY_COST_DEFAULT_LIST_SIZE
+        self.result = _Analysis()
+
+    def analyze(self, operation: OperationDefinitionNode) -> _Analysis:
+        root = self.schema.get_root_type(operation.operation)
+        self.result.cost, self.result.depth = self._selection_set(root, operation.selection_set, None)
+        return self.result
+
+    def _selection_set(
+            self,
+            parent,
+            selection_set: SelectionSetNode,
+            carried: Optional[int],
+    ) -> Tuple[int, int]:
+        cost = depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self._field(parent, selection, carried)
+            elif isinstance(selection, InlineFragmentNode):
+                target = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition else parent
+                )
+                field_cost, field_depth = self._selection_set(target, selection.selection_set, carried)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+                target = self.schema.get_type(fragment.type_condition.name.value)
+                field_cost, field_depth = self._selection_set(target, fragment.selection_set, carried)
+            else:
+                continue
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def _field(self, parent, node: FieldNode, carried: Optional[int]) -> Tuple[int, int]:
+        name = node.name.value
+        fields = getattr(parent, "fields", None)
+        if name.startswith("__") or not fields or name not in fields:
+            # introspection, or a union parent: free
+            return 0, 0
+        definition = fields[name]
+        return_type = get_named_type(definition.type)
+        weight = self.weights.get(
+            f"{parent.name}.{name}",
+            1 if is_composite_type(return_type) else 0,
+        )
+        if node.selection_set is None:
+            return weight, 1
+
+        size = self._size(definition, node)
+        if isinstance(get_nullable_type(definition.type), GraphQLList):
+            multiplier = size or carried or self.default_list_size
+            carried = None
+        else:
+            multiplier = 1
+            carried = size or carried
+
+        child_cost, child_depth = self._selection_set(return_type, node.selection_set, carried)
+        return weight + multiplier * child_cost, child_depth + 1
+
+    def _size(self, definition, node: FieldNode) -> Optional[int]:
+        for name in SIZE_ARGUMENTS:
+            if name not in definition.args:
+                continue
+            value = definition.args[name].default_value
+            for argument in node.arguments:
+                if argument.name.value != name:
+                    continue
+                if isinstance(argument.value, VariableNode):
+                    variable = argument.value.name.value
+                    self.result.size_variables.add(variable)
+                    value = self.variables.get(variable, self.variable_defaults.get(variable, value))
+                elif isinstance(argument.value, IntValueNode):
+                    value = int(argument.value.value)
+            if isinstance(value, int) and value > 0:
+                return min(value, self.max_page)
+        return None
+
+
+class _AnalysisCache:
+    """
+    Bounded LRU of analyses. A document that sizes lists from variables is keyed
+    by those values too, so one entry per (document, operation) records which
+    variables matter and another holds the result for their values.
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+_cache = _AnalysisCache()
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def analyze_operation(
+        schema: GraphQLSchema,
+        document,
+        operation: OperationDefinitionNode,
+        document_hash: str,
+        variables: Optional[Dict[str, Any]],
+) -> _Analysis:
+    variables = variables or {}
+    operation_key = (document_hash, operation.name.value if operation.name else None)
+    size_variables = _cache.get(operation_key)
+    if size_variables is not None:
+        cached = _cache.get(operation_key + (_freeze({n: variables.get(n) for n in size_variables}),))
+        if cached is not None:
+            return cached
+
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    variable_defaults = {
+        definition.variable.name.value: value_from_ast_untyped(definition.default_value)
+        for definition in operation.variable_definitions or ()
+        if definition.default_value is not None
+    }
+    analysis = _CostAnalyzer(schema, fragments, variables, variable_defaults).analyze(operation)
+
+    names = frozenset(analysis.size_variables)
+    _cache.set(operation_key, names)
+    _cache.set(operation_key + (_freeze({n: variables.get(n) for n in names}),), analysis)
+    return analysis
+
+
+class QueryCostExtension(SchemaExtension):
+    """
+    Rejects operations whose estimated cost or depth is over QUERY_MAX_COST /
+    QUERY_MAX_DEPTH before any resolver runs, and reports the cost under
+    `extensions.cost` of the response. Analyses are cached by document hash.
+    """
+
+    def on_execute(self) -> Iterator[None]:
+        scope = operation_scope(self)
+        context = scope.execution_context
+        document = context.graphql_document
+        if document is not None and context.query:
+            operation = next(
+                (
+                    d for d in document.definitions
+                    if isinstance(d, OperationDefinitionNode)
+                    and (context.operation_name is None or (d.name and d.name.value == context.operation_name))
+                ),
+                None,
+            )
+            if operation is not None:
+                analysis = scope.state["cost"] = analyze_operation(
+                    context.schema._schema,
+                    document,
+                    operation,
+                    query_hash(context.query),
+                    context.variables,
+                )
+                self._enforce(analysis)
+        yield
+
+    @staticmethod
+    def _enforce(analysis: _Analysis) -> None:
+        if analysis.depth > settings.QUERY_MAX_DEPTH:
+            raise QueryTooComplex(
+                f"Query depth {analysis.depth} exceeds the limit of {settings.QUERY_MAX_DEPTH}.",
+                analysis.cost,
+                analysis.depth,
+            )
+        if analysis.cost > settings.QUERY_MAX_COST:
+            raise QueryTooComplex(
+                f"Query cost {analysis.cost} exceeds the budget of {settings.QUERY_MAX_COST}.",
+                analysis.cost,
+                analysis.depth,
+            )
+
+    def get_results(self) -> Dict[str, Any]:
+        analysis = operation_scope(self).state.get("cost")
+        if analysis is None:
+            return {}
+        return {"cost": {"requested": analysis.cost, "maximum": settings.QUERY_MAX_COST}}
@@ -0,0 +1,37 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from strawberry.extensions import SchemaExtension
+from strawberry.types import ExecutionContext
+
+
+@dataclass
+class OperationScope:
+    execution_context: ExecutionContext
+    # per-operation extension state, keyed by extension
+    state: Dict[str, Any] = field(default_factory=dict)
+
+
+_scope: ContextVar[Optional[OperationScope]] = ContextVar("graphql_operation_scope", default=None)
+
+
+class OperationScopeExtension(SchemaExtension):
+    """
+    Strawberry keeps one instance of each extension per schema and repoints its
+    `execution_context` at every new operation, so on the async view a hook that
+    resumes after an await can see another request's context. This binds the
+    operation to the running task before any other hook runs; it must be listed
+    first. The binding outlives on_operation because get_results runs after it.
+    """
+
+    def on_operation(self) -> Iterator[None]:
+        _scope.set(OperationScope(self.execution_context))
+        yield
+
+
+def operation_scope(extension: SchemaExtension) -> OperationScope:
+    scope = _scope.get()
+    if scope is None:
+        raise RuntimeError(f"{type(extension).__name__} needs OperationScopeExtension listed before it")
+    return scope
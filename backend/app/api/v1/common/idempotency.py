@@ -1 +1,208 @@
--a
\ No newline at end of file
+import dataclasses
+import functools
+import hashlib
+import json
+import logging
+import uuid
+from datetime import timedelta
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models
+from django.utils import timezone
+
+from app.api.v1.common.redis import get_redis
+from app.api.v1.orders.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# KEYS: in-flight marker; ARGV: token. A request that outlived its marker must
+# not drop the one another worker holds since.
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotencyError(Exception):
+    pass
+
+
+class _PayloadEncoder(DjangoJSONEncoder):
+    def default(self, o: Any) -> Any:
+        if dataclasses.is_dataclass(o):
+            return dataclasses.asdict(o)
+        if isinstance(o, Enum):
+            return o.value
+        return super().default(o)
+
+
+def _result_key(user_id: int, key: str) -> str:
+    return f"idem:{user_id}:{key}"
+
+
+def _inflight_key(user_id: int, key: str) -> str:
+    return f"idem:inflight:{user_id}:{key}"
+
+
+@functools.lru_cache(maxsize=1)
+def _release_script():
+    return get_redis().register_script(_RELEASE_LUA)
+
+
+def payload_hash(scope: str, arguments: Dict[str, Any]) -> str:
+    raw = json.dumps([scope, arguments], sort_keys=True, cls=_PayloadEncoder)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def dump_model(instance: models.Model) -> Dict[str, Any]:
+    return {"model": instance._meta.label_lower, "pk": instance.pk}
+
+
+def load_model(response: Dict[str, Any]) -> models.Model:
+    return apps.get_model(response["model"])._default_manager.get(pk=response["pk"])
+
+
+def idempotent(
+        scope: str,
+        dump: Callable[[Any], Dict[str, Any]] = dump_model,
+        load: Callable[[Dict[str, Any]], Any] = load_model,
+        gate: Optional[Callable[..., None]] = None,
+) -> Callable:
+    """
+    Makes a mutation resolver replayable under the client's Idempotency-Key header.
+
+    A retry is answered from Redis, or from the IdempotencyKey row when the cache
+    has expired, via `load(response_json)` instead of running the resolver again.
+    A duplicate that arrives while the first request is still running gets an
+    IdempotencyError to retry later. Requests without the header or without a
+    user run as usual.
+
+    The key row is claimed (committed, no response yet) before the resolver runs
+    and filled in after it, so the resolver keeps its own top-level transactions:
+    a redis stock reservation in it is credited back exactly when its own block
+    rolls back, never left behind by a rollback around it.
+
+    `gate(info, **kwargs)` runs once a cached replay is ruled out and before
+    any database work, and raises to turn the request away cheaply.
+    """
+    def decorator(resolver: Callable) -> Callable:
+        @functools.wraps(resolver)
+        def wrapper(self, info, **kwargs):
+            request = info.context.request
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            user = request.user
+            if not key or not user.is_authenticated:
+                return resolver(self, info, **kwargs)
+            if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+                raise IdempotencyError(f"{IDEMPOTENCY_HEADER} is too long.")
+
+            digest = payload_hash(scope, kwargs)
+            cached = _cached_response(user.id, key, digest)
+            if cached is not None:
+                return load(cached)
+            if gate is not None:
+                gate(info, **kwargs)
+
+            client = get_redis()
+            inflight = _inflight_key(user.id, key)
+            token = uuid.uuid4().hex
+            if not client.set(inflight, token, nx=True, ex=settings.IDEMPOTENCY_INFLIGHT_SECONDS):
+                raise IdempotencyError(_IN_PROGRESS)
+
+            try:
+                stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+                if stored is not None:
+                    return load(_stored_response(stored, digest))
+
+                try:
+                    claim = IdempotencyKey.objects.create(
+                        user=user,
+                        key=key,
+                        payload_hash=digest,
+                        response_json=None,
+                        created_at=timezone.now(),
+                    )
+                except IntegrityError as exc:
+                    # another worker claimed the key after our in-flight marker expired
+                    raise IdempotencyError(_IN_PROGRESS) from exc
+
+                try:
+                    result = resolver(self, info, **kwargs)
+                except BaseException:
+                    # nothing was done, the key may be used again
+                    claim.delete()
+                    raise
+                response = dump(result)
+                # a failure here keeps the claim without a response: retries are refused, never run twice
+                IdempotencyKey.objects.filter(id=claim.id).update(response_json=response)
+                _cache_response(user.id, key, digest, response)
+                return result
+            finally:
+                _release_script()(keys=[inflight], args=[token])
+
+        return wrapper
+
+    return decorator
+
+
+_IN_PROGRESS = "Request with this idempotency key is still in progress, retry later."
+
+
+def _check_hash(stored: str, digest: str) -> None:
+    if stored != digest:
+        raise IdempotencyError("Idempotency key was already used with a different payload.")
+
+
+def _cached_response(user_id: int, key: str, digest: str) -> Optional[Dict[str, Any]]:
+    raw = get_redis().get(_result_key(user_id, key))
+    if raw is None:
+        return None
+    cached = json.loads(raw)
+    _check_hash(cached["hash"], digest)
+    return cached["response"]
+
+
+def _cache_response(user_id: int, key: str, digest: str, response: Dict[str, Any]) -> None:
+    get_redis().set(
+        _result_key(user_id, key),
+        json.dumps({"hash": digest, "response": response}, cls=DjangoJSONEncoder),
+        ex=settings.IDEMPOTENCY_TTL_SECONDS,
+    )
+
+
+def _stored_response(stored: IdempotencyKey, digest: str) -> Dict[str, Any]:
+    _check_hash(stored.payload_hash, digest)
+    if stored.response_json is None:
+        # claimed by a request that is running, or that died between its commit and recording the response
+        raise IdempotencyError(_IN_PROGRESS)
+    _cache_response(stored.user_id, stored.key, digest, stored.response_json)
+    return stored.response_json
+
+
+def prune_idempotency_keys(batch_size: int = 5000) -> int:
+    """Deletes keys older than IDEMPOTENCY_TTL_SECONDS in id batches, returns how many went."""
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        count, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+        deleted += count
+        if len(ids) < batch_size:
+            break
+    if deleted:
+        logger.info("Pruned %d idempotency keys older than %s", deleted, cutoff.isoformat())
+    return deleted
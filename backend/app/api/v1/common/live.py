@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from app.api.v1.common.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+STOCK_CHANNEL = "live:stock"
+ORDER_CHANNEL = "live:orders"
+
+_RECONNECT_SECONDS = 1.0
+_MISSING = object()
+
+
+def publish(channel: str, values: Mapping[int, Any]) -> None:
+    """Sends {key: latest value} to every ASGI worker listening on `channel`, one message per call."""
+    if values:
+        get_redis().publish(channel, json.dumps({"values": {str(key): value for key, value in values.items()}}))
+
+
+class _Mailbox:
+    """Latest value of one key for one subscriber; a slow reader skips values instead of queueing them."""
+
+    __slots__ = ("value", "event")
+
+    def __init__(self) -> None:
+        self.value: Any = None
+        self.event = asyncio.Event()
+
+    def put(self, value: Any) -> None:
+        self.value = value
+        self.event.set()
+
+    async def get(self) -> Any:
+        await self.event.wait()
+        self.event.clear()
+        return self.value
+
+
+class LiveHub:
+    """
+    Per-process fan-out of the live channels: one Redis pub/sub connection per
+    ASGI worker, whatever the number of subscribers. An idle subscriber is an
+    asyncio.Event and a dict entry, no task wakes up for it until its key
+    changes. Pushes per key are coalesced to one per `intervals[channel]`
+    seconds; the last value inside the window is sent when it closes.
+    """
+
+    def __init__(self, intervals: Mapping[str, float], listen: bool = True) -> None:
+        self.intervals = dict(intervals)
+        self.listen = listen
+        self._mailboxes: Dict[Tuple[str, int], Set[_Mailbox]] = defaultdict(set)
+        self._sent_at: Dict[Tuple[str, int], float] = {}
+        self._pending: Dict[Tuple[str, int], Any] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(boxes) for boxes in self._mailboxes.values())
+
+    async def stream(
+            self,
+            channel: str,
+            key: int,
+            current: Callable[[], Awaitable[Any]],
+    ) -> AsyncIterator[Any]:
+        """The current value of `key` (unless None), then every coalesced change until closed."""
+        self._ensure_listener()
+        box = _Mailbox()
+        self._mailboxes[(channel, key)].add(box)
+        try:
+            # registered before reading, so a change landing in between is not lost
+            value = await current()
+            if value is not None:
+                yield value
+            while True:
+                yield await box.get()
+        finally:
+            self._unsubscribe(channel, key, box)
+
+    def _unsubscribe(self, channel: str, key: int, box: _Mailbox) -> None:
+        boxes = self._mailboxes.get((channel, key))
+        if boxes is None:
+            return
+        boxes.discard(box)
+        if not boxes:
+            del self._mailboxes[(channel, key)]
+            self._sent_at.pop((channel, key), None)
+            self._pending.pop((channel, key), None)
+
+    def dispatch(self, channel: str, key: int, value: Any) -> None:
+        target = (channel, key)
+        if target not in self._mailboxes:
+            return
+        loop = asyncio.get_running_loop()
+        wait = self._sent_at.get(target, float("-inf")) + self.intervals.get(channel, 0.0) - loop.time()
+        if wait <= 0:
+            self._deliver(target, value, loop.time())
+            return
+        if target not in self._pending:
+            loop.call_later(wait, self._flush, target)
+        self._pending[target] = value
+
+    def _flush(self, target: Tuple[str, int]) -> None:
+        value = self._pending.pop(target, _MISSING)
+        if value is not _MISSING and target in self._mailboxes:
+            self._deliver(target, value, asyncio.get_running_loop().time())
+
+    def _deliver(self, target: Tuple[str, int], value: Any, now: float) -> None:
+        self._sent_at[target] = now
+        for box in self._mailboxes[target]:
+            box.put(value)
+
+    def _ensure_listener(self) -> None:
+        if self.listen and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self) -> None:
+        # pub/sub is fire-and-forget: updates sent while reconnecting are lost, the next change catches up
+        while True:
+            client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self.intervals)
+                async for message in pubsub.listen():
+                    self._on_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Live updates lost their Redis connection, reconnecting", exc_info=True)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(_RECONNECT_SECONDS)
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        if message.get("type") != "message":
+            return
+        try:
+            values = json.loads(message["data"])["values"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Malformed live update on %s", message.get("channel"))
+            return
+        for key, value in values.items():
+            self.dispatch(message["channel"], int(key), value)
+
+
+@lru_cache(maxsize=1)
+def get_hub() -> LiveHub:
+    return LiveHub({
+        STOCK_CHANNEL: 1 / settings.LIVE_STOCK_MAX_PUSHES_PER_SECOND,
+        ORDER_CHANNEL: 0.0,
+    })
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import models
+from strawberry.dataloader import DataLoader
+
+from app.api.v1.catalog.cache import apply_shard_levels
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.orders.models import Order, OrderItem
+
+User = get_user_model()
+
+
+def _by_id(model: type[models.Model], field: str = "id"):
+    async def load(keys: Sequence[int]) -> List[Optional[Any]]:
+        found = {
+            getattr(obj, field): obj
+            async for obj in model._default_manager.filter(**{f"{field}__in": keys})
+        }
+        return [found.get(key) for key in keys]
+
+    return load
+
+
+async def _load_stock(product_ids: Sequence[int]) -> List[Optional[Stock]]:
+    stocks = await _by_id(Stock, "product_id")(product_ids)
+    if any(stock is not None and stock.shards for stock in stocks):
+        await sync_to_async(apply_shard_levels)(stocks)
+    return stocks
+
+
+async def _load_items(order_ids: Sequence[int]) -> List[List[OrderItem]]:
+    grouped: Dict[int, List[OrderItem]] = defaultdict(list)
+    async for item in OrderItem.objects.filter(order_id__in=order_ids).order_by("id"):
+        grouped[item.order_id].append(item)
+    return [grouped[order_id] for order_id in order_ids]
+
+
+class Loaders:
+    """Per-request DataLoaders, one batched query per relation and nesting level."""
+
+    def __init__(self) -> None:
+        self.product = DataLoader(load_fn=_by_id(Product))
+        self.stock_by_product = DataLoader(load_fn=_load_stock)
+        self.order = DataLoader(load_fn=_by_id(Order))
+        self.items_by_order = DataLoader(load_fn=_load_items)
+        self.user = DataLoader(load_fn=_by_id(User))
+
+
+async def load_related(instance: models.Model, name: str, loader: DataLoader, key: Any) -> Any:
+    """
+    Returns relation `name` if the root queryset already fetched it (select_related
+    or prefetch_related), otherwise batches it through `loader`.
+    """
+    prefetched = getattr(instance, "_prefetched_objects_cache", {})
+    if name in prefetched:
+        return list(prefetched[name])
+    if name in instance._state.fields_cache:
+        return instance._state.fields_cache[name]
+    return await loader.load(key)
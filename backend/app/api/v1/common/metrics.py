@@ -0,0 +1,117 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+from app.api.v1.catalog.cache import cache_stats
+from app.api.v1.common.persisted_queries import document_stats
+from app.api.v1.common.stats import BatchedCounters, read_counters
+
+METRICS_KEY = "metrics:graphql"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help); samples are stored in METRICS_KEY under their exposition name
+METRICS: Dict[str, Tuple[str, str]] = {
+    "graphql_operation_duration_seconds": ("histogram", "Wall time of sampled GraphQL operations."),
+    "graphql_operation_errors_total": ("counter", "Errors returned by sampled operations."),
+    "graphql_operation_sql_queries_total": ("counter", "SQL statements run by sampled operations."),
+    "graphql_operation_sql_seconds_total": ("counter", "SQL time of sampled operations."),
+    "graphql_operation_lock_seconds_total": (
+        "counter",
+        "Time of row-locking statements (FOR UPDATE, UPDATE, DELETE) in sampled operations.",
+    ),
+    "graphql_field_calls_total": ("counter", "Resolver calls in sampled operations."),
+    "graphql_field_seconds_total": ("counter", "Resolver wall time, children excluded."),
+    "graphql_field_sql_queries_total": ("counter", "SQL statements run by a resolver."),
+    "graphql_field_sql_seconds_total": ("counter", "SQL time of a resolver."),
+}
+
+_LE = re.compile(r',?le="([^"]+)"')
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def sample_name(name: str, labels: Dict[str, str]) -> str:
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsRecorder:
+    """Counters and histograms of the exposition above, batched into METRICS_KEY."""
+
+    def __init__(self) -> None:
+        self.counters = BatchedCounters(METRICS_KEY, flush_every=2000, flush_seconds=5.0)
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1) -> bool:
+        return self.counters.add(sample_name(name, labels), amount)
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> bool:
+        for le in DURATION_BUCKETS:
+            # every bucket exists from the first observation on, as a client library would export it
+            self.counters.add(sample_name(f"{name}_bucket", {**labels, "le": repr(le)}), 1 if value <= le else 0)
+        self.counters.add(sample_name(f"{name}_bucket", {**labels, "le": "+Inf"}))
+        self.counters.add(sample_name(f"{name}_sum", labels), value)
+        return self.counters.add(sample_name(f"{name}_count", labels))
+
+    def flush(self) -> None:
+        self.counters.flush()
+
+
+@lru_cache(maxsize=1)
+def get_metrics() -> MetricsRecorder:
+    return MetricsRecorder()
+
+
+def _sort_key(sample: str) -> Tuple[str, float]:
+    # buckets in increasing le order within each label set
+    match = _LE.search(sample)
+    if match is None:
+        return sample, 0.0
+    le = match.group(1)
+    return _LE.sub("", sample), float("inf") if le == "+Inf" else float(le)
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of the shared counters, the same from every worker."""
+    get_metrics().flush()
+    samples = read_counters(METRICS_KEY)
+    grouped: Dict[str, List[str]] = {name: [] for name in METRICS}
+    for sample in samples:
+        base = sample.split("{", 1)[0]
+        for suffix in ("_bucket", "_sum", "_count"):
+            if base.endswith(suffix) and base[: -len(suffix)] in METRICS:
+                base = base[: -len(suffix)]
+                break
+        if base in grouped:
+            grouped[base].append(sample)
+
+    lines: List[str] = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f"{sample} {_format(samples[sample])}" for sample in sorted(grouped[name], key=_sort_key)]
+
+    lines += [
+        "# HELP graphql_trace_sample_rate Share of operations traced into the metrics above.",
+        "# TYPE graphql_trace_sample_rate gauge",
+        f"graphql_trace_sample_rate {settings.TRACING_SAMPLE_RATE}",
+    ]
+    for name, stats, help_text in (
+        ("graphql_document_cache", document_stats(), "Persisted query and parsed-document cache"),
+        ("catalog_cache", cache_stats(), "Catalog read-through cache"),
+    ):
+        events = {event: value for event, value in stats.items() if not event.endswith("_seconds")}
+        seconds = {event[: -len("_seconds")]: value for event, value in stats.items() if event.endswith("_seconds")}
+        for suffix, values, what in (("events_total", events, "events"), ("seconds_total", seconds, "time")):
+            if not values:
+                continue
+            lines += [f"# HELP {name}_{suffix} {help_text} {what}.", f"# TYPE {name}_{suffix} counter"]
+            for event, value in sorted(values.items()):
+                lines.append(f"{sample_name(f'{name}_{suffix}', {'event': event})} {_format(float(value))}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from app.api.v1.common.redis import get_redis
+from app.api.v1.orders.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_METRICS_KEY = "outbox:metrics"
+
+# topic -> in-process callbacks run by the relay after a batch is committed
+_handlers: Dict[str, List[Callable[[List[Dict[str, Any]]], None]]] = defaultdict(list)
+
+
+def register_handler(topic: str) -> Callable:
+    """Subscribes `fn(payloads)` to a topic; handler errors are logged, never block the relay."""
+    def decorator(fn: Callable[[List[Dict[str, Any]]], None]) -> Callable:
+        _handlers[topic].append(fn)
+        return fn
+
+    return decorator
+
+
+def _run_handlers(events: List[OutboxEvent]) -> None:
+    by_topic: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for event in events:
+        if event.topic in _handlers:
+            by_topic[event.topic].append(event.payload)
+    for topic, payloads in by_topic.items():
+        for handler in _handlers[topic]:
+            try:
+                handler(payloads)
+            except Exception:
+                logger.exception("Outbox handler %s failed for topic %s", handler.__name__, topic)
+
+
+def stream_key(topic: str) -> str:
+    return f"{settings.OUTBOX_STREAM_PREFIX}{topic}"
+
+
+def _claim_and_publish(batch_size: int) -> int:
+    """
+    Publishes one batch inside one transaction. SKIP LOCKED lets parallel relays
+    claim disjoint batches; a batch whose commit fails is published again
+    (at-least-once), consumers dedupe on the `id` field.
+    """
+    with transaction.atomic():
+        events: List[OutboxEvent] = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(published_at__isnull=True)
+            .order_by("created_at", "id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        pipe = get_redis().pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                stream_key(event.topic),
+                {
+                    "id": event.id,
+                    "topic": event.topic,
+                    "payload": json.dumps(event.payload, cls=DjangoJSONEncoder),
+                    "created_at": event.created_at.isoformat(),
+                },
+                maxlen=settings.OUTBOX_STREAM_MAXLEN,
+                approximate=True,
+            )
+        pipe.execute()
+
+        now = timezone.now()
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(published_at=now)
+
+    _record_batch(len(events), (now - events[0].created_at).total_seconds())
+    _run_handlers(events)
+    return len(events)
+
+
+def _record_batch(size: int, lag_seconds: float) -> None:
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hincrby(OUTBOX_METRICS_KEY, "published_total", size)
+    pipe.hincrby(OUTBOX_METRICS_KEY, "batches_total", 1)
+    pipe.hset(
+        OUTBOX_METRICS_KEY,
+        mapping={"last_batch_size": size, "last_lag_seconds": round(lag_seconds, 3)},
+    )
+    pipe.execute()
+    logger.debug("Outbox batch published: size=%d lag=%.3fs", size, lag_seconds)
+
+
+def relay_outbox(batch_size: int | None = None, max_batches: int | None = None) -> int:
+    """Drains unpublished events batch by batch, returns how many were published."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_batches = max_batches or settings.OUTBOX_MAX_BATCHES_PER_RUN
+    published = 0
+    for _ in range(max_batches):
+        count = _claim_and_publish(batch_size)
+        published += count
+        if count < batch_size:
+            break
+    return published
+
+
+def outbox_metrics() -> Dict[str, float]:
+    """Relay counters plus the current backlog and lag of the oldest unpublished event."""
+    metrics: Dict[str, float] = {
+        key: float(value) for key, value in get_redis().hgetall(OUTBOX_METRICS_KEY).items()
+    }
+    pending = OutboxEvent.objects.filter(published_at__isnull=True)
+    oldest = pending.order_by("created_at").values_list("created_at", flat=True).first()
+    metrics["pending"] = pending.count()
+    metrics["lag_seconds"] = (
+        round((timezone.now() - oldest).total_seconds(), 3) if oldest is not None else 0.0
+    )
+    metrics["measured_at"] = time.time()
+    return metrics
@@ -0,0 +1,64 @@
+import base64
+import json
+from typing import Any, Callable, Generic, List, Optional, Sequence, TypeVar
+
+import strawberry
+from django.conf import settings
+from graphql import GraphQLError
+
+T = TypeVar("T")
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+
+
+def clamp_page_size(size: int) -> int:
+    if size <= 0:
+        raise GraphQLError("Page size must be > 0.")
+    return min(size, settings.PAGINATION_MAX_PAGE_SIZE)
+
+
+def encode_cursor(*values: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """The values of a cursor made by encode_cursor, one per type in `types`; GraphQLError when they do not match."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as exc:
+        raise GraphQLError("Invalid cursor.") from exc
+    if not isinstance(values, list) or len(values) != len(types):
+        raise GraphQLError("Invalid cursor.")
+    # bool is an int to isinstance, a crafted true/false is not an id
+    if any(type(value) is not expected for value, expected in zip(values, types)):
+        raise GraphQLError("Invalid cursor.")
+    return values
+
+
+def build_connection(rows: Sequence[T], first: int, cursor_of: Callable[[T], str]) -> Connection[T]:
+    """`rows` is the seek query sliced to first + 1, the extra row only signals a next page."""
+    page = list(rows[:first])
+    edges = [Edge(cursor=cursor_of(row), node=row) for row in page]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=len(rows) > first,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
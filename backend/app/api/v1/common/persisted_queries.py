@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from graphql import DocumentNode, GraphQLError
+from strawberry.extensions import SchemaExtension
+
+from app.api.v1.common.extensions import operation_scope
+from app.api.v1.common.redis import get_redis
+from app.api.v1.common.stats import BatchedCounters, read_counters
+
+logger = logging.getLogger(__name__)
+
+APQ_KEY_PREFIX = "apq:"
+STATS_KEY = "graphql:documents:stats"
+
+
+class PersistedQueryNotFound(GraphQLError):
+    """Clients following the Apollo APQ protocol retry with the full query on this message."""
+
+    def __init__(self) -> None:
+        super().__init__("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+
+
+class PersistedQueryMismatch(GraphQLError):
+    def __init__(self) -> None:
+        super().__init__(
+            "provided sha does not match query",
+            extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"},
+        )
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def apq_key(document_hash: str) -> str:
+    return f"{APQ_KEY_PREFIX}{document_hash}"
+
+
+@dataclass
+class _Document:
+    query: str
+    document: DocumentNode
+    parse_seconds: float
+    validate_seconds: float = 0.0
+    validated: bool = False
+
+
+class DocumentCache:
+    """
+    Per-process LRU of parsed documents keyed by the sha256 of their text. An
+    entry is marked validated once it passed validation against this schema,
+    later requests for it skip both steps.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self._data: "OrderedDict[str, _Document]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.stats = BatchedCounters(STATS_KEY)
+
+    def get(self, document_hash: str) -> Optional[_Document]:
+        with self._lock:
+            entry = self._data.get(document_hash)
+            if entry is not None:
+                self._data.move_to_end(document_hash)
+            return entry
+
+    def set(self, document_hash: str, entry: _Document) -> None:
+        with self._lock:
+            self._data[document_hash] = entry
+            self._data.move_to_end(document_hash)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@lru_cache(maxsize=1)
+def get_document_cache() -> DocumentCache:
+    return DocumentCache(settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+def document_stats() -> Dict[str, float]:
+    """
+    Shared counters: parse/validate hits and misses, APQ lookups and
+    registrations, and *_saved_seconds, the parse/validate CPU time measured on
+    first sight of each document, summed over every later hit. Thread CPU time
+    rather than wall time, which under load mostly measures GIL waits.
+    """
+    get_document_cache().stats.flush()
+    return read_counters(STATS_KEY)
+
+
+def _lookup(document_hash: str) -> Optional[str]:
+    try:
+        return get_redis().getex(apq_key(document_hash), ex=settings.APQ_TTL_SECONDS)
+    except redis.RedisError:
+        logger.warning("Persisted query store unavailable", exc_info=True)
+        return None
+
+
+def _register(document_hash: str, query: str) -> None:
+    try:
+        get_redis().set(apq_key(document_hash), query, ex=settings.APQ_TTL_SECONDS)
+    except redis.RedisError:
+        logger.warning("Could not register persisted query %s", document_hash, exc_info=True)
+
+
+@dataclass
+class _State:
+    document_hash: Optional[str] = None
+    entry: Optional[_Document] = None
+    register: bool = False
+
+
+class PersistedQueryExtension(SchemaExtension):
+    """
+    Automatic persisted queries plus the document cache.
+
+    A request may carry `extensions.persistedQuery.sha256Hash` without a query;
+    the text is resolved from the local cache or Redis, or the client gets
+    PersistedQueryNotFound and resends with the query, which registers it once
+    it validates. Any document seen before skips parsing and validation.
+    """
+
+    async def on_operation(self) -> AsyncIterator[None]:
+        scope = operation_scope(self)
+        context = scope.execution_context
+        cache = get_document_cache()
+        state = scope.state["persisted_query"] = _State()
+
+        persisted = (context.operation_extensions or {}).get("persistedQuery")
+        sent_hash = persisted.get("sha256Hash") if isinstance(persisted, dict) else None
+        if context.query:
+            state.document_hash = query_hash(context.query)
+            if sent_hash is not None:
+                if sent_hash != state.document_hash:
+                    raise PersistedQueryMismatch()
+                state.register = True
+        elif sent_hash:
+            entry = cache.get(sent_hash)
+            query = entry.query if entry is not None else await sync_to_async(_lookup)(sent_hash)
+            cache.stats.incr("apq_hits" if query is not None else "apq_misses")
+            if query is None:
+                raise PersistedQueryNotFound()
+            context.query = query
+            state.document_hash = sent_hash
+        yield
+
+    def on_parse(self) -> Iterator[None]:
+        scope = operation_scope(self)
+        context = scope.execution_context
+        state: _State = scope.state["persisted_query"]
+        cache = get_document_cache()
+        entry = cache.get(state.document_hash) if state.document_hash else None
+        if entry is not None:
+            context.graphql_document = entry.document
+            state.entry = entry
+            cache.stats.incr("parse_hits")
+            cache.stats.incr("parse_saved_seconds", entry.parse_seconds)
+            yield
+            return
+
+        started = time.thread_time()
+        yield
+        if context.graphql_document is not None and state.document_hash:
+            state.entry = _Document(context.query, context.graphql_document, time.thread_time() - started)
+            cache.set(state.document_hash, state.entry)
+            cache.stats.incr("parse_misses")
+
+    async def on_validate(self) -> AsyncIterator[None]:
+        scope = operation_scope(self)
+        context = scope.execution_context
+        state: _State = scope.state["persisted_query"]
+        cache = get_document_cache()
+        entry = state.entry
+        if entry is not None and entry.validated:
+            # strawberry only validates while pre_execution_errors is unset
+            context.pre_execution_errors = []
+            cache.stats.incr("validate_hits")
+            cache.stats.incr("validate_saved_seconds", entry.validate_seconds)
+            yield
+        else:
+            started = time.thread_time()
+            yield
+            if entry is None or context.pre_execution_errors:
+                return
+            entry.validate_seconds = time.thread_time() - started
+            entry.validated = True
+            cache.stats.incr("validate_misses")
+
+        if state.register:
+            await sync_to_async(_register)(state.document_hash, entry.query)
+            cache.stats.incr("apq_registered")
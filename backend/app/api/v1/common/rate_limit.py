@@ -0,0 +1,192 @@
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from graphql import FieldNode, GraphQLError, OperationDefinitionNode
+from strawberry.extensions import SchemaExtension
+from strawberry.types import ExecutionContext
+
+from app.api.v1.common.extensions import operation_scope
+from app.api.v1.common.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS = buckets; ARGV = rate (tokens/s), burst, cost for each bucket
+# Consumes from every bucket or from none, returns {0, 0} or {retry_after_ms, bucket index}
+_TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local levels = {}
+local retry, blocked = 0, 0
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[3 * i - 2])
+    local burst = tonumber(ARGV[3 * i - 1])
+    local cost = tonumber(ARGV[3 * i])
+    local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+    if tokens < cost then
+        local wait = math.ceil((cost - tokens) * 1000 / rate)
+        if wait > retry then
+            retry, blocked = wait, i
+        end
+    end
+    levels[i] = tokens
+end
+if retry > 0 then
+    return {retry, blocked}
+end
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[3 * i - 2])
+    local burst = tonumber(ARGV[3 * i - 1])
+    redis.call('HSET', KEYS[i], 'tokens', levels[i] - tonumber(ARGV[3 * i]), 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(burst * 1000 / rate) + 1000)
+end
+return {0, 0}
+"""
+
+
+class RateLimited(GraphQLError):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            "Too many requests, retry later.",
+            extensions={"code": "RATE_LIMITED", "retryAfter": round(retry_after, 3)},
+        )
+        self.retry_after = retry_after
+
+
+class _LocalBlocklist:
+    """Buckets Redis already rejected, so their repeats are refused without a round trip."""
+
+    def __init__(self, max_size: int = 50_000) -> None:
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._max_size = max_size
+
+    def retry_after(self, keys: List[str]) -> float:
+        now = time.monotonic()
+        until = max((self._until.get(key, 0.0) for key in keys), default=0.0)
+        return until - now if until > now else 0.0
+
+    def block(self, key: str, seconds: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self._max_size:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+            self._until[key] = now + seconds
+
+
+class TokenBucketLimiter:
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or get_redis()
+        self._script = self.client.register_script(_TOKEN_BUCKET_LUA)
+        self.local = _LocalBlocklist()
+
+    def check(self, buckets: List[Tuple[str, float, float, int]]) -> float:
+        """
+        buckets: (key, rate per second, burst, cost). Returns 0 when the request
+        is admitted, otherwise the seconds to wait. One Redis call per check.
+        """
+        keys = [key for key, _, _, _ in buckets]
+        retry_after = self.local.retry_after(keys)
+        if retry_after:
+            return retry_after
+
+        args: List[float] = []
+        for _, rate, burst, cost in buckets:
+            args.extend((rate, burst, cost))
+        try:
+            retry_ms, index = self._script(keys=keys, args=args)
+        except redis.RedisError:
+            logger.warning("Rate limiter unavailable, admitting request", exc_info=True)
+            return 0.0
+
+        if not retry_ms:
+            return 0.0
+        retry_after = retry_ms / 1000
+        self.local.block(keys[index - 1], retry_after)
+        return retry_after
+
+
+@lru_cache(maxsize=1)
+def get_limiter() -> TokenBucketLimiter:
+    return TokenBucketLimiter()
+
+
+def _root_scopes(operation: OperationDefinitionNode) -> Counter:
+    """One token per root field, named fields (createOrder) have their own limits."""
+    default = operation.operation.value
+    scopes: Counter = Counter()
+    for selection in operation.selection_set.selections:
+        name = selection.name.value if isinstance(selection, FieldNode) else default
+        scopes[name if name in settings.RATE_LIMITS else default] += 1
+    return scopes
+
+
+def _client_ip(request) -> str:
+    return request.META.get("REMOTE_ADDR") or "unknown"
+
+
+class RateLimitExtension(SchemaExtension):
+    """
+    Token buckets per (scope, user) and (scope, IP) checked before execution.
+    Scope is the root field name when RATE_LIMITS has an entry for it
+    (createOrder), otherwise the operation type (query, mutation).
+    """
+
+    async def on_execute(self) -> AsyncIterator[None]:
+        if settings.RATE_LIMIT_ENABLED:
+            # request.user and the Redis call are blocking, keep them off the event loop
+            await sync_to_async(self._check)(operation_scope(self).execution_context)
+        yield
+
+    def _check(self, context: ExecutionContext) -> None:
+        document = context.graphql_document
+        if document is None:
+            return
+        operation = next(
+            (
+                d for d in document.definitions
+                if isinstance(d, OperationDefinitionNode)
+                and (context.operation_name is None or (d.name and d.name.value == context.operation_name))
+            ),
+            None,
+        )
+        if operation is None:
+            return
+
+        request = context.context.request
+        user = getattr(request, "user", None)
+        identities = [f"ip:{_client_ip(request)}"]
+        if user is not None and user.is_authenticated:
+            identities.append(f"u:{user.id}")
+
+        buckets: List[Tuple[str, float, float, int]] = []
+        for scope, cost in _root_scopes(operation).items():
+            limit = settings.RATE_LIMITS[scope]
+            for identity in identities:
+                burst = limit["burst"]
+                rate = limit["rate"]
+                if identity.startswith("ip:"):
+                    # several users can share one address (NAT, mobile carriers)
+                    burst *= settings.RATE_LIMIT_IP_MULTIPLIER
+                    rate *= settings.RATE_LIMIT_IP_MULTIPLIER
+                buckets.append((f"rl:{scope}:{identity}", rate, burst, cost))
+
+        retry_after = get_limiter().check(buckets)
+        if not retry_after:
+            return
+
+        response = getattr(context.context, "response", None)
+        if response is not None:
+            response.status_code = 429
+            response["Retry-After"] = str(math.ceil(retry_after))
+        raise RateLimited(retry_after)
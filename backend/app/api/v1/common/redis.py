@@ -0,0 +1,155 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+STOCK_KEY_PREFIX = "stock:"
+STOCK_DIRTY_KEY = "stock:dirty"
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def stock_key(product_id: int) -> str:
+    return f"{STOCK_KEY_PREFIX}{product_id}"
+
+
+# ---- Errors ----
+class StockError(Exception):
+    pass
+
+
+class StockNotLoaded(StockError):
+    def __init__(self, product_id: int) -> None:
+        super().__init__(f"Stock counter for product {product_id} is not loaded")
+        self.product_id = product_id
+
+
+class InsufficientStock(StockError):
+    def __init__(self, product_id: int, requested: int, available: int) -> None:
+        super().__init__(
+            f"Insufficient stock for product {product_id}: requested {requested}, available {available}"
+        )
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+# ---- Lua ----
+# KEYS[1] = dirty set, KEYS[2..n] = stock counters
+# ARGV = product_id, qty pairs in the same order as the counters
+_RESERVE_LUA = """
+local n = #KEYS - 1
+for i = 1, n do
+    local available = redis.call('GET', KEYS[i + 1])
+    if not available then
+        return {-1, i, 0}
+    end
+    available = tonumber(available)
+    if available < tonumber(ARGV[2 * i]) then
+        return {0, i, available}
+    end
+end
+for i = 1, n do
+    redis.call('DECRBY', KEYS[i + 1], ARGV[2 * i])
+    redis.call('SADD', KEYS[1], ARGV[2 * i - 1])
+end
+return {1, 0, 0}
+"""
+
+# Only counters that are still loaded are credited back, the product ids of
+# missing ones are returned so the caller can credit the Stock table instead.
+_RELEASE_LUA = """
+local missing = {}
+for i = 1, #KEYS - 1 do
+    if redis.call('EXISTS', KEYS[i + 1]) == 1 then
+        redis.call('INCRBY', KEYS[i + 1], ARGV[2 * i])
+        redis.call('SADD', KEYS[1], ARGV[2 * i - 1])
+    else
+        table.insert(missing, ARGV[2 * i - 1])
+    end
+end
+return missing
+"""
+
+
+class StockEngine:
+    """
+    Atomic multi-SKU stock counters kept in Redis.
+
+    A whole cart is checked and decremented by one Lua script, so a hot SKU
+    never waits on a Postgres row lock. Touched products are recorded in
+    STOCK_DIRTY_KEY and written back to the Stock table by catalog.sync_stock.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or get_redis()
+        self._reserve = self.client.register_script(_RESERVE_LUA)
+        self._release = self.client.register_script(_RELEASE_LUA)
+
+    @staticmethod
+    def _script_args(quantities: Mapping[int, int]) -> Tuple[List[str], List[int]]:
+        product_ids = sorted(quantities)
+        keys = [STOCK_DIRTY_KEY] + [stock_key(pid) for pid in product_ids]
+        args: List[int] = []
+        for pid in product_ids:
+            args.extend((pid, quantities[pid]))
+        return keys, args
+
+    def reserve(self, quantities: Mapping[int, int]) -> None:
+        """quantities: product_id -> qty, product ids must be unique."""
+        if not quantities:
+            return
+        keys, args = self._script_args(quantities)
+        status, index, available = self._reserve(keys=keys, args=args)
+        if status == 1:
+            return
+
+        product_id = int(args[2 * (index - 1)])
+        if status == -1:
+            raise StockNotLoaded(product_id)
+        raise InsufficientStock(product_id, quantities[product_id], int(available))
+
+    def release(self, quantities: Mapping[int, int]) -> List[int]:
+        """Gives stock back, returns product ids whose counters are not loaded."""
+        if not quantities:
+            return []
+        keys, args = self._script_args(quantities)
+        return [int(pid) for pid in self._release(keys=keys, args=args)]
+
+    def load(self, levels: Mapping[int, int], overwrite: bool = False) -> None:
+        """Seeds counters from the Stock table; existing counters win unless overwrite is set."""
+        if not levels:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for product_id, available in levels.items():
+            pipe.set(stock_key(product_id), available, nx=not overwrite)
+        pipe.execute()
+
+    def get(self, product_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        values = self.client.mget([stock_key(pid) for pid in product_ids])
+        return {
+            pid: int(value) if value is not None else None
+            for pid, value in zip(product_ids, values)
+        }
+
+    def pop_dirty(self, count: int) -> List[int]:
+        return [int(pid) for pid in self.client.spop(STOCK_DIRTY_KEY, count) or []]
+
+    def is_dirty(self, product_ids: Iterable[int]) -> Dict[int, bool]:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        flags = self.client.smismember(STOCK_DIRTY_KEY, product_ids)
+        return {pid: bool(flag) for pid, flag in zip(product_ids, flags)}
+
+
+@lru_cache(maxsize=1)
+def get_stock_engine() -> StockEngine:
+    return StockEngine()
@@ -0,0 +1,55 @@
+from typing import AsyncIterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from strawberry.extensions import SchemaExtension
+from strawberry.types.graphql import OperationType
+
+from app.api.v1.common.extensions import operation_scope
+from app.core.db import replica_health, start_replica_reads, stop_replica_reads
+
+# set on mutation responses, while present the client reads its own writes from the primary
+STICKY_COOKIE = "db_primary"
+
+
+class ReplicaReadExtension(SchemaExtension):
+    """
+    Routes the ORM reads of query operations to a healthy replica. A mutation
+    pins its client to the primary for REPLICA_STICKY_SECONDS through a
+    cookie, so an order is visible in myOrders right after createOrder
+    whatever the replication lag.
+    """
+
+    async def on_execute(self) -> AsyncIterator[None]:
+        context = operation_scope(self).execution_context
+        try:
+            operation_type = context.operation_type
+        except RuntimeError:
+            yield
+            return
+        request = context.context.request
+
+        if (
+                operation_type == OperationType.QUERY
+                and settings.DATABASE_REPLICAS
+                and STICKY_COOKIE not in request.COOKIES
+        ):
+            # a due health probe is a blocking query
+            alias = await sync_to_async(replica_health.pick)()
+            token = start_replica_reads(alias)
+            try:
+                yield
+            finally:
+                stop_replica_reads(token)
+            return
+
+        yield
+        response = getattr(context.context, "response", None)
+        if operation_type == OperationType.MUTATION and response is not None and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
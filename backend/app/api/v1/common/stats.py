@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from app.api.v1.common.redis import get_redis
+
+
+class BatchedCounters:
+    """
+    In-process counters, flushed to a shared Redis hash every `flush_every`
+    updates, or once `flush_seconds` passed since the last flush if given.
+    """
+
+    def __init__(self, key: str, flush_every: int = 200, flush_seconds: Optional[float] = None) -> None:
+        self.key = key
+        self._counts: Counter = Counter()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+
+    def add(self, name: str, amount: float = 1) -> bool:
+        """Records without writing; returns True once a flush is due."""
+        with self._lock:
+            self._counts[name] += amount
+            self._pending += 1
+            return self._pending >= self.flush_every or (
+                self.flush_seconds is not None and time.monotonic() - self._flushed_at >= self.flush_seconds
+            )
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        if self.add(name, amount):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts, self._pending = self._counts, Counter(), 0
+            self._flushed_at = time.monotonic()
+        if counts:
+            self._write(counts)
+
+    def _write(self, counts: Counter) -> None:
+        pipe = get_redis().pipeline(transaction=False)
+        for field, value in counts.items():
+            if isinstance(value, int):
+                pipe.hincrby(self.key, field, value)
+            else:
+                pipe.hincrbyfloat(self.key, field, value)
+        pipe.execute()
+
+
+def read_counters(key: str) -> Dict[str, float]:
+    return {field: float(value) for field, value in get_redis().hgetall(key).items()}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile, `pct` in [0, 1]; 0.0 without samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
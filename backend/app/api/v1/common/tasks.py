@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from app.api.v1.common.idempotency import prune_idempotency_keys
+from app.api.v1.common.outbox import relay_outbox
+
+
+@shared_task(name="common.relay_outbox", ignore_result=True)
+def relay_outbox_task() -> int:
+    return relay_outbox()
+
+
+@shared_task(name="common.prune_idempotency_keys")
+def prune_idempotency_keys_task() -> int:
+    return prune_idempotency_keys()
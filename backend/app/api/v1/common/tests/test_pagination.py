@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+from graphql import GraphQLError
+
+from app.api.v1.common.pagination import decode_cursor, encode_cursor
+
+
+class DecodeCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        cursor = encode_cursor("2026-01-01T00:00:00+00:00", 7)
+        self.assertEqual(decode_cursor(cursor, str, int), ["2026-01-01T00:00:00+00:00", 7])
+
+    def test_rejects_garbage(self):
+        for cursor in ("", "not-a-cursor", encode_cursor(1, 2)[:-2]):
+            with self.subTest(cursor=cursor), self.assertRaises(GraphQLError):
+                decode_cursor(cursor, int)
+
+    def test_rejects_wrong_arity(self):
+        with self.assertRaises(GraphQLError):
+            decode_cursor(encode_cursor(1, 2), int)
+
+    def test_rejects_wrong_types(self):
+        for values in (("1",), (True,), (1.5,), (None,), ([1],)):
+            with self.subTest(values=values), self.assertRaises(GraphQLError):
+                decode_cursor(encode_cursor(*values), int)
+        with self.assertRaises(GraphQLError):
+            decode_cursor(encode_cursor(1, 2), str, int)
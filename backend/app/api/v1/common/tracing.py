@@ -0,0 +1,157 @@
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from inspect import isawaitable
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from graphql import GraphQLResolveInfo
+from strawberry.extensions import SchemaExtension
+from strawberry.extensions.tracing.utils import should_skip_tracing
+from strawberry.types import ExecutionContext
+
+from app.api.v1.common.extensions import operation_scope
+from app.api.v1.common.metrics import get_metrics
+from app.core.logging import SQLStats, record_sql, start_recording, stop_recording
+
+logger = logging.getLogger(__name__)
+
+# fields logged per operation, slowest first
+LOGGED_FIELDS = 10
+
+
+@dataclass
+class _FieldTrace:
+    calls: int = 0
+    seconds: float = 0.0
+    sql: SQLStats = field(default_factory=SQLStats)
+
+
+@dataclass
+class _Trace:
+    sql: SQLStats = field(default_factory=SQLStats)
+    fields: Dict[str, _FieldTrace] = field(default_factory=dict)
+
+
+# (parent type, field) -> whether the resolver is trivial (attribute access, introspection)
+_skipped: Dict[Tuple[str, str], bool] = {}
+
+
+def _skip(resolver: Callable, info: GraphQLResolveInfo) -> bool:
+    key = (info.parent_type.name, info.field_name)
+    skip = _skipped.get(key)
+    if skip is None:
+        skip = _skipped[key] = key[0].startswith("__") or should_skip_tracing(resolver, info)
+    return skip
+
+
+def _operation(context: ExecutionContext) -> Tuple[str, str]:
+    try:
+        operation_type = context.operation_type.value
+    except (RuntimeError, ValueError, AttributeError):
+        operation_type = "unknown"
+    return context.operation_name or "anonymous", operation_type
+
+
+class TracingExtension(SchemaExtension):
+    """
+    Samples TRACING_SAMPLE_RATE of operations and records wall time, SQL count,
+    SQL time and row-lock time per operation and per resolver (trivial field
+    resolvers are skipped). Results go to the Prometheus counters served at
+    /metrics/ and to one structured log line per traced operation.
+    """
+
+    async def on_operation(self) -> AsyncIterator[None]:
+        scope = operation_scope(self)
+        rate = settings.TRACING_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            yield
+            return
+
+        trace = scope.state["trace"] = _Trace()
+        started = time.perf_counter()
+        with record_sql(trace.sql):
+            yield
+        elapsed = time.perf_counter() - started
+        await self._report(scope.execution_context, trace, elapsed)
+
+    def resolve(self, _next: Callable, root: Any, info: GraphQLResolveInfo, *args: Any, **kwargs: Any) -> Any:
+        trace = operation_scope(self).state.get("trace")
+        if trace is None or _skip(_next, info):
+            return _next(root, info, *args, **kwargs)
+
+        key = f"{info.parent_type.name}.{info.field_name}"
+        field_trace = trace.fields.get(key)
+        if field_trace is None:
+            field_trace = trace.fields[key] = _FieldTrace()
+        started = time.perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        if isawaitable(result):
+            return self._await(result, trace, field_trace, started)
+        # the ORM refuses to run on the event loop, only awaited resolvers can reach SQL
+        field_trace.calls += 1
+        field_trace.seconds += time.perf_counter() - started
+        return result
+
+    @staticmethod
+    async def _await(result: Awaitable, trace: _Trace, field_trace: _FieldTrace, started: float) -> Any:
+        # sync_to_async and the async ORM pick up the recording from the awaiting context
+        token = start_recording(trace.sql, field_trace.sql)
+        try:
+            return await result
+        finally:
+            stop_recording(token)
+            field_trace.calls += 1
+            field_trace.seconds += time.perf_counter() - started
+
+    @staticmethod
+    async def _report(context: ExecutionContext, trace: _Trace, elapsed: float) -> None:
+        name, operation_type = _operation(context)
+        if operation_type == "subscription":
+            # lasts as long as the client keeps it open, its duration says nothing about latency
+            return
+        errors = len(context.pre_execution_errors or [])
+        labels = {"operation": name, "type": operation_type}
+        metrics = get_metrics()
+        due = metrics.observe("graphql_operation_duration_seconds", labels, elapsed)
+        metrics.inc("graphql_operation_sql_queries_total", labels, trace.sql.queries)
+        metrics.inc("graphql_operation_sql_seconds_total", labels, trace.sql.seconds)
+        metrics.inc("graphql_operation_lock_seconds_total", labels, trace.sql.lock_seconds)
+        if errors:
+            metrics.inc("graphql_operation_errors_total", labels, errors)
+        for key, field_trace in trace.fields.items():
+            field_labels = {"field": key}
+            metrics.inc("graphql_field_calls_total", field_labels, field_trace.calls)
+            metrics.inc("graphql_field_seconds_total", field_labels, field_trace.seconds)
+            metrics.inc("graphql_field_sql_queries_total", field_labels, field_trace.sql.queries)
+            due = metrics.inc("graphql_field_sql_seconds_total", field_labels, field_trace.sql.seconds) or due
+        if due:
+            await sync_to_async(metrics.flush)()
+
+        if elapsed * 1000 < settings.TRACING_LOG_MIN_MS:
+            return
+        slowest = sorted(trace.fields.items(), key=lambda item: item[1].seconds, reverse=True)[:LOGGED_FIELDS]
+        logger.info(
+            "graphql operation",
+            extra={
+                "operation": name,
+                "operation_type": operation_type,
+                "duration_ms": round(elapsed * 1000, 3),
+                "sql_queries": trace.sql.queries,
+                "sql_ms": round(trace.sql.seconds * 1000, 3),
+                "lock_ms": round(trace.sql.lock_seconds * 1000, 3),
+                "errors": errors,
+                "fields": [
+                    {
+                        "field": key,
+                        "calls": field_trace.calls,
+                        "ms": round(field_trace.seconds * 1000, 3),
+                        "sql_queries": field_trace.sql.queries,
+                        "sql_ms": round(field_trace.sql.seconds * 1000, 3),
+                    }
+                    for key, field_trace in slowest
+                ],
+            },
+        )
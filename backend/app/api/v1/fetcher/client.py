@@ -0,0 +1,101 @@
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis
+from django.conf import settings
+
+from app.api.v1.common.redis import get_redis
+
+
+@dataclass
+class FetchJob:
+    url: str
+    method: str = "GET"
+    timeout_ms: int = 10_000
+    max_body: int = 64 * 1024
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+@dataclass
+class FetchBatch:
+    """Jobs submitted together; the Go worker pushes their results to one reply list."""
+    id: str
+    job_ids: List[str]
+
+    @property
+    def reply_key(self) -> str:
+        return f"{settings.FETCHER_RESULT_PREFIX}{self.id}"
+
+
+class FetcherClient:
+    """
+    Producer side of the Go fetcher queue (go_fetcher/main.go).
+
+    Jobs are JSON objects RPUSHed to FETCHER_QUEUE_KEY, many per command and many
+    commands per pipeline round trip. Each job names its batch reply list, which
+    the worker RPUSHes results to (and expires after reply_ttl), so a batch of any
+    size is gathered with blocking pops on one key instead of polling a key per job.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or get_redis()
+
+    def submit(self, jobs: Iterable[FetchJob], chunk_size: int | None = None) -> FetchBatch:
+        chunk_size = chunk_size or settings.FETCHER_ENQUEUE_CHUNK
+        batch = FetchBatch(id=uuid.uuid4().hex, job_ids=[])
+        reply_key = batch.reply_key
+        pipe = self.client.pipeline(transaction=False)
+        chunk: List[str] = []
+        for job in jobs:
+            batch.job_ids.append(job.id)
+            chunk.append(json.dumps({
+                "id": job.id,
+                "url": job.url,
+                "method": job.method,
+                "timeout_ms": job.timeout_ms,
+                "max_body": job.max_body,
+                "reply_to": reply_key,
+                "reply_ttl": settings.FETCHER_RESULT_TTL,
+                "enqueued_at": time.time(),
+            }, separators=(",", ":")))
+            if len(chunk) == chunk_size:
+                pipe.rpush(settings.FETCHER_QUEUE_KEY, *chunk)
+                chunk = []
+        if chunk:
+            pipe.rpush(settings.FETCHER_QUEUE_KEY, *chunk)
+        pipe.execute()
+        return batch
+
+    def gather(self, batch: FetchBatch, timeout: float | None = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Waits for the batch results, job id -> result. Jobs still missing at the
+        deadline are reported with a "timeout" error.
+        """
+        timeout = settings.FETCHER_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        pending = set(batch.job_ids)
+        results: Dict[str, Dict[str, Any]] = {}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # block for the first result, then drain whatever else has arrived
+            popped = self.client.blpop([batch.reply_key], timeout=max(remaining, 0.01))
+            if popped is None:
+                break
+            raw = [popped[1]] + (self.client.lpop(batch.reply_key, len(pending)) or [])
+            for item in raw:
+                result = json.loads(item)
+                if result["id"] in pending:
+                    pending.discard(result["id"])
+                    results[result["id"]] = result
+        for job_id in pending:
+            results[job_id] = {"id": job_id, "status": 0, "error": "timeout"}
+        self.client.delete(batch.reply_key)
+        return results
+
+    def fetch_many(self, jobs: Iterable[FetchJob], timeout: float | None = None) -> Dict[str, Dict[str, Any]]:
+        return self.gather(self.submit(jobs), timeout)
@@ -0,0 +1,104 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from django.core.management.base import BaseCommand
+
+from app.api.v1.common.stats import percentile
+from app.api.v1.fetcher.client import FetcherClient, FetchJob
+
+
+def _fake_server(latency: float, size: int) -> ThreadingHTTPServer:
+    body = b"x" * size
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures fetch throughput and tail latency through the Redis queue and a running "
+        "go_fetcher worker, against a local fake HTTP server (or --target, e.g. "
+        "`go_fetcher -fake-server :8099` which sustains far more than the Python one)."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--jobs", type=int, default=10_000, help="Fetches in total (default: 10000).")
+        parser.add_argument("--batch", type=int, default=1000, help="Jobs per submit/gather (default: 1000).")
+        parser.add_argument("--producers", type=int, default=4, help="Batches in flight at once (default: 4).")
+        parser.add_argument("--target", default=None, help="URL to fetch; starts a local fake server if omitted.")
+        parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake server delay (default: 20).")
+        parser.add_argument("--size", type=int, default=1024, help="Fake server body bytes (default: 1024).")
+        parser.add_argument("--timeout", type=float, default=60.0, help="Gather timeout per batch (default: 60).")
+
+    def handle(self, *args, **options) -> None:
+        server: Optional[ThreadingHTTPServer] = None
+        target = options["target"]
+        if target is None:
+            server = _fake_server(options["latency_ms"] / 1000, options["size"])
+            target = f"http://127.0.0.1:{server.server_address[1]}/"
+
+        try:
+            result = self._run(target, options)
+        finally:
+            if server is not None:
+                server.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"fetcher: {result}"))
+
+    def _run(self, target: str, options: Dict[str, Any]) -> Dict[str, float]:
+        results: List[Dict[str, Any]] = []
+        lock = threading.Lock()
+        sizes = [options["batch"]] * (options["jobs"] // options["batch"])
+        if options["jobs"] % options["batch"]:
+            sizes.append(options["jobs"] % options["batch"])
+
+        def producer(offset: int) -> None:
+            client = FetcherClient()
+            local: List[Dict[str, Any]] = []
+            for size in sizes[offset::options["producers"]]:
+                jobs = [FetchJob(url=target, max_body=0) for _ in range(size)]
+                local.extend(client.fetch_many(jobs, options["timeout"]).values())
+            with lock:
+                results.extend(local)
+
+        threads = [threading.Thread(target=producer, args=(n,)) for n in range(options["producers"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        ok = [r for r in results if not r.get("error") and r["status"] == 200]
+        timeouts = sum(1 for r in results if r.get("error") == "timeout")
+        queued = [r["queued_ms"] / 1000 for r in ok]
+        fetched = [r["elapsed_ms"] / 1000 for r in ok]
+        total = [q + f for q, f in zip(queued, fetched)]
+        return {
+            "jobs_per_s": round(len(results) / elapsed, 1),
+            "ok": len(ok),
+            "timeouts": timeouts,
+            "errors": len(results) - len(ok) - timeouts,
+            "queued_p50_ms": round(percentile(queued, 0.50) * 1000, 3),
+            "queued_p99_ms": round(percentile(queued, 0.99) * 1000, 3),
+            "fetch_p50_ms": round(percentile(fetched, 0.50) * 1000, 3),
+            "fetch_p99_ms": round(percentile(fetched, 0.99) * 1000, 3),
+            "total_p50_ms": round(percentile(total, 0.50) * 1000, 3),
+            "total_p99_ms": round(percentile(total, 0.99) * 1000, 3),
+        }
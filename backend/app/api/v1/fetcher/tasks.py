@@ -0,0 +1,22 @@
+from typing import Any, Dict, List, Optional
+
+from celery import shared_task
+
+from app.api.v1.fetcher.client import FetcherClient, FetchJob
+
+
+@shared_task(name="fetcher.fetch_urls")
+def fetch_urls(
+        urls: List[str],
+        timeout: Optional[float] = None,
+        max_body: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Fans the urls out to the Go worker pool in one pipelined submit and gathers
+    the results in input order. The task only waits on Redis, the fetching runs
+    in the worker, so one task covers thousands of urls without a Celery subtask
+    per url.
+    """
+    jobs = [FetchJob(url=url, max_body=max_body) for url in urls]
+    results = FetcherClient().fetch_many(jobs, timeout)
+    return [{"url": job.url, **results[job.id]} for job in jobs]
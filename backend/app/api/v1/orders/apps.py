@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class V1OrdersConfig(AppConfig):
     big_auto_field = "django.db.models.BigAutoField"
     name = "app.api.v1.orders"
+
+    def ready(self) -> None:
+        # registers the outbox handlers that project orders into OrderSummary and push status changes
+        from app.api.v1.orders import live, summaries  # noqa: F401
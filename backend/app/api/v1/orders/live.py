@@ -0,0 +1,9 @@
+from typing import Any, Dict, List
+
+from app.api.v1.common.live import ORDER_CHANNEL, publish
+from app.api.v1.common.outbox import register_handler
+
+
+@register_handler("order.status_changed")
+def _publish_status(payloads: List[Dict[str, Any]]) -> None:
+    publish(ORDER_CHANNEL, {payload["order_id"]: payload["status"] for payload in payloads})
@@ -0,0 +1,88 @@
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.orders import services
+from app.api.v1.orders.models import Order, OrderItem, OutboxEvent
+
+User = get_user_model()
+
+
+def _legacy_create_order(user, items: List[Tuple[int, int]], currency: str = "EUR") -> Order:
+    # the pre-service resolver: one FOR UPDATE and one INSERT per line, in client order
+    with transaction.atomic():
+        order = Order.objects.create(user=user, status=Order.Status.CREATED, currency=currency)
+        total = 0
+        for product_id, qty in items:
+            product = Product.objects.select_for_update().get(id=product_id)
+            OrderItem.objects.create(order=order, product=product, qty=qty, price_cents=product.price_cents)
+            total += product.price_cents * qty
+        order.total_cents = total
+        order.save(update_fields=["total_cents"])
+        OutboxEvent.objects.create(
+            topic="order.created",
+            payload={"order_id": order.id, "user_id": user.id, "total_cents": order.total_cents},
+        )
+    return order
+
+
+class Command(BaseCommand):
+    help = "Measures DB round trips and latency per create_order, legacy per-item path vs batched service"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=10,
+            help="Distinct SKUs per cart (default: 10).",
+        )
+        parser.add_argument(
+            "--orders",
+            type=int,
+            default=200,
+            help="Orders per path (default: 200).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        width: int = options["items"]
+        orders: int = options["orders"]
+
+        # everything below is rolled back, the bench leaves no rows behind
+        with override_settings(STOCK_BACKEND="db"), transaction.atomic():
+            user = User.objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+            products = Product.objects.bulk_create(
+                [
+                    Product(sku=f"BENCH-{uuid.uuid4().hex[:12]}", title="Bench item", price_cents=100 + i)
+                    for i in range(width)
+                ]
+            )
+            Stock.objects.bulk_create([Stock(product=p, available=orders * 4) for p in products])
+            # client order is reversed and one line duplicated, as real carts are
+            items = [(p.id, 1) for p in reversed(products)] + [(products[0].id, 1)]
+
+            for name, create in (
+                ("legacy", _legacy_create_order),
+                ("service", services.create_order),
+            ):
+                result = self._measure(lambda: create(user, items), orders)
+                self.stdout.write(self.style.SUCCESS(f"{name}: {result}"))
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _measure(run: Callable[[], Order], orders: int) -> Dict[str, float]:
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            for _ in range(orders):
+                run()
+            elapsed = time.perf_counter() - started
+        return {
+            "queries_per_order": round(len(ctx.captured_queries) / orders, 2),
+            "ms_per_order": round(elapsed / orders * 1000, 3),
+        }
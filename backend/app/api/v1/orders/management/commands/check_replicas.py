@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app.api.v1.catalog.models import Product
+from app.core.db import probe, replica_health, start_replica_reads, stop_replica_reads
+
+
+class Command(BaseCommand):
+    help = (
+        "Probes every replica (reachability and replay lag) and shows where query reads are "
+        "routed; --watch repeats it to follow a failover drill (stop a replica, promote it, ...)"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--watch",
+            type=float,
+            default=0.0,
+            help="Repeat every N seconds until interrupted (default: once).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured, set POSTGRES_REPLICA_HOSTS.")
+        while True:
+            self._check()
+            if not options["watch"]:
+                return
+            time.sleep(options["watch"])
+
+    def _check(self) -> None:
+        for alias in settings.DATABASE_REPLICAS:
+            ok, detail = probe(alias)
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"{alias}: healthy, lag {detail:.3f}s"))
+            else:
+                self.stdout.write(self.style.ERROR(f"{alias}: unhealthy ({detail})"))
+
+        alias = replica_health.pick()
+        token = start_replica_reads(alias)
+        try:
+            routed = Product.objects.all()[:1].db
+        finally:
+            stop_replica_reads(token)
+        self.stdout.write(f"query reads -> {routed}" + (" (failover)" if routed == DEFAULT_DB_ALIAS else ""))
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
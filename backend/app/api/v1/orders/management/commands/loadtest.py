@@ -0,0 +1,469 @@
+import asyncio
+import http.client
+import json
+import logging
+import random
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from app.api.v1.catalog.cache import get_catalog_cache
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.catalog.services import sync_stock_to_db
+from app.api.v1.common.persisted_queries import document_stats, query_hash
+from app.api.v1.common.redis import get_redis, stock_key
+from app.api.v1.common.stats import percentile
+from app.api.v1.orders.models import Order, OrderItem
+
+User = get_user_model()
+
+SCENARIOS = ["hot_sku", "wide_cart", "browse", "replay"]
+
+CREATE_ORDER = (
+    "mutation($items: [OrderItemInput!]!) "
+    "{ createOrder(data: {items: $items}) { id totalCents } }"
+)
+BROWSE_QUERIES = [
+    "{ products(limit: 50) { id sku priceCents stock { available } } }",
+    "query($after: String) { productsConnection(first: 50, after: $after) "
+    "{ edges { node { id sku } } pageInfo { endCursor } } }",
+    'query($sku: String!) { product(sku: $sku) { id title priceCents stock { available } } }',
+]
+
+# (user index, GraphQL body)
+Operation = Tuple[int, Dict[str, Any]]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests the GraphQL endpoint with flash-sale scenarios and writes the results "
+        "to a JSON file for comparison across commits. Runs in-process through the ASGI "
+        "handler unless --url points at a server sharing this database."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--scenario",
+            choices=SCENARIOS + ["all"],
+            default="all",
+            help="Scenario to run; replay only runs when --replay is given (default: all).",
+        )
+        parser.add_argument("--users", type=int, default=10_000, help="Distinct buyers (default: 10000).")
+        parser.add_argument("--stock", type=int, default=1000, help="Hot SKU stock (default: 1000).")
+        parser.add_argument("--cart-size", type=int, default=50, help="Items per wide cart (default: 50).")
+        parser.add_argument("--carts", type=int, default=500, help="Wide carts to place (default: 500).")
+        parser.add_argument("--browse", type=int, default=5000, help="Browse requests (default: 5000).")
+        parser.add_argument(
+            "--replay",
+            default=None,
+            help='JSONL of GraphQL operations, one {"query": ..., "variables": ...} per line.',
+        )
+        parser.add_argument("--concurrency", type=int, default=200, help="Requests in flight (default: 200).")
+        parser.add_argument("--url", default=None, help="Base URL of a running server, e.g. http://127.0.0.1:8010.")
+        parser.add_argument(
+            "--stock-backend",
+            choices=["redis", "db"],
+            default=None,
+            help="Override STOCK_BACKEND for in-process runs.",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            action="store_true",
+            help="Keep GraphQL rate limits on for in-process runs (off by default).",
+        )
+        parser.add_argument(
+            "--persisted",
+            action="store_true",
+            help="Send operations as persisted query hashes, with the query only after a miss.",
+        )
+        parser.add_argument("--output-dir", default="loadtest-results", help="Where result files go.")
+        parser.add_argument("--compare", default=None, help="Earlier result file to print deltas against.")
+        parser.add_argument("--keep", action="store_true", help="Keep the fixture data afterwards.")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+
+    def handle(self, *args, **options) -> None:
+        scenarios = list(SCENARIOS) if options["scenario"] == "all" else [options["scenario"]]
+        if "replay" in scenarios and not options["replay"]:
+            if options["scenario"] == "replay":
+                raise CommandError("--replay is required for the replay scenario.")
+            scenarios.remove("replay")
+
+        overrides: Dict[str, Any] = {}
+        if not options["rate_limit"]:
+            overrides["RATE_LIMIT_ENABLED"] = False
+        if options["stock_backend"]:
+            overrides["STOCK_BACKEND"] = options["stock_backend"]
+
+        rng = random.Random(options["seed"])
+        prefix = f"lt-{uuid.uuid4().hex[:8]}"
+        results: Dict[str, Any] = {}
+        with override_settings(**overrides):
+            fixture = self._fixture(prefix, options)
+            try:
+                for name in scenarios:
+                    operations = getattr(self, f"_ops_{name}")(fixture, options, rng)
+                    self.stdout.write(f"{name}: {len(operations)} requests ...")
+                    results[name] = self._run(name, operations, fixture, options)
+                    self.stdout.write(self.style.SUCCESS(f"{name}: {results[name]}"))
+            finally:
+                if not options["keep"]:
+                    self._cleanup(prefix, fixture)
+
+        report = {
+            "commit": self._commit(),
+            "started_at": timezone.now().isoformat(),
+            "target": options["url"] or "in-process",
+            "stock_backend": options["stock_backend"] or settings.STOCK_BACKEND,
+            "database": connection.vendor,
+            "options": {
+                k: options[k] for k in ("users", "stock", "cart_size", "carts", "browse", "concurrency", "persisted")
+            },
+            "scenarios": results,
+        }
+        path = self._write(report, Path(options["output_dir"]))
+        self.stdout.write(self.style.SUCCESS(f"results written to {path}"))
+        if options["compare"]:
+            self._compare(json.loads(Path(options["compare"]).read_text()), report)
+
+    # ---- Fixture ----
+    def _fixture(self, prefix: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        users = User.objects.bulk_create(
+            [User(username=f"{prefix}-{i}", password="!") for i in range(options["users"])],
+            batch_size=1000,
+        )
+        if users and users[0].pk is None:
+            users = list(User.objects.filter(username__startswith=f"{prefix}-").order_by("id"))
+
+        hot = Product.objects.create(sku=f"{prefix}-HOT", title="Hot SKU", price_cents=999)
+        Stock.objects.create(product=hot, available=options["stock"])
+        wide = Product.objects.bulk_create([
+            Product(sku=f"{prefix}-W{i:04d}", title=f"Wide {i}", price_cents=100 + i)
+            for i in range(max(options["cart_size"], 1))
+        ])
+        if wide and wide[0].pk is None:
+            wide = list(Product.objects.filter(sku__startswith=f"{prefix}-W").order_by("id"))
+        Stock.objects.bulk_create([Stock(product=p, available=10 ** 9) for p in wide])
+
+        return {
+            "user_ids": [u.id for u in users],
+            "sessions": self._sessions(users),
+            "hot": hot,
+            "wide": wide,
+            "skus": list(Product.objects.values_list("sku", flat=True)[:1000]),
+        }
+
+    @staticmethod
+    def _sessions(users: List[Any]) -> List[str]:
+        """Logged-in session keys written in bulk, force_login per user would take minutes at 10k."""
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        expire = timezone.now() + timedelta(hours=2)
+        store = SessionStore()
+        rows, keys = [], []
+        for user in users:
+            key = get_random_string(32)
+            data = {SESSION_KEY: str(user.pk), BACKEND_SESSION_KEY: backend, HASH_SESSION_KEY: user.get_session_auth_hash()}
+            rows.append(Session(session_key=key, session_data=store.encode(data), expire_date=expire))
+            keys.append(key)
+        Session.objects.bulk_create(rows, batch_size=1000)
+        return keys
+
+    @staticmethod
+    def _cleanup(prefix: str, fixture: Dict[str, Any]) -> None:
+        Session.objects.filter(session_key__in=fixture["sessions"]).delete()
+        product_ids = [fixture["hot"].id] + [p.id for p in fixture["wide"]]
+        OrderItem.objects.filter(product_id__in=product_ids).delete()
+        Order.objects.filter(user__username__startswith=f"{prefix}-").delete()
+        User.objects.filter(username__startswith=f"{prefix}-").delete()
+        Product.objects.filter(id__in=product_ids).delete()
+        get_redis().delete(*[stock_key(pid) for pid in product_ids])
+        get_catalog_cache().invalidate([fixture["hot"].sku] + [p.sku for p in fixture["wide"]])
+
+    # ---- Scenarios ----
+    @staticmethod
+    def _ops_hot_sku(fixture: Dict[str, Any], options: Dict[str, Any], rng: random.Random) -> List[Operation]:
+        """Every user tries to buy one unit of the same SKU at once."""
+        items = [{"productId": fixture["hot"].id, "qty": 1}]
+        body = {"query": CREATE_ORDER, "variables": {"items": items}}
+        order = list(range(len(fixture["user_ids"])))
+        rng.shuffle(order)
+        return [(user, body) for user in order]
+
+    @staticmethod
+    def _ops_wide_cart(fixture: Dict[str, Any], options: Dict[str, Any], rng: random.Random) -> List[Operation]:
+        items = [{"productId": p.id, "qty": 1} for p in fixture["wide"][:options["cart_size"]]]
+        users = len(fixture["user_ids"])
+        return [
+            (rng.randrange(users), {"query": CREATE_ORDER, "variables": {"items": rng.sample(items, len(items))}})
+            for _ in range(options["carts"])
+        ]
+
+    @staticmethod
+    def _ops_browse(fixture: Dict[str, Any], options: Dict[str, Any], rng: random.Random) -> List[Operation]:
+        users = len(fixture["user_ids"])
+        ops: List[Operation] = []
+        for _ in range(options["browse"]):
+            query = rng.choice(BROWSE_QUERIES)
+            variables = {"sku": rng.choice(fixture["skus"])} if "$sku" in query else {}
+            ops.append((rng.randrange(users), {"query": query, "variables": variables}))
+        return ops
+
+    def _ops_replay(self, fixture: Dict[str, Any], options: Dict[str, Any], rng: random.Random) -> List[Operation]:
+        users = len(fixture["user_ids"])
+        ops: List[Operation] = []
+        skipped = 0
+        with open(options["replay"]) as fh:
+            for line in fh:
+                line = line.strip()
+                try:
+                    entry = json.loads(line) if line else None
+                except ValueError:
+                    entry = None
+                if not isinstance(entry, dict) or not isinstance(entry.get("query"), str):
+                    skipped += 1
+                    continue
+                body = {"query": entry["query"], "variables": entry.get("variables") or {}}
+                ops.append((rng.randrange(users), body))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"replay: skipped {skipped} lines without a GraphQL query"))
+        return ops
+
+    # ---- Driver ----
+    def _run(
+            self,
+            name: str,
+            operations: List[Operation],
+            fixture: Dict[str, Any],
+            options: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        if name == "hot_sku":
+            get_catalog_cache().invalidate([fixture["hot"].sku])
+        sampler = _LockSampler() if connection.vendor == "postgresql" else None
+        if sampler:
+            sampler.start()
+
+        send = self._remote_sender(options["url"], options["concurrency"]) if options["url"] else self._local_sender()
+        if options["persisted"]:
+            send = self._persisted(send)
+        # document cache counters are only visible for in-process runs
+        documents_before = None if options["url"] else document_stats()
+        # sold-out errors are expected here, one traceback each would drown the output
+        execution_logger = logging.getLogger("strawberry.execution")
+        previous_level = execution_logger.level
+        execution_logger.setLevel(logging.CRITICAL)
+        try:
+            outcomes, elapsed = asyncio.run(
+                self._drive(operations, fixture["sessions"], send, options["concurrency"])
+            )
+        finally:
+            execution_logger.setLevel(previous_level)
+
+        lock_wait = sampler.stop() if sampler else None
+        latencies = [latency for latency, _ in outcomes]
+        summary: Dict[str, Any] = {
+            "requests": len(outcomes),
+            "ok": sum(1 for _, ok in outcomes if ok),
+            "errors": sum(1 for _, ok in outcomes if not ok),
+            "req_per_s": round(len(outcomes) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+            "lock_wait_s": lock_wait["lock_wait_s"] if lock_wait else None,
+            "max_lock_waiters": lock_wait["max_waiters"] if lock_wait else None,
+        }
+        if documents_before is not None:
+            documents = document_stats()
+            summary["parse_saved_ms"] = round(
+                (documents.get("parse_saved_seconds", 0.0) - documents_before.get("parse_saved_seconds", 0.0)) * 1000, 3
+            )
+            summary["validate_saved_ms"] = round(
+                (documents.get("validate_saved_seconds", 0.0) - documents_before.get("validate_saved_seconds", 0.0))
+                * 1000,
+                3,
+            )
+        if name == "hot_sku":
+            summary.update(self._oversell(fixture["hot"], options["stock"]))
+        return summary
+
+    @staticmethod
+    async def _drive(
+            operations: List[Operation],
+            sessions: List[str],
+            send: Callable,
+            concurrency: int,
+    ) -> Tuple[List[Tuple[float, bool]], float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        outcomes: List[Tuple[float, bool]] = []
+
+        async def one(user: int, body: Dict[str, Any]) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    status, payload = await send(sessions[user], json.dumps(body))
+                    ok = status == 200 and not payload.get("errors")
+                except Exception:
+                    ok = False
+                outcomes.append((time.perf_counter() - started, ok))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(user, body) for user, body in operations))
+        return outcomes, time.perf_counter() - started
+
+    @staticmethod
+    def _persisted(send: Callable) -> Callable:
+        """Apollo-style APQ: hash only first, the full query once the server reports a miss."""
+
+        async def send_persisted(session_key: str, body: str) -> Tuple[int, Dict[str, Any]]:
+            data = json.loads(body)
+            query = data.pop("query")
+            data["extensions"] = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+            status, payload = await send(session_key, json.dumps(data))
+            errors = payload.get("errors") or []
+            if errors and errors[0].get("message") == "PersistedQueryNotFound":
+                data["query"] = query
+                status, payload = await send(session_key, json.dumps(data))
+            return status, payload
+
+        return send_persisted
+
+    @staticmethod
+    def _local_sender() -> Callable:
+        clients: Dict[str, AsyncClient] = {}
+
+        async def send(session_key: str, body: str) -> Tuple[int, Dict[str, Any]]:
+            client = clients.get(session_key)
+            if client is None:
+                client = clients[session_key] = AsyncClient()
+                client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            response = await client.post("/graphql/", body, content_type="application/json")
+            return response.status_code, json.loads(response.content)
+
+        return send
+
+    @staticmethod
+    def _remote_sender(url: str, concurrency: int) -> Callable:
+        parts = urlsplit(url)
+        path = parts.path.rstrip("/") + "/graphql/"
+        local = threading.local()
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        # any token works as long as cookie and header agree
+        csrf = get_random_string(32)
+
+        def post(session_key: str, body: str) -> Tuple[int, Dict[str, Any]]:
+            if getattr(local, "conn", None) is None:
+                local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            try:
+                local.conn.request("POST", path, body=body, headers={
+                    "Content-Type": "application/json",
+                    "Cookie": f"{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf}",
+                    "X-CSRFToken": csrf,
+                })
+                response = local.conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                local.conn.close()
+                local.conn = None
+                raise
+            return response.status, json.loads(data) if data else {}
+
+        async def send(session_key: str, body: str) -> Tuple[int, Dict[str, Any]]:
+            return await asyncio.get_running_loop().run_in_executor(pool, post, session_key, body)
+
+        return send
+
+    # ---- Checks ----
+    @staticmethod
+    def _oversell(product: Product, initial: int) -> Dict[str, int]:
+        if settings.STOCK_BACKEND == "redis":
+            sync_stock_to_db()
+        sold = sum(OrderItem.objects.filter(product=product).values_list("qty", flat=True))
+        remaining = Stock.objects.get(product=product).available
+        return {
+            "sold": sold,
+            "remaining": remaining,
+            "oversell": max(0, sold - initial),
+            # units that left stock without an order item, or the reverse
+            "stock_drift": initial - remaining - sold,
+        }
+
+    # ---- Results ----
+    @staticmethod
+    def _commit() -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True, text=True, check=True, timeout=5,
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    @staticmethod
+    def _write(report: Dict[str, Any], directory: Path) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        path = directory / f"{stamp}-{report['commit'] or 'nocommit'}.json"
+        path.write_text(json.dumps(report, indent=2, sort_keys=True))
+        return path
+
+    def _compare(self, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        self.stdout.write(f"compared with {before.get('commit')} ({before.get('started_at')}):")
+        for name, current in after["scenarios"].items():
+            previous = before.get("scenarios", {}).get(name)
+            if not previous:
+                continue
+            deltas = []
+            for metric in ("req_per_s", "p50_ms", "p99_ms", "oversell", "lock_wait_s"):
+                old, new = previous.get(metric), current.get(metric)
+                if old is None or new is None:
+                    continue
+                change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+                deltas.append(f"{metric} {old} -> {new} ({change})")
+            self.stdout.write(f"  {name}: " + ", ".join(deltas))
+
+
+class _LockSampler:
+    """Polls pg_locks for ungranted locks; waiters x interval approximates total lock wait."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self.waited = 0.0
+        self.max_waiters = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _loop(self) -> None:
+        from django.db import connection as thread_connection
+
+        try:
+            with thread_connection.cursor() as cursor:
+                while not self._stop.wait(self.interval):
+                    cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                    waiters = cursor.fetchone()[0]
+                    self.waited += waiters * self.interval
+                    self.max_waiters = max(self.max_waiters, waiters)
+        finally:
+            thread_connection.close()
+
+    def stop(self) -> Dict[str, float]:
+        self._stop.set()
+        self._thread.join()
+        return {"lock_wait_s": round(self.waited, 3), "max_waiters": self.max_waiters}
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.api.v1.catalog.models import Product
+from app.api.v1.orders.waiting_room import get_waiting_room
+
+
+class Command(BaseCommand):
+    help = "Opens, tunes and closes drop waiting rooms in front of createOrder"
+
+    def add_arguments(self, parser) -> None:
+        actions = parser.add_subparsers(dest="action", required=True)
+
+        open_room = actions.add_parser("open", help="Gate SKUs behind a room.")
+        open_room.add_argument("room", help="Room name, a SKU or a campaign.")
+        open_room.add_argument(
+            "--sku",
+            action="append",
+            required=True,
+            help="SKU to gate, repeat for a campaign.",
+        )
+        open_room.add_argument(
+            "--rate",
+            type=float,
+            required=True,
+            help="Admissions per second.",
+        )
+        open_room.add_argument(
+            "--min-rate",
+            type=float,
+            default=None,
+            help="With --max-rate, let the rate adapt to order latency within these bounds.",
+        )
+        open_room.add_argument(
+            "--max-rate",
+            type=float,
+            default=None,
+            help="Upper bound of the adaptive rate.",
+        )
+
+        set_rate = actions.add_parser("rate", help="Change the admission rate of an open room.")
+        set_rate.add_argument("room")
+        set_rate.add_argument("rate", type=float)
+
+        close_room = actions.add_parser("close", help="Lift the gate and drop the queue.")
+        close_room.add_argument("room")
+
+        actions.add_parser("status", help="Show open rooms.")
+
+    def handle(self, *args, **options) -> None:
+        room = get_waiting_room()
+        action = options["action"]
+
+        if action == "open":
+            if (options["min_rate"] is None) != (options["max_rate"] is None):
+                raise CommandError("--min-rate and --max-rate go together.")
+            skus = options["sku"]
+            product_ids = dict(Product.objects.filter(sku__in=skus).values_list("sku", "id"))
+            missing = sorted(set(skus) - set(product_ids))
+            if missing:
+                raise CommandError(f"Products not found: {missing}")
+            try:
+                room.open(
+                    options["room"],
+                    product_ids.values(),
+                    options["rate"],
+                    min_rate=options["min_rate"],
+                    max_rate=options["max_rate"],
+                )
+            except ValueError as exc:
+                raise CommandError(str(exc)) from exc
+            self.stdout.write(self.style.SUCCESS(f"{options['room']}: gating {len(product_ids)} products"))
+        elif action == "rate":
+            try:
+                changed = room.set_rate(options["room"], options["rate"])
+            except ValueError as exc:
+                raise CommandError(str(exc)) from exc
+            if not changed:
+                raise CommandError(f"Room {options['room']} is not open.")
+            self.stdout.write(self.style.SUCCESS(f"{options['room']}: {options['rate']}/s"))
+        elif action == "close":
+            room.close(options["room"])
+            self.stdout.write(self.style.SUCCESS(f"{options['room']}: closed"))
+        else:
+            for name, state in room.rooms().items():
+                waiting = max(0, state["issued"] - int(state["frontier"]))
+                self.stdout.write(f"{name}: {state} waiting={waiting}")
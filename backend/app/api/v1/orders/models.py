@@ -16,6 +16,8 @@ class Reservation(models.Model):
         indexes = [
             models.Index(fields=["user", "created_at"]),
             models.Index(fields=["product", "created_at"]),
+            # expiry sweeper scans holds oldest first
+            models.Index(fields=["created_at"]),
         ]
 
     def __str__(self) -> str:
@@ -33,11 +35,15 @@ class Order(models.Model):
     total_cents = models.IntegerField(default=0)
     currency = models.CharField(max_length=8, default="EUR")
     created_at = models.DateTimeField(auto_now_add=True)
+    # bulk status updates set it themselves, QuerySet.update skips auto_now
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["user", "created_at"]),
             models.Index(fields=["status", "created_at"]),
+            # sales rollup watermark
+            models.Index(fields=["updated_at"]),
         ]
 
     def __str__(self) -> str:
@@ -60,6 +66,29 @@ class OrderItem(models.Model):
         return f"OrderItem(order={self.order_id}, product={self.product_id}, qty={self.qty})"
 
 
+class OrderSummary(models.Model):
+    """
+    Denormalized row per order for the user's order list, kept by the outbox
+    projection in summaries.py; Order and OrderItem stay the source of truth.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=Order.Status.choices)
+    total_cents = models.IntegerField()
+    currency = models.CharField(max_length=8)
+    item_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # my_orders reads newest first without touching orders or items
+            models.Index(fields=["user", "-created_at", "-order"], name="orders_summary_user_recent"),
+        ]
+
+    def __str__(self) -> str:
+        return f"OrderSummary(order={self.order_id}, user={self.user_id}, status={self.status})"
+
+
 class IdempotencyKey(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     key = models.CharField(max_length=128)
@@ -69,7 +98,10 @@ class IdempotencyKey(models.Model):
 
     class Meta:
         unique_together = [("user", "key")]
-        indexes = [models.Index(fields=["user", "created_at"])]
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
 
     def __str__(self) -> str:
         return f"IdempotencyKey(user={self.user_id}, key={self.key})"
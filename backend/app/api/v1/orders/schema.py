@@ -1,14 +1,28 @@
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import AsyncGenerator, List, Optional
 from enum import Enum
 import strawberry
+from asgiref.sync import sync_to_async
 from strawberry import auto
 from strawberry.types import Info
 from strawberry_django import type as dj_type
+from strawberry_django.resolvers import django_resolver
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db.models import Q
+from graphql import GraphQLError
 from django.utils import timezone
 
-from app.api.v1.catalog.models import Product
+from app.api.v1.catalog.schema import ProductType
+from app.api.v1.common.live import ORDER_CHANNEL, get_hub
+from app.api.v1.common.loaders import load_related
+from app.api.v1.common.pagination import (
+    Connection,
+    build_connection,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+)
 from app.api.v1.orders.models import (
     Reservation,
     Order,
@@ -16,6 +30,10 @@ from app.api.v1.orders.models import (
     IdempotencyKey,
     OutboxEvent,
 )
+from app.api.v1.orders import services
+from app.api.v1.orders.summaries import recent_orders
+from app.api.v1.orders.waiting_room import AdmissionError, RoomStatus, get_waiting_room
+from app.api.v1.common.idempotency import idempotent
 
 User = get_user_model()
 
@@ -29,34 +47,70 @@ class OrderStatusEnum(str, Enum):
 
 
 # ---- Types ----
+@dj_type(User)
+class UserType:
+    id: auto
+    username: auto
+
+
 @dj_type(Reservation)
 class ReservationType:
     id: auto
-    user: auto
-    product: auto
     qty: auto
     created_at: auto
 
+    @strawberry.field
+    def expires_at(self) -> datetime:
+        return self.created_at + timedelta(seconds=settings.RESERVATION_TTL_SECONDS)
+
+    @strawberry.field
+    async def user(self, info: Info) -> UserType:
+        return await load_related(self, "user", info.context.loaders.user, self.user_id)
+
+    @strawberry.field
+    async def product(self, info: Info) -> ProductType:
+        return await load_related(self, "product", info.context.loaders.product, self.product_id)
+
 
 @dj_type(OrderItem)
 class OrderItemType:
     id: auto
-    order: auto
-    product: auto
     qty: auto
     price_cents: auto
 
+    @strawberry.field
+    async def order(self, info: Info) -> "OrderType":
+        return await load_related(self, "order", info.context.loaders.order, self.order_id)
+
+    @strawberry.field
+    async def product(self, info: Info) -> ProductType:
+        return await load_related(self, "product", info.context.loaders.product, self.product_id)
+
 
 @dj_type(Order)
 class OrderType:
     id: auto
-    user: auto
     status: auto
     total_cents: auto
     currency: auto
     created_at: auto
 
-    items: List[OrderItemType]
+    @strawberry.field
+    async def user(self, info: Info) -> UserType:
+        return await load_related(self, "user", info.context.loaders.user, self.user_id)
+
+    @strawberry.field
+    async def items(self, info: Info) -> List[OrderItemType]:
+        return await load_related(self, "items", info.context.loaders.items_by_order, self.id)
+
+    @strawberry.field
+    async def item_count(self, info: Info) -> int:
+        # set on orders served from their summary (myOrders), others count their items
+        count = getattr(self, "item_count", None)
+        if count is not None:
+            return count
+        items = await load_related(self, "items", info.context.loaders.items_by_order, self.id)
+        return sum(item.qty for item in items)
 
 
 @dj_type(IdempotencyKey)
@@ -78,41 +132,119 @@ class OutboxEventType:
     published_at: auto
 
 
+@strawberry.type
+class WaitingRoomStatusType:
+    # admitted | waiting | expired | invalid | closed
+    state: str
+    position: int
+    eta_seconds: float
+    expires_in: float
+
+    @classmethod
+    def from_status(cls, status: RoomStatus) -> "WaitingRoomStatusType":
+        return cls(
+            state=status.state,
+            position=status.position,
+            eta_seconds=status.eta_seconds,
+            expires_in=status.expires_in,
+        )
+
+
+@strawberry.type
+class OrderStatusUpdateType:
+    order_id: int
+    status: OrderStatusEnum
+
+
+@strawberry.type
+class WaitingRoomTicketType:
+    token: str
+    status: WaitingRoomStatusType
+
+
 # ---- Query ----
 @strawberry.type
 class OrdersQuery:
 
     @strawberry.field
-    def my_orders(self, info: Info) -> List["OrderType"]:
-        user = info.context.request.user
-        return list(
-            Order.objects
-            .filter(user=user)
-            .select_related("user")
-            .prefetch_related("items__product")
-            .order_by("-created_at")
+    async def waiting_room_status(self, info: Info, token: str) -> WaitingRoomStatusType:
+        # polled by queued clients: one Redis script, the resolver never touches the database
+        status = await sync_to_async(get_waiting_room().status)(token)
+        return WaitingRoomStatusType.from_status(status)
+
+    @strawberry.field
+    async def my_orders(self, info: Info, limit: int = 50) -> List["OrderType"]:
+        # served from the OrderSummary projection (Redis, then one table), behind the outbox by a relay run
+        user = await info.context.request.auser()
+        if not user.is_authenticated:
+            return []
+        return await sync_to_async(recent_orders)(user.id, clamp_page_size(limit))
+
+    @strawberry.field
+    async def my_orders_connection(
+            self,
+            info: Info,
+            first: int = 50,
+            after: Optional[str] = None,
+    ) -> Connection["OrderType"]:
+        # seeks on (created_at, id) over the (user, created_at) index
+        user = await info.context.request.auser()
+        first = clamp_page_size(first)
+        qs = Order.objects.filter(user=user)
+        if after:
+            created_at, order_id = decode_cursor(after, str, int)
+            try:
+                created_at = datetime.fromisoformat(created_at)
+            except ValueError as exc:
+                raise GraphQLError("Invalid cursor.") from exc
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+        rows = [order async for order in qs.order_by("-created_at", "-id")[:first + 1]]
+        return build_connection(
+            rows,
+            first,
+            lambda order: encode_cursor(order.created_at.isoformat(), order.id),
         )
 
     @strawberry.field
-    def order(self, info: Info, order_id: int) -> Optional["OrderType"]:
-        user = info.context.request.user
-        return (
+    async def order(self, info: Info, order_id: int) -> Optional["OrderType"]:
+        user = await info.context.request.auser()
+        return await (
             Order.objects
             .filter(id=order_id, user=user)
-            .select_related("user")
-            .prefetch_related("items__product")
-            .first()
+            .afirst()
         )
 
     @strawberry.field
-    def reservation(self, info: Info) -> List[ReservationType]:
-        user = info.context.request.user
-        return list(
+    async def reservation(self, info: Info) -> List[ReservationType]:
+        user = await info.context.request.auser()
+        qs = (
             Reservation.objects
-            .filter(user=user)
-            .select_related("product")
+            .filter(user=user, created_at__gte=services.hold_cutoff())
             .order_by("-created_at")
         )
+        return [reservation async for reservation in qs]
+
+
+# ---- Subscriptions ----
+@strawberry.type
+class OrdersSubscription:
+    @strawberry.subscription
+    async def order_status_changed(self, info: Info, order_id: int) -> AsyncGenerator[OrderStatusUpdateType, None]:
+        """The current status of one of the user's orders (any order for staff), then every change."""
+        user = await info.context.request.auser()
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required.")
+        qs = Order.objects.filter(id=order_id)
+        if not user.is_staff:
+            qs = qs.filter(user=user)
+        if not await qs.aexists():
+            raise GraphQLError("Order not found.")
+
+        async def current() -> Optional[str]:
+            return await qs.values_list("status", flat=True).afirst()
+
+        async for status in get_hub().stream(ORDER_CHANNEL, order_id, current):
+            yield OrderStatusUpdateType(order_id=order_id, status=OrderStatusEnum(status))
 
 
 # ---- Inputs ----
@@ -126,74 +258,123 @@ class OrderItemInput:
 class CreateOrderInput:
     items: List[OrderItemInput]
     currency: str = "EUR"
+    # from joinWaitingRoom, required while a drop room gates any of the items
+    admission_token: Optional[str] = None
 
 
-# ---- Mutations ----
 @strawberry.type
-class OrdersMutation:
+class TransitionResultType:
+    changed: List[int]
+    skipped: List[int]
 
-    @strawberry.mutation
-    @transaction.atomic
-    def create_order(self, info: Info, data: CreateOrderInput) -> OrderType:
-        user = info.context.request.user
 
-        order = Order.objects.create(
-            user=user,
-            status=Order.Status.CREATED,
-            currency=data.currency,
-        )
+# ---- Mutations ----
+def _transition_scope(user, status: OrderStatusEnum):
+    """Staff move any order; customers may only cancel their own."""
+    if user.is_staff:
+        return None
+    if not user.is_authenticated or status != OrderStatusEnum.CANCELED:
+        raise GraphQLError("Not allowed to set this status.")
+    return user
+
 
-        total = 0
+def _order_with_items(order_id: int) -> Order:
+    return (
+        Order.objects
+        .select_related("user")
+        .prefetch_related("items__product")
+        .get(id=order_id)
+    )
 
-        for item in data.items:
-            product = Product.objects.select_for_update().get(id=item.product_id)
 
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                qty=item.qty,
-                price_cents=product.price_cents
+def _check_admission(info: Info, data: CreateOrderInput) -> None:
+    # ahead of the idempotency key, so clients not admitted never reach the database
+    get_waiting_room().check(data.admission_token, [item.product_id for item in data.items])
+
+
+@strawberry.type
+class OrdersMutation:
+
+    @strawberry.mutation
+    @django_resolver
+    @idempotent(
+        "create_order",
+        load=lambda response: _order_with_items(response["pk"]),
+        gate=_check_admission,
+    )
+    def create_order(self, info: Info, data: CreateOrderInput) -> OrderType:
+        items = [(item.product_id, item.qty) for item in data.items]
+        with get_waiting_room().admit(data.admission_token, [product_id for product_id, _ in items]):
+            order = services.create_order(
+                user=info.context.request.user,
+                items=items,
+                currency=data.currency,
             )
 
-            total += product.price_cents * item.qty
+        return _order_with_items(order.id)
 
-        order.total_cents = total
-        order.save(update_fields=["total_cents"])
+    @strawberry.mutation
+    @django_resolver
+    def join_waiting_room(self, info: Info, product_id: int) -> Optional[WaitingRoomTicketType]:
+        """Queues the user for the drop gating `product_id`; null when no room gates it."""
+        user = info.context.request.user
+        if not user.is_authenticated:
+            raise GraphQLError("Authentication required.")
+        room = get_waiting_room()
+        token = room.join(product_id, user.id)
+        if token is None:
+            return None
+        return WaitingRoomTicketType(token=token, status=WaitingRoomStatusType.from_status(room.status(token)))
 
-        OutboxEvent.objects.create(
-            topic="order.created",
-            payload={
-                "order_id": order.id,
-                "user_id": user.id,
-                "total_cents": order.total_cents,
-            }
+    @strawberry.mutation
+    @django_resolver
+    def place_hold(self, info: Info, product_id: int, qty: int) -> ReservationType:
+        # a hold takes stock like an order but would skip the queue; gated drops sell through createOrder only
+        if get_waiting_room().room_for([product_id]):
+            raise AdmissionError(
+                "Holds are not available during a gated drop, order through its waiting room.",
+                "ADMISSION_NO_HOLDS",
+            )
+        return services.place_hold(
+            user=info.context.request.user,
+            product_id=product_id,
+            qty=qty,
         )
 
-        return (
-            Order.objects
-            .select_related("user")
-            .prefetch_related("items__product")
-            .get(id=order.id)
-        )
+    @strawberry.mutation
+    @django_resolver
+    def release_hold(self, info: Info, reservation_id: int) -> bool:
+        return services.release_hold(info.context.request.user, reservation_id)
 
     @strawberry.mutation
-    @transaction.atomic
+    @django_resolver
     def set_order_status(
             self,
             info: Info,
             order_id: int,
             status: OrderStatusEnum,
     ) -> OrderType:
-        order = Order.objects.select_for_update().get(id=order_id)
-        order.status = status.value
-        order.save(update_fields=["status"])
-
-        OutboxEvent.objects.create(
-            topic="order.status_changed",
-            payload={
-                "order_id": order.id,
-                "status": order.status,
-            }
-        )
+        user = info.context.request.user
+        scope = _transition_scope(user, status)
+        if not services.transition_orders([order_id], status.value, user=scope):
+            order = Order.objects.filter(id=order_id).only("status", "user_id").first()
+            if order is None or (scope is not None and order.user_id != user.id):
+                raise GraphQLError("Order not found.")
+            raise GraphQLError(f"Cannot move order from {order.status} to {status.value}.")
+        return Order.objects.get(id=order_id)
 
-        return order
+    @strawberry.mutation
+    @django_resolver
+    def transition_orders(
+            self,
+            info: Info,
+            order_ids: List[int],
+            status: OrderStatusEnum,
+    ) -> TransitionResultType:
+        user = info.context.request.user
+        changed = services.transition_orders(order_ids, status.value, user=_transition_scope(user, status))
+        moved = set(changed)
+        return TransitionResultType(
+            changed=changed,
+            skipped=sorted({order_id for order_id in order_ids if order_id not in moved}),
+        )
@@ -0,0 +1,310 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.db import transaction
+from django.utils import timezone
+
+from app.api.v1.catalog.models import Product
+from app.api.v1.catalog.services import merge_quantities, reserve_stock, restock
+from app.api.v1.orders.models import Order, OrderItem, OutboxEvent, Reservation
+from app.api.v1.orders.summaries import project_created, project_status
+
+logger = logging.getLogger(__name__)
+
+
+class HoldExpired(Exception):
+    """A hold picked for an order was released while the order was being placed."""
+
+
+class _HoldsChanged(Exception):
+    """A planned hold is gone or was shrunk by a concurrent order; the cart is planned again."""
+
+
+# plans tried before giving up with HoldExpired, each lost race is another order on the same holds
+_PLAN_ATTEMPTS = 3
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+# target status -> statuses an order may move to it from; canceling a paid order is a refund
+TRANSITIONS: Dict[str, Set[str]] = {
+    Order.Status.PAID: {Order.Status.CREATED},
+    Order.Status.CANCELED: {Order.Status.CREATED, Order.Status.PAID},
+}
+
+
+def can_transition(current: str, target: str) -> bool:
+    return current in TRANSITIONS.get(target, set())
+
+
+# ---- Holds ----
+def hold_cutoff() -> datetime:
+    """Holds created before this are expired, whether or not the sweeper got to them yet."""
+    return timezone.now() - timedelta(seconds=settings.RESERVATION_TTL_SECONDS)
+
+
+def place_hold(user: AbstractBaseUser, product_id: int, qty: int) -> Reservation:
+    """Takes `qty` out of stock for the user until the hold expires or becomes an order."""
+    quantities = merge_quantities([(product_id, qty)])
+    with reserve_stock(quantities):
+        hold = Reservation.objects.create(user=user, product_id=product_id, qty=qty)
+        # stock watchers (stockChanged) hear about it through the relay
+        OutboxEvent.objects.create(topic="reservation.placed", payload={"product_ids": [product_id]})
+        return hold
+
+
+def release_hold(user: AbstractBaseUser, reservation_id: int) -> bool:
+    with transaction.atomic():
+        hold = (
+            Reservation.objects.select_for_update()
+            .filter(id=reservation_id, user=user)
+            .first()
+        )
+        if hold is None:
+            return False
+        hold.delete()
+        restock({hold.product_id: hold.qty})
+        OutboxEvent.objects.create(topic="reservation.released", payload={"product_ids": [hold.product_id]})
+    return True
+
+
+def _expire_batch(cutoff: datetime, batch_size: int) -> int:
+    with transaction.atomic():
+        # SKIP LOCKED: holds being turned into an order are left to create_order
+        holds = list(
+            Reservation.objects.select_for_update(skip_locked=True)
+            .filter(created_at__lt=cutoff)
+            .order_by("created_at")
+            .values_list("id", "product_id", "qty")[:batch_size]
+        )
+        if not holds:
+            return 0
+
+        quantities: Dict[int, int] = defaultdict(int)
+        for _, product_id, qty in holds:
+            quantities[product_id] += qty
+
+        Reservation.objects.filter(id__in=[hold_id for hold_id, _, _ in holds]).delete()
+        restock(quantities)
+        OutboxEvent.objects.create(
+            topic="reservation.expired",
+            payload={"count": len(holds), "product_ids": sorted(quantities)},
+        )
+    return len(holds)
+
+
+def expire_holds(batch_size: int | None = None, max_batches: int | None = None) -> int:
+    """
+    Releases holds older than RESERVATION_TTL_SECONDS, oldest first over the
+    created_at index. Each batch is one transaction: one locking read, one delete,
+    one aggregated stock restore and one outbox event, so a backlog of any size
+    drains in bounded steps across runs.
+    """
+    batch_size = batch_size or settings.RESERVATION_SWEEP_BATCH_SIZE
+    max_batches = max_batches or settings.RESERVATION_SWEEP_MAX_BATCHES
+    cutoff = hold_cutoff()
+    expired = 0
+    for _ in range(max_batches):
+        count = _expire_batch(cutoff, batch_size)
+        expired += count
+        if count < batch_size:
+            break
+    if expired:
+        logger.info("Expired %d reservations", expired)
+    return expired
+
+
+def _plan_holds(
+        user: AbstractBaseUser,
+        quantities: Mapping[int, int],
+) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    Splits the cart into what the user's live holds already cover and what still
+    has to be reserved. Returns ({hold_id: qty to consume}, {product_id: qty}).
+    """
+    holds = (
+        Reservation.objects
+        .filter(user=user, product_id__in=list(quantities), created_at__gte=hold_cutoff())
+        .order_by("created_at", "id")
+        .values_list("id", "product_id", "qty")
+    )
+    remaining = dict(quantities)
+    consume: Dict[int, int] = {}
+    for hold_id, product_id, qty in holds:
+        take = min(qty, remaining[product_id])
+        if take:
+            consume[hold_id] = take
+            remaining[product_id] -= take
+    return consume, {pid: qty for pid, qty in remaining.items() if qty}
+
+
+def _consume_holds(consume: Mapping[int, int]) -> None:
+    if not consume:
+        return
+    held = dict(
+        Reservation.objects.select_for_update()
+        .filter(id__in=sorted(consume))
+        .order_by("id")
+        .values_list("id", "qty")
+    )
+    # planned from an unlocked read: what is left now must still cover every take
+    if any(held.get(hold_id, 0) < take for hold_id, take in consume.items()):
+        raise _HoldsChanged()
+
+    used_up = [hold_id for hold_id, take in consume.items() if take >= held[hold_id]]
+    Reservation.objects.filter(id__in=used_up).delete()
+    # a hold bigger than the cart keeps its remainder and its expiry
+    for hold_id, take in consume.items():
+        if take < held[hold_id]:
+            Reservation.objects.filter(id=hold_id).update(qty=held[hold_id] - take)
+
+
+# ---- Orders ----
+def create_order(
+        user: AbstractBaseUser,
+        items: Iterable[Tuple[int, int]],
+        currency: str = "EUR",
+) -> Order:
+    """
+    items: (product_id, qty) pairs as sent by the client, duplicates are merged.
+
+    Quantities covered by the user's live holds are taken from them, their stock
+    was decremented when the hold was placed; only the rest is reserved.
+
+    Costs a fixed number of queries whatever the cart width: hold lookup, stock
+    reservation, one price read, the order insert, one bulk item insert and the
+    outbox insert, plus the hold lock and delete when holds are used. The order
+    summary is projected from the outbox event right after commit.
+    """
+    quantities = merge_quantities(items)
+    if not quantities:
+        raise ValueError("Order must contain at least one item.")
+
+    for _ in range(_PLAN_ATTEMPTS):
+        try:
+            return _place_order(user, quantities, currency)
+        except _HoldsChanged:
+            # rolled back and the reservation credited back; plan again from the holds left
+            continue
+    raise HoldExpired("Reservation expired while placing the order, please retry.")
+
+
+def _place_order(user: AbstractBaseUser, quantities: Mapping[int, int], currency: str) -> Order:
+    consume, to_reserve = _plan_holds(user, quantities)
+    with reserve_stock(to_reserve):
+        _consume_holds(consume)
+        prices = dict(
+            Product.objects
+            .filter(id__in=list(quantities))
+            .order_by("id")
+            .values_list("id", "price_cents")
+        )
+        missing = sorted(set(quantities) - set(prices))
+        if missing:
+            raise Product.DoesNotExist(f"Products not found: {missing}")
+
+        order_items: List[OrderItem] = []
+        total = 0
+        for product_id in sorted(quantities):
+            qty = quantities[product_id]
+            price_cents = prices[product_id]
+            order_items.append(OrderItem(product_id=product_id, qty=qty, price_cents=price_cents))
+            total += price_cents * qty
+
+        order = Order.objects.create(
+            user=user,
+            status=Order.Status.CREATED,
+            total_cents=total,
+            currency=currency,
+        )
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+
+        event = OutboxEvent.objects.create(
+            topic="order.created",
+            payload={
+                "order_id": order.id,
+                "user_id": user.id,
+                "total_cents": order.total_cents,
+                "product_ids": sorted(quantities),
+                # enough for the order summary projection to skip the source tables
+                "status": order.status,
+                "currency": order.currency,
+                "item_count": sum(quantities.values()),
+                "created_at": order.created_at.isoformat(),
+            }
+        )
+        # the relay projects the event too (idempotently); doing it now shows the order in myOrders at once
+        transaction.on_commit(lambda: project_created([event.payload]), robust=True)
+
+    return order
+
+
+def _transition_batch(order_ids: List[int], status: str, user: Optional[AbstractBaseUser]) -> List[int]:
+    sources = TRANSITIONS[status]
+    qs = Order.objects.filter(id__in=order_ids, status__in=sources)
+    if user is not None:
+        qs = qs.filter(user=user)
+
+    with transaction.atomic():
+        rows = list(qs.select_for_update().order_by("id").values_list("id", "status", "user_id"))
+        if not rows:
+            return []
+        ids = [order_id for order_id, _, _ in rows]
+        Order.objects.filter(id__in=ids, status__in=sources).update(status=status, updated_at=timezone.now())
+
+        product_ids: Dict[int, Set[int]] = defaultdict(set)
+        quantities: Dict[int, int] = defaultdict(int)
+        for order_id, product_id, qty in (
+                OrderItem.objects.filter(order_id__in=ids).values_list("order_id", "product_id", "qty")
+        ):
+            product_ids[order_id].add(product_id)
+            quantities[product_id] += qty
+        if status == Order.Status.CANCELED:
+            restock(quantities)
+
+        events = OutboxEvent.objects.bulk_create([
+            OutboxEvent(
+                topic="order.status_changed",
+                payload={
+                    "order_id": order_id,
+                    "user_id": user_id,
+                    "status": status,
+                    "previous_status": previous,
+                    "product_ids": sorted(product_ids[order_id]),
+                },
+            )
+            for order_id, previous, user_id in rows
+        ])
+        transaction.on_commit(lambda: project_status([event.payload for event in events]), robust=True)
+    return ids
+
+
+def transition_orders(
+        order_ids: Iterable[int],
+        status: str,
+        user: Optional[AbstractBaseUser] = None,
+        batch_size: int | None = None,
+) -> List[int]:
+    """
+    Moves orders to `status` where TRANSITIONS allows it and returns the ids that
+    moved; the others (wrong state, unknown, not the user's when `user` is given)
+    are left alone. Per batch: one locking read, one status-guarded UPDATE, one
+    item read, one outbox bulk insert, and a stock restore when canceling. The
+    order summaries are updated right after each batch commits.
+    """
+    if status not in TRANSITIONS:
+        raise InvalidTransition(f"Orders cannot be moved to {status}.")
+    batch_size = batch_size or settings.ORDER_TRANSITION_BATCH_SIZE
+    order_ids = sorted(set(order_ids))
+    changed: List[int] = []
+    for start in range(0, len(order_ids), batch_size):
+        changed += _transition_batch(order_ids[start:start + batch_size], status, user)
+    return changed
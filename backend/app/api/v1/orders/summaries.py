@@ -0,0 +1,245 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F, QuerySet, Sum, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from app.api.v1.common.outbox import register_handler
+from app.api.v1.common.redis import get_redis
+from app.api.v1.orders.models import Order, OrderSummary
+from app.core.db import primary_reads
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_KEY_PREFIX = "orders:summaries:"
+
+_COMPARED_FIELDS = ("user_id", "status", "total_cents", "currency", "item_count", "created_at")
+# orders younger than this may still have their events in the outbox, the check leaves them alone
+_CHECK_GRACE = timedelta(seconds=60)
+
+
+def summary_key(user_id: int) -> str:
+    return f"{SUMMARY_KEY_PREFIX}{user_id}"
+
+
+# ---- Source of truth ----
+def _from_source(orders: QuerySet, limit: Optional[int] = None) -> List[OrderSummary]:
+    rows = (
+        orders
+        .annotate(units=Coalesce(Sum("items__qty"), 0))
+        .values_list("id", "user_id", "status", "total_cents", "currency", "units", "created_at")
+    )
+    if limit is not None:
+        rows = rows[:limit]
+    return [
+        OrderSummary(
+            order_id=order_id,
+            user_id=user_id,
+            status=status,
+            total_cents=total_cents,
+            currency=currency,
+            item_count=units,
+            created_at=created_at,
+        )
+        for order_id, user_id, status, total_cents, currency, units, created_at in rows
+    ]
+
+
+def rebuild_summaries(order_ids: Iterable[int]) -> List[int]:
+    """Overwrites the summaries of `order_ids` from Order and OrderItem, returns the affected user ids."""
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return []
+    summaries = _from_source(Order.objects.filter(id__in=order_ids))
+    OrderSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=["order"],
+        update_fields=["status", "total_cents", "currency", "item_count"],
+    )
+    return sorted({summary.user_id for summary in summaries})
+
+
+# ---- Projection ----
+@register_handler("order.created")
+def project_created(payloads: List[Dict[str, Any]]) -> None:
+    fresh: List[OrderSummary] = []
+    # events written before summaries existed carry no item count, they are read from the source
+    legacy: List[int] = []
+    for payload in payloads:
+        if "item_count" not in payload:
+            legacy.append(payload["order_id"])
+            continue
+        fresh.append(OrderSummary(
+            order_id=payload["order_id"],
+            user_id=payload["user_id"],
+            status=payload["status"],
+            total_cents=payload["total_cents"],
+            currency=payload["currency"],
+            item_count=payload["item_count"],
+            created_at=datetime.fromisoformat(payload["created_at"]),
+        ))
+    # an existing row came from a rebuild or an earlier delivery and is at least as recent
+    OrderSummary.objects.bulk_create(fresh, ignore_conflicts=True)
+    rebuild_summaries(legacy)
+    refresh_cached({payload["user_id"] for payload in payloads})
+
+
+@register_handler("order.status_changed")
+def project_status(payloads: List[Dict[str, Any]]) -> None:
+    latest: Dict[int, str] = {}
+    moves: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for payload in payloads:
+        latest[payload["order_id"]] = payload["status"]
+        moves[(payload["previous_status"], payload["status"])].append(payload["order_id"])
+
+    for (previous, status), order_ids in moves.items():
+        # compare-and-set on the previous status: replayed or reordered events change nothing
+        OrderSummary.objects.filter(order_id__in=order_ids, status=previous).update(status=status)
+
+    current = {
+        order_id: (user_id, status)
+        for order_id, user_id, status in (
+            OrderSummary.objects.filter(order_id__in=list(latest)).values_list("order_id", "user_id", "status")
+        )
+    }
+    # not projected yet, or out of step with the events: take the order as it is now
+    stale = [order_id for order_id, status in latest.items() if current.get(order_id, (None, None))[1] != status]
+    user_ids = set(rebuild_summaries(stale))
+    user_ids.update(user_id for user_id, _ in current.values())
+    refresh_cached(user_ids)
+
+
+# ---- Redis ----
+def _to_payload(summary: OrderSummary) -> Dict[str, Any]:
+    return {
+        "id": summary.order_id,
+        "user_id": summary.user_id,
+        "status": summary.status,
+        "total_cents": summary.total_cents,
+        "currency": summary.currency,
+        "item_count": summary.item_count,
+        "created_at": summary.created_at.isoformat(),
+    }
+
+
+def _as_order(payload: Dict[str, Any]) -> Order:
+    order = Order(
+        id=payload["id"],
+        user_id=payload["user_id"],
+        status=payload["status"],
+        total_cents=payload["total_cents"],
+        currency=payload["currency"],
+        created_at=datetime.fromisoformat(payload["created_at"]),
+    )
+    order._state.adding = False
+    # read by OrderType.item_count instead of loading the items
+    order.item_count = payload["item_count"]
+    return order
+
+
+def _recent(user_ids: List[int], limit: int) -> Dict[int, List[Dict[str, Any]]]:
+    """The `limit` newest summaries per user, one query for all of them."""
+    rows = (
+        OrderSummary.objects
+        .filter(user_id__in=user_ids)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F("user_id")],
+            order_by=[F("created_at").desc(), F("order_id").desc()],
+        ))
+        .filter(rank__lte=limit)
+        .order_by("user_id", "-created_at", "-order_id")
+    )
+    recent: Dict[int, List[Dict[str, Any]]] = {user_id: [] for user_id in user_ids}
+    for summary in rows:
+        recent[summary.user_id].append(_to_payload(summary))
+    return recent
+
+
+def refresh_cached(user_ids: Iterable[int]) -> None:
+    """Rewrites the cached order lists of `user_ids` from the summaries (write-through)."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    recent = _recent(user_ids, settings.ORDER_SUMMARY_CACHE_SIZE)
+    pipe = get_redis().pipeline(transaction=False)
+    for user_id, payloads in recent.items():
+        pipe.set(summary_key(user_id), json.dumps(payloads), ex=settings.ORDER_SUMMARY_CACHE_TTL)
+    pipe.execute()
+
+
+def drop_cached(user_ids: Iterable[int]) -> None:
+    keys = [summary_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        get_redis().delete(*keys)
+
+
+def recent_orders(user_id: int, limit: int) -> List[Order]:
+    """
+    The user's newest orders as Order instances rebuilt from summaries:
+    one Redis GET when cached, one single-table query otherwise.
+    """
+    if limit > settings.ORDER_SUMMARY_CACHE_SIZE:
+        return [_as_order(payload) for payload in _recent([user_id], limit)[user_id]]
+
+    client = get_redis()
+    raw = client.get(summary_key(user_id))
+    if raw is not None:
+        payloads = json.loads(raw)
+    else:
+        # primary: a lagging replica could cache a list the projection already moved past
+        with primary_reads():
+            payloads = _recent([user_id], settings.ORDER_SUMMARY_CACHE_SIZE)[user_id]
+        # NX: a write-through from the projection that got in first is newer than this read
+        client.set(summary_key(user_id), json.dumps(payloads), ex=settings.ORDER_SUMMARY_CACHE_TTL, nx=True)
+    return [_as_order(payload) for payload in payloads[:limit]]
+
+
+# ---- Consistency ----
+def check_summaries(
+        since: Optional[datetime] = None,
+        batch_size: int = 1000,
+        repair: bool = True,
+) -> Dict[str, int]:
+    """
+    Compares the summaries of orders created since `since` (all orders when
+    None) with Order and OrderItem, keyset-walked by id. Missing and drifted
+    rows are rewritten from the source unless `repair` is False.
+    """
+    stats = {"checked": 0, "missing": 0, "drifted": 0}
+    orders = Order.objects.filter(created_at__lt=timezone.now() - _CHECK_GRACE)
+    if since is not None:
+        orders = orders.filter(created_at__gte=since)
+
+    last_id = 0
+    while True:
+        expected = _from_source(orders.filter(id__gt=last_id).order_by("id"), batch_size)
+        if not expected:
+            break
+        last_id = expected[-1].order_id
+        actual = OrderSummary.objects.in_bulk([summary.order_id for summary in expected])
+
+        broken: List[int] = []
+        for summary in expected:
+            projected = actual.get(summary.order_id)
+            if projected is None:
+                stats["missing"] += 1
+            elif any(getattr(projected, name) != getattr(summary, name) for name in _COMPARED_FIELDS):
+                stats["drifted"] += 1
+            else:
+                continue
+            broken.append(summary.order_id)
+        stats["checked"] += len(expected)
+
+        if repair and broken:
+            refresh_cached(rebuild_summaries(broken))
+
+    if stats["missing"] or stats["drifted"]:
+        logger.warning("Order summary check: %s", stats)
+    return stats
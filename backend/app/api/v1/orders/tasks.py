@@ -0,0 +1,25 @@
+from celery import shared_task
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from app.api.v1.orders.services import expire_holds
+from app.api.v1.orders.summaries import check_summaries
+from app.api.v1.orders.waiting_room import get_waiting_room
+
+
+@shared_task(name="orders.expire_reservations", ignore_result=True)
+def expire_reservations() -> int:
+    return expire_holds()
+
+
+@shared_task(name="orders.adapt_admission")
+def adapt_admission() -> dict:
+    return get_waiting_room().adapt()
+
+
+@shared_task(name="orders.check_summaries")
+def check_order_summaries() -> dict:
+    return check_summaries(since=timezone.now() - timedelta(seconds=settings.ORDER_SUMMARY_CHECK_SECONDS))
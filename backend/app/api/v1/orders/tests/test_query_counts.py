@@ -0,0 +1,96 @@
+import uuid
+from typing import Any, Dict
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from strawberry.django.views import TemporalHttpResponse
+
+from app.api.v1.catalog.cache import get_catalog_cache
+from app.api.v1.catalog.models import Product, Stock
+from app.api.v1.common.redis import get_redis
+from app.api.v1.orders.models import Order, OrderItem, Reservation
+from app.api.v1.orders.summaries import rebuild_summaries, summary_key
+from app.api.v1.schema import schema
+from app.api.v1.views import GraphQLContext
+
+User = get_user_model()
+
+# more than one order, so an N+1 shows up as extra queries
+ORDERS = 20
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class QueryCountTests(TestCase):
+    """SQL query budgets of representative documents: one query per nesting level, less where the root joins."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create(username=f"qc-{uuid.uuid4().hex[:12]}")
+        # unique SKUs: the catalog cache lives in Redis and outlasts the test database
+        products = Product.objects.bulk_create(
+            [Product(sku=f"QC-{uuid.uuid4().hex[:12]}", title="Query count", price_cents=100) for _ in range(5)]
+        )
+        Stock.objects.bulk_create([Stock(product=p, available=10) for p in products])
+        orders = Order.objects.bulk_create([Order(user=cls.user, total_cents=300) for _ in range(ORDERS)])
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=o, product=p, qty=1, price_cents=100) for o in orders for p in products[:3]]
+        )
+        Reservation.objects.bulk_create([Reservation(user=cls.user, product=p, qty=1) for p in products])
+        rebuild_summaries([o.id for o in orders])
+        cls.params = {"sku": products[0].sku, "order_id": orders[0].id}
+
+    def setUp(self) -> None:
+        self._drop_caches()
+        # the caches pick up rows that are rolled back after the test
+        self.addCleanup(self._drop_caches)
+
+    def _drop_caches(self) -> None:
+        get_catalog_cache().invalidate([self.params["sku"]])
+        get_redis().delete(summary_key(self.user.id))
+
+    def _execute(self, document: str) -> Any:
+        request = RequestFactory().post("/graphql/")
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        context = GraphQLContext(request=request, response=TemporalHttpResponse())
+        # async_to_sync keeps thread-sensitive ORM calls on this thread's connection
+        return async_to_sync(schema.execute)(document, context_value=context)
+
+    def assertQueryBudget(self, document: str, budget: int, params: Dict[str, Any] | None = None) -> None:
+        with CaptureQueriesContext(connection) as ctx:
+            result = self._execute(document % (params or {}))
+        self.assertIsNone(result.errors)
+        self.assertLessEqual(
+            len(ctx.captured_queries),
+            budget,
+            "\n".join(query["sql"] for query in ctx.captured_queries),
+        )
+
+    def test_products(self) -> None:
+        self.assertQueryBudget("{ products(limit: 50) { id sku stock { available } } }", 1)
+
+    def test_product_stock_product(self) -> None:
+        self.assertQueryBudget('{ product(sku: "%(sku)s") { id stock { available product { sku } } } }', 1, self.params)
+
+    def test_my_orders_deep(self) -> None:
+        self.assertQueryBudget(
+            "{ myOrders { id user { username } items { qty product { sku stock { available } } } } }",
+            5,
+        )
+
+    def test_order_items_order_items(self) -> None:
+        self.assertQueryBudget(
+            "{ order(orderId: %(order_id)d) { items { order { items { product { sku } } } } } }",
+            4,
+            self.params,
+        )
+
+    def test_reservation(self) -> None:
+        self.assertQueryBudget("{ reservation { qty user { id } product { sku stock { available } } } }", 4)
@@ -0,0 +1,343 @@
+import logging
+import secrets
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+from graphql import GraphQLError
+
+from app.api.v1.common.redis import get_redis
+from app.api.v1.common.stats import BatchedCounters
+
+logger = logging.getLogger(__name__)
+
+ROOMS_KEY = "wr:rooms"
+PRODUCT_ROOMS_KEY = "wr:products"
+LATENCY_KEY = "wr:latency"
+
+# Admission frontier: tickets up to `frontier` are admitted. It is advanced
+# lazily by every script call at `rate` tickets/s and never passes the last
+# ticket issued, so an idle room does not bank admissions for the next burst.
+# KEYS: cfg, state, seq, ...
+_ADVANCE_LUA = """
+local function advance(now)
+    local rate = tonumber(redis.call('HGET', KEYS[1], 'rate'))
+    if not rate then
+        return nil, nil
+    end
+    local state = redis.call('HMGET', KEYS[2], 'frontier', 'ts')
+    local frontier = tonumber(state[1]) or 0
+    local ts = tonumber(state[2]) or now
+    local issued = tonumber(redis.call('GET', KEYS[3]) or '0')
+    frontier = math.min(issued, frontier + math.max(0, now - ts) * rate / 1000)
+    redis.call('HSET', KEYS[2], 'frontier', tostring(frontier), 'ts', now)
+    return math.floor(frontier), rate
+end
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+"""
+
+# KEYS: cfg, state, seq, tickets, users; ARGV: new token, user id
+# Returns {ticket, frontier, token}, or {-1} when the room is closed.
+_JOIN_LUA = _ADVANCE_LUA + """
+local frontier = advance(now)
+if not frontier then
+    return {-1}
+end
+local token = redis.call('HGET', KEYS[5], ARGV[2])
+local ticket = token and redis.call('HGET', KEYS[4], token)
+if not ticket then
+    token = ARGV[1]
+    ticket = redis.call('INCR', KEYS[3])
+    redis.call('HSET', KEYS[4], token, ticket)
+    redis.call('HSET', KEYS[5], ARGV[2], token)
+end
+return {tonumber(ticket), frontier, token}
+"""
+
+# KEYS: cfg, state, seq, tickets, admitted; ARGV: token, admission window ms, claim (0|1)
+# Returns {status, position or remaining ms, eta ms, ticket, admitted at}:
+# status 1 admitted, 0 waiting, -1 room closed, -2 unknown token, -3 admission expired.
+# A claim removes the token so it admits one order; restore puts it back.
+_STATUS_LUA = _ADVANCE_LUA + """
+local frontier, rate = advance(now)
+if not frontier then
+    return {-1, 0, 0, 0, 0}
+end
+local ticket = tonumber(redis.call('HGET', KEYS[4], ARGV[1]))
+if not ticket then
+    return {-2, 0, 0, 0, 0}
+end
+if ticket > frontier then
+    local position = ticket - frontier
+    return {0, position, math.ceil(position * 1000 / rate), ticket, 0}
+end
+local admitted_at = tonumber(redis.call('HGET', KEYS[5], ARGV[1]))
+if not admitted_at then
+    admitted_at = now
+    redis.call('HSET', KEYS[5], ARGV[1], now)
+end
+local remaining = admitted_at + tonumber(ARGV[2]) - now
+if remaining <= 0 then
+    return {-3, 0, 0, ticket, admitted_at}
+end
+if ARGV[3] == '1' then
+    redis.call('HDEL', KEYS[4], ARGV[1])
+    redis.call('HDEL', KEYS[5], ARGV[1])
+end
+return {1, remaining, 0, ticket, admitted_at}
+"""
+
+# KEYS: cfg, state, seq; ARGV: rate. Settles the frontier at the old rate first.
+_SET_RATE_LUA = _ADVANCE_LUA + """
+if not advance(now) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'rate', ARGV[1])
+return 1
+"""
+
+
+class AdmissionError(GraphQLError):
+    def __init__(self, message: str, code: str, retry_after: Optional[float] = None) -> None:
+        extensions = {"code": code}
+        if retry_after is not None:
+            extensions["retryAfter"] = round(retry_after, 3)
+        super().__init__(message, extensions=extensions)
+        self.code = code
+
+
+@dataclass
+class RoomStatus:
+    # admitted | waiting | expired | invalid | closed
+    state: str
+    position: int = 0
+    eta_seconds: float = 0.0
+    expires_in: float = 0.0
+
+
+_STATES = {1: "admitted", 0: "waiting", -1: "closed", -2: "invalid", -3: "expired"}
+
+
+def _room_keys(room: str) -> List[str]:
+    prefix = f"wr:{room}:"
+    return [prefix + name for name in ("cfg", "state", "seq", "tickets", "admitted", "users")]
+
+
+def _split_token(token: str) -> Optional[str]:
+    room, sep, _ = token.rpartition(".")
+    return room if sep and room else None
+
+
+class WaitingRoom:
+    """
+    Virtual waiting room in front of create_order for drop launches.
+
+    Each room gates a set of products. Clients join and get an opaque token
+    holding a FIFO ticket; tickets are admitted at the room's rate (tickets/s)
+    and an admitted token buys one order within WAITING_ROOM_ADMISSION_SECONDS.
+    Every call is a single Lua script, the database is never touched while
+    clients wait.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or get_redis()
+        self._join = self.client.register_script(_JOIN_LUA)
+        self._status = self.client.register_script(_STATUS_LUA)
+        self._set_rate = self.client.register_script(_SET_RATE_LUA)
+        self.latency = BatchedCounters(LATENCY_KEY, flush_every=20, flush_seconds=1.0)
+
+    # ---- Rooms ----
+    def open(
+            self,
+            room: str,
+            product_ids: Iterable[int],
+            rate: float,
+            min_rate: Optional[float] = None,
+            max_rate: Optional[float] = None,
+    ) -> None:
+        """Gates `product_ids` behind `room`; the rate adapts between min and max when both are given."""
+        if "." in room:
+            raise ValueError("Room names cannot contain '.'.")
+        if rate <= 0 or (min_rate is not None and min_rate <= 0):
+            raise ValueError("Admission rates must be > 0.")
+        cfg = {"rate": rate}
+        if min_rate is not None and max_rate is not None:
+            cfg.update(min_rate=min_rate, max_rate=max_rate)
+        pipe = self.client.pipeline()
+        pipe.delete(_room_keys(room)[0])
+        pipe.hset(_room_keys(room)[0], mapping=cfg)
+        pipe.sadd(ROOMS_KEY, room)
+        for product_id in product_ids:
+            pipe.hset(PRODUCT_ROOMS_KEY, product_id, room)
+        pipe.execute()
+
+    def close(self, room: str) -> None:
+        """Lifts the gate and drops the queue."""
+        product_ids = [pid for pid, owner in self.client.hgetall(PRODUCT_ROOMS_KEY).items() if owner == room]
+        pipe = self.client.pipeline()
+        if product_ids:
+            pipe.hdel(PRODUCT_ROOMS_KEY, *product_ids)
+        pipe.srem(ROOMS_KEY, room)
+        pipe.delete(*_room_keys(room))
+        pipe.execute()
+
+    def set_rate(self, room: str, rate: float) -> bool:
+        if rate <= 0:
+            raise ValueError("Admission rates must be > 0.")
+        return bool(self._set_rate(keys=_room_keys(room)[:3], args=[rate]))
+
+    def rooms(self) -> Dict[str, Dict[str, float]]:
+        pipe = self.client.pipeline(transaction=False)
+        names = sorted(self.client.smembers(ROOMS_KEY))
+        for room in names:
+            pipe.hgetall(_room_keys(room)[0])
+            pipe.get(_room_keys(room)[2])
+            pipe.hget(_room_keys(room)[1], "frontier")
+        values = pipe.execute()
+        rooms = {}
+        for i, room in enumerate(names):
+            cfg, issued, frontier = values[3 * i: 3 * i + 3]
+            rooms[room] = {
+                **{name: float(value) for name, value in cfg.items()},
+                "issued": int(issued or 0),
+                "frontier": float(frontier or 0),
+            }
+        return rooms
+
+    def room_for(self, product_ids: Iterable[int]) -> Dict[int, str]:
+        """product_id -> room for the gated products among `product_ids`."""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        rooms = self.client.hmget(PRODUCT_ROOMS_KEY, product_ids)
+        return {pid: room for pid, room in zip(product_ids, rooms) if room is not None}
+
+    # ---- Tickets ----
+    def join(self, product_id: int, user_id: int) -> Optional[str]:
+        """Returns the user's token for the room gating `product_id`, None when it is not gated."""
+        room = self.room_for([product_id]).get(product_id)
+        if room is None:
+            return None
+        keys = _room_keys(room)
+        token = f"{room}.{secrets.token_urlsafe(16)}"
+        result = self._join(keys=keys[:4] + keys[5:], args=[token, user_id])
+        if result[0] == -1:
+            return None
+        return result[2]
+
+    def _check(self, token: str, claim: bool) -> List[int]:
+        room = _split_token(token)
+        if room is None:
+            return [-2, 0, 0, 0, 0]
+        window_ms = settings.WAITING_ROOM_ADMISSION_SECONDS * 1000
+        return self._status(keys=_room_keys(room)[:5], args=[token, window_ms, int(claim)])
+
+    def status(self, token: str) -> RoomStatus:
+        code, value, eta_ms, _, _ = self._check(token, claim=False)
+        state = _STATES[code]
+        if state == "waiting":
+            return RoomStatus(state, position=value, eta_seconds=eta_ms / 1000)
+        if state == "admitted":
+            return RoomStatus(state, expires_in=value / 1000)
+        return RoomStatus(state)
+
+    def _gate(self, token: Optional[str], product_ids: Iterable[int], claim: bool) -> Optional[Tuple[str, List[int]]]:
+        """(room, status script result) for an admitted token, None for an ungated cart; AdmissionError otherwise."""
+        rooms = set(self.room_for(product_ids).values())
+        if not rooms:
+            return None
+        if len(rooms) > 1:
+            raise AdmissionError("Cart mixes products from different drops.", "ADMISSION_MIXED_ROOMS")
+        room = rooms.pop()
+        if not token or _split_token(token) != room:
+            raise AdmissionError("Join the waiting room for this drop first.", "ADMISSION_REQUIRED")
+
+        result = self._check(token, claim=claim)
+        code, value, eta_ms = result[:3]
+        if code == 0:
+            raise AdmissionError(
+                f"Still waiting, position {value}.", "ADMISSION_WAITING", retry_after=eta_ms / 1000
+            )
+        if code in (-2, -3):
+            raise AdmissionError("Admission token is invalid or expired, join again.", "ADMISSION_INVALID")
+        return room, result
+
+    def check(self, token: Optional[str], product_ids: Iterable[int]) -> None:
+        """Raises the AdmissionError admit would, without spending the token."""
+        self._gate(token, product_ids, claim=False)
+
+    @contextmanager
+    def admit(self, token: Optional[str], product_ids: Iterable[int]) -> Iterator[None]:
+        """
+        Runs the block (the order) if `token` is admitted to the room gating the
+        gated products in `product_ids`; ungated carts pass without a token.
+        The token is spent when the block succeeds and handed back when it fails.
+        """
+        gated = self._gate(token, product_ids, claim=True)
+        if gated is None:
+            yield
+            return
+        room, (code, _, _, ticket, admitted_at) = gated
+
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            if code == 1:
+                self._restore(room, token, ticket, admitted_at)
+            raise
+        finally:
+            self.latency.add("seconds", time.perf_counter() - started)
+            self.latency.incr("count")
+
+    def _restore(self, room: str, token: str, ticket: int, admitted_at: int) -> None:
+        keys = _room_keys(room)
+        pipe = self.client.pipeline()
+        pipe.hset(keys[3], token, ticket)
+        pipe.hset(keys[4], token, admitted_at)
+        pipe.execute()
+
+    # ---- Adaptive rate ----
+    def take_latency(self) -> Optional[float]:
+        """Mean order latency since the last call, in seconds; None without orders."""
+        pipe = self.client.pipeline()
+        pipe.hgetall(LATENCY_KEY)
+        pipe.delete(LATENCY_KEY)
+        counters = pipe.execute()[0]
+        count = float(counters.get("count", 0))
+        return float(counters.get("seconds", 0)) / count if count else None
+
+    def adapt(self) -> Dict[str, float]:
+        """
+        AIMD on every adaptive room: the rate is cut by WAITING_ROOM_BACKOFF while
+        the mean order latency is over WAITING_ROOM_TARGET_LATENCY_MS, and grows by
+        a tenth of its range while it is under. Returns room -> new rate.
+        """
+        latency = self.take_latency()
+        if latency is None:
+            return {}
+        target = settings.WAITING_ROOM_TARGET_LATENCY_MS / 1000
+        changed: Dict[str, float] = {}
+        for room, cfg in self.rooms().items():
+            if "min_rate" not in cfg:
+                continue
+            rate, low, high = cfg["rate"], cfg["min_rate"], cfg["max_rate"]
+            if latency > target:
+                new_rate = max(low, rate * settings.WAITING_ROOM_BACKOFF)
+            else:
+                new_rate = min(high, rate + (high - low) / 10)
+            if new_rate != rate and self.set_rate(room, new_rate):
+                changed[room] = new_rate
+        if changed:
+            logger.info("Waiting room rates at %.1f ms order latency: %s", latency * 1000, changed)
+        return changed
+
+
+@lru_cache(maxsize=1)
+def get_waiting_room() -> WaitingRoom:
+    return WaitingRoom()
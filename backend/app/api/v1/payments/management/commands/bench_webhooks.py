@@ -0,0 +1,172 @@
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from app.api.v1.common.stats import percentile
+from app.api.v1.orders.models import Order
+from app.api.v1.payments.services import process_webhooks, sign_payload
+from app.api.v1.payments.views import StripeWebhookView
+
+PATH = "/api/v1/payments/webhooks/stripe/"
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays signed Stripe-style webhooks at a target rate, with a share of provider "
+        "retries, and reports ack latency; --drain then times the batch processing. "
+        "Payment events reference CREATED orders, which --drain marks PAID: dev databases only."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--events", type=int, default=50_000, help="Deliveries to send (default: 50000).")
+        parser.add_argument("--rate", type=int, default=10_000, help="Target deliveries per second (default: 10000).")
+        parser.add_argument(
+            "--duplicates",
+            type=float,
+            default=0.3,
+            help="Share of deliveries that are retries of an earlier event (default: 0.3).",
+        )
+        parser.add_argument("--workers", type=int, default=16, help="Sender threads (default: 16).")
+        parser.add_argument(
+            "--url",
+            default=None,
+            help="Base URL of a running server, e.g. http://127.0.0.1:8010; in-process view calls if omitted.",
+        )
+        parser.add_argument("--drain", action="store_true", help="Process the queue afterwards and time it.")
+
+    def handle(self, *args, **options) -> None:
+        deliveries = self._generate(options["events"], options["duplicates"])
+        result = self._replay(deliveries, options["rate"], options["workers"], options["url"])
+        self.stdout.write(self.style.SUCCESS(f"ingest: {result}"))
+
+        if options["drain"]:
+            started = time.perf_counter()
+            totals = {"events": 0, "processed": 0, "paid": 0, "dead": 0}
+            while True:
+                stats = process_webhooks()
+                for name, value in stats.items():
+                    totals[name] += value
+                if not stats["events"]:
+                    break
+            elapsed = time.perf_counter() - started
+            totals["events_per_s"] = round(totals["events"] / elapsed, 1) if elapsed else 0.0
+            self.stdout.write(self.style.SUCCESS(f"drain: {totals}"))
+
+    @staticmethod
+    def _generate(count: int, duplicates: float) -> List[Tuple[bytes, str]]:
+        """Signed (body, signature) pairs; signing is done up front so it is not timed."""
+        order_ids = list(
+            Order.objects.filter(status=Order.Status.CREATED).values_list("id", flat=True)[:10_000]
+        )
+        rng = random.Random(42)
+        secret = settings.STRIPE_WEBHOOK_SECRET
+        sent: List[Tuple[bytes, str]] = []
+        for _ in range(count):
+            if sent and rng.random() < duplicates:
+                # a retry is the same event, re-signed at delivery time
+                body = rng.choice(sent)[0]
+            else:
+                event = {
+                    "id": f"evt_{uuid.uuid4().hex}",
+                    "type": "payment_intent.succeeded" if order_ids else "charge.updated",
+                    "created": int(time.time()),
+                    "data": {"object": {
+                        "id": f"pi_{uuid.uuid4().hex[:24]}",
+                        "metadata": {"order_id": str(rng.choice(order_ids))} if order_ids else {},
+                    }},
+                }
+                body = json.dumps(event, separators=(",", ":")).encode()
+            sent.append((body, sign_payload(body, secret)))
+        return sent
+
+    def _replay(
+            self,
+            deliveries: List[Tuple[bytes, str]],
+            rate: int,
+            workers: int,
+            url: Optional[str],
+    ) -> Dict[str, float]:
+        latencies: List[float] = []
+        counts = {"acked": 0, "duplicates": 0, "errors": 0}
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        def sender(offset: int) -> None:
+            send = self._http_sender(url) if url else self._view_sender()
+            local: List[float] = []
+            acked = dup = errors = 0
+            for i in range(offset, len(deliveries), workers):
+                # open loop: delivery i is due at i / rate, late ones go out immediately
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                body, signature = deliveries[i]
+                sent_at = time.perf_counter()
+                status, duplicate = send(body, signature)
+                local.append(time.perf_counter() - sent_at)
+                if status == 200:
+                    acked += 1
+                    dup += duplicate
+                else:
+                    errors += 1
+            with lock:
+                latencies.extend(local)
+                counts["acked"] += acked
+                counts["duplicates"] += dup
+                counts["errors"] += errors
+
+        threads = [threading.Thread(target=sender, args=(n,)) for n in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "events_per_s": round(len(latencies) / elapsed, 1),
+            "target_per_s": rate,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "under_5ms": round(sum(1 for x in latencies if x < 0.005) / len(latencies), 4) if latencies else 0.0,
+            **counts,
+        }
+
+    @staticmethod
+    def _view_sender():
+        view = StripeWebhookView.as_view()
+        factory = RequestFactory()
+
+        def send(body: bytes, signature: str) -> Tuple[int, bool]:
+            request = factory.post(PATH, data=body, content_type="application/json",
+                                   HTTP_STRIPE_SIGNATURE=signature)
+            response = view(request)
+            response.render()
+            return response.status_code, bool(response.data.get("duplicate"))
+
+        return send
+
+    @staticmethod
+    def _http_sender(url: str):
+        parts = urlsplit(url)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+
+        def send(body: bytes, signature: str) -> Tuple[int, bool]:
+            conn.request("POST", parts.path.rstrip("/") + PATH, body=body, headers={
+                "Content-Type": "application/json",
+                "Stripe-Signature": signature,
+            })
+            response = conn.getresponse()
+            data = response.read()
+            duplicate = response.status == 200 and json.loads(data).get("duplicate", False)
+            return response.status, duplicate
+
+        return send
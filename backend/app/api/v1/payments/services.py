@@ -0,0 +1,306 @@
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+
+from app.api.v1.common.redis import get_redis
+from app.api.v1.orders.models import Order
+from app.api.v1.orders.services import transition_orders
+from app.api.v1.payments.models import ProcessedWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+STRIPE = "stripe"
+WEBHOOK_METRICS_KEY = "webhooks:metrics"
+
+# event types that mean the order referenced in metadata.order_id is paid
+PAID_EVENT_TYPES = {"payment_intent.succeeded", "checkout.session.completed"}
+
+
+class WebhookSignatureError(Exception):
+    pass
+
+
+# ---- Signature ----
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Builds a Stripe-Signature header value, used by the replay benchmark."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_signature(payload: bytes, header: str, secret: str, tolerance: int) -> None:
+    """Checks a `t=<ts>,v1=<hex>[,v1=...]` header the way Stripe signs webhooks."""
+    timestamp: Optional[int] = None
+    signatures: List[str] = []
+    for part in header.split(","):
+        name, _, value = part.strip().partition("=")
+        if name == "t":
+            try:
+                timestamp = int(value)
+            except ValueError as exc:
+                raise WebhookSignatureError("Invalid signature timestamp.") from exc
+        elif name == "v1":
+            signatures.append(value)
+    if timestamp is None or not signatures:
+        raise WebhookSignatureError("Malformed signature header.")
+    if abs(time.time() - timestamp) > tolerance:
+        raise WebhookSignatureError("Signature timestamp outside the tolerance window.")
+
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise WebhookSignatureError("Signature mismatch.")
+
+
+# ---- Ingestion ----
+# KEYS: queue, metrics hash, today's seen set, older seen sets
+# ARGV: event id, raw event, seen set ttl
+_ACCEPT_LUA = """
+for i = 4, #KEYS do
+    if redis.call('SISMEMBER', KEYS[i], ARGV[1]) == 1 then
+        redis.call('HINCRBY', KEYS[2], 'duplicates', 1)
+        return 0
+    end
+end
+if redis.call('SADD', KEYS[3], ARGV[1]) == 0 then
+    redis.call('HINCRBY', KEYS[2], 'duplicates', 1)
+    return 0
+end
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+redis.call('RPUSH', KEYS[1], ARGV[2])
+redis.call('HINCRBY', KEYS[2], 'accepted', 1)
+return 1
+"""
+
+
+@lru_cache(maxsize=1)
+def _accept_script():
+    return get_redis().register_script(_ACCEPT_LUA)
+
+
+def queue_key(provider: str) -> str:
+    return f"webhooks:queue:{provider}"
+
+
+def _seen_key(provider: str, day: date) -> str:
+    return f"webhooks:seen:{provider}:{day:%Y%m%d}"
+
+
+def accept_event(provider: str, event_id: str, raw: str) -> bool:
+    """
+    Dedups the event against the per-day seen sets and queues it, in one Redis
+    round trip. Returns False for a duplicate. Postgres is not touched here, the
+    unique (provider, event_id) constraint backs this up when the batch lands.
+    """
+    today = date.today()
+    days = settings.WEBHOOK_DEDUP_DAYS
+    keys = [queue_key(provider), WEBHOOK_METRICS_KEY]
+    keys += [_seen_key(provider, today - timedelta(days=offset)) for offset in range(days)]
+    ttl = (days + 1) * 24 * 60 * 60
+    return bool(_accept_script()(keys=keys, args=[event_id, raw, ttl]))
+
+
+def dead_letter_key(provider: str) -> str:
+    return f"webhooks:dead:{provider}"
+
+
+# ---- Drainer lock ----
+# Owner-checked: an expired drainer whose lock was taken over can neither extend,
+# release nor trim, the new owner replays its batch (deduped by the event table).
+# KEYS: lock; ARGV: token, ttl ms
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: lock; ARGV: token
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: lock, queue, dead-letter list; ARGV: token, events handled, dead events...
+_ACK_LUA = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('LTRIM', KEYS[2], ARGV[2], -1)
+for i = 3, #ARGV do
+    redis.call('RPUSH', KEYS[3], ARGV[i])
+end
+return 1
+"""
+
+_LOCK_MS = 60_000
+
+
+@lru_cache(maxsize=1)
+def _lock_scripts():
+    client = get_redis()
+    return (
+        client.register_script(_RENEW_LUA),
+        client.register_script(_RELEASE_LUA),
+        client.register_script(_ACK_LUA),
+    )
+
+
+# ---- Processing ----
+def _order_id(event: Dict[str, Any]) -> Optional[int]:
+    obj = (event.get("data") or {}).get("object")
+    if not isinstance(obj, dict):
+        return None
+    if event["type"] == "checkout.session.completed" and obj.get("payment_status") != "paid":
+        return None
+    try:
+        return int((obj.get("metadata") or {})["order_id"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _parse(raw: str) -> Optional[Dict[str, Any]]:
+    try:
+        event = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(event, dict) or not isinstance(event.get("id"), str) or not isinstance(event.get("type"), str):
+        return None
+    if not isinstance(event.get("data") or {}, dict):
+        return None
+    return event
+
+
+def _apply_events(provider: str, events: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    with transaction.atomic():
+        known = set(
+            ProcessedWebhookEvent.objects
+            .filter(provider=provider, event_id__in=list(events))
+            .values_list("event_id", flat=True)
+        )
+        fresh = [event for event_id, event in events.items() if event_id not in known]
+        ProcessedWebhookEvent.objects.bulk_create(
+            [ProcessedWebhookEvent(provider=provider, event_id=event["id"], payload=event) for event in fresh],
+            ignore_conflicts=True,
+        )
+
+        order_ids: Set[int] = set()
+        for event in fresh:
+            if event["type"] in PAID_EVENT_TYPES:
+                order_id = _order_id(event)
+                if order_id is None:
+                    logger.warning("Webhook %s/%s has no order reference", provider, event["id"])
+                    continue
+                order_ids.add(order_id)
+
+        # only CREATED orders move, replays and late events for canceled orders are no-ops
+        paid = transition_orders(order_ids, Order.Status.PAID) if order_ids else []
+
+    return {"processed": len(fresh), "paid": len(paid)}
+
+
+def _process_batch(provider: str, raw_events: List[str]) -> Tuple[Dict[str, int], List[str]]:
+    """Processes the batch, returns its stats and the raw events to dead-letter."""
+    events: Dict[str, Dict[str, Any]] = {}
+    raws: Dict[str, str] = {}
+    dead: List[str] = []
+    for raw in raw_events:
+        event = _parse(raw)
+        if event is None:
+            logger.error("Malformed webhook event on %s, dead-lettered", provider)
+            dead.append(raw)
+            continue
+        events.setdefault(event["id"], event)
+        raws.setdefault(event["id"], raw)
+
+    try:
+        stats = _apply_events(provider, events)
+    except (OperationalError, InterfaceError):
+        # the database is away, the whole batch stays queued
+        raise
+    except Exception:
+        # one event broke the batch transaction: apply them one by one and set the culprits aside
+        logger.exception("Webhook batch on %s failed, retrying event by event", provider)
+        stats = {"processed": 0, "paid": 0}
+        for event_id, event in events.items():
+            try:
+                single = _apply_events(provider, {event_id: event})
+            except (OperationalError, InterfaceError):
+                raise
+            except Exception:
+                logger.exception("Webhook %s/%s failed, dead-lettered", provider, event_id)
+                dead.append(raws[event_id])
+                continue
+            for name, value in single.items():
+                stats[name] += value
+
+    return {"events": len(raw_events), "dead": len(dead), **stats}, dead
+
+
+def process_webhooks(
+        provider: str = STRIPE,
+        batch_size: int | None = None,
+        max_batches: int | None = None,
+) -> Dict[str, int]:
+    """
+    Drains the provider queue in batches. A single drainer runs at a time (Redis
+    lock, renewed before every batch), and a batch is only trimmed off the queue
+    after its transaction commits and while the lock is still ours; a crash or a
+    lost lock in between replays the batch, which the event table dedups.
+    Events that cannot be processed move to the dead-letter list instead of
+    blocking the queue.
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    max_batches = max_batches or settings.WEBHOOK_MAX_BATCHES_PER_RUN
+    client = get_redis()
+    renew, release, ack = _lock_scripts()
+    key = queue_key(provider)
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    totals = {"events": 0, "processed": 0, "paid": 0, "dead": 0}
+    if not client.set(lock_key, token, nx=True, px=_LOCK_MS):
+        return totals
+
+    try:
+        for _ in range(max_batches):
+            if not renew(keys=[lock_key], args=[token, _LOCK_MS]):
+                logger.warning("Webhook drainer on %s lost its lock, stopping", provider)
+                break
+            raw_events = client.lrange(key, 0, batch_size - 1)
+            if not raw_events:
+                break
+            stats, dead = _process_batch(provider, raw_events)
+            if not ack(keys=[lock_key, key, dead_letter_key(provider)], args=[token, len(raw_events), *dead]):
+                logger.warning("Webhook drainer on %s lost its lock mid-batch, the next one replays it", provider)
+                break
+            for name, value in stats.items():
+                totals[name] += value
+            if len(raw_events) < batch_size:
+                break
+    finally:
+        release(keys=[lock_key], args=[token])
+
+    if totals["events"]:
+        pipe = client.pipeline(transaction=False)
+        for name, value in totals.items():
+            pipe.hincrby(WEBHOOK_METRICS_KEY, name, value)
+        pipe.execute()
+    return totals
+
+
+def webhook_metrics(provider: str = STRIPE) -> Dict[str, int]:
+    client = get_redis()
+    metrics = {name: int(value) for name, value in client.hgetall(WEBHOOK_METRICS_KEY).items()}
+    metrics["queued"] = client.llen(queue_key(provider))
+    metrics["dead_lettered"] = client.llen(dead_letter_key(provider))
+    return metrics
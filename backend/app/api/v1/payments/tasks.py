@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from app.api.v1.payments.services import process_webhooks
+
+
+@shared_task(name="payments.process_webhooks", ignore_result=True)
+def process_webhooks_task() -> dict:
+    return process_webhooks()
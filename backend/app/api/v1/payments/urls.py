@@ -0,0 +1,7 @@
+from django.urls import path
+
+from app.api.v1.payments.views import StripeWebhookView
+
+urlpatterns = [
+    path("webhooks/stripe/", StripeWebhookView.as_view(), name="stripe-webhook"),
+]
@@ -0,0 +1,56 @@
+import json
+import logging
+
+from django.conf import settings
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from app.api.v1.payments.services import STRIPE, WebhookSignatureError, accept_event, verify_signature
+
+logger = logging.getLogger(__name__)
+
+
+class StripeWebhookView(APIView):
+    """
+    Verifies, dedups and queues the event, then acks; the work happens in the
+    payments.process_webhooks task. Kept to one Redis call so retry storms are
+    answered quickly instead of piling up on Postgres.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    parser_classes = []
+    renderer_classes = [JSONRenderer]
+    throttle_classes = []
+
+    def post(self, request):
+        payload = request.body
+        try:
+            verify_signature(
+                payload,
+                request.headers.get("Stripe-Signature", ""),
+                settings.STRIPE_WEBHOOK_SECRET,
+                settings.STRIPE_WEBHOOK_TOLERANCE_SECONDS,
+            )
+        except WebhookSignatureError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            event = json.loads(payload)
+            event_id, event_type = event["id"], event["type"]
+        except (ValueError, KeyError, TypeError):
+            return Response({"detail": "Malformed event."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(event_id, str) or not isinstance(event_type, str):
+            return Response({"detail": "Malformed event."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            accepted = accept_event(STRIPE, event_id, payload.decode())
+        except RedisError:
+            # not acked, the provider retries
+            logger.exception("Could not queue webhook %s", event_id)
+            return Response({"detail": "Try again later."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        return Response({"received": True, "duplicate": not accepted})
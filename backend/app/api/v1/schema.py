@@ -1,11 +1,19 @@
 import strawberry
 
-from app.api.v1.catalog.schema import CatalogQuery, CatalogMutation
-from app.api.v1.orders.schema import OrdersQuery, OrdersMutation
+from app.api.v1.analytics.schema import AnalyticsQuery
+from app.api.v1.catalog.schema import CatalogQuery, CatalogMutation, CatalogSubscription
+from app.api.v1.common.complexity import QueryCostExtension
+from app.api.v1.common.extensions import OperationScopeExtension
+from app.api.v1.common.persisted_queries import PersistedQueryExtension
+from app.api.v1.common.rate_limit import RateLimitExtension
+from app.api.v1.common.replicas import ReplicaReadExtension
+from app.api.v1.common.tracing import TracingExtension
+from app.api.v1.orders.schema import OrdersQuery, OrdersMutation, OrdersSubscription
 
 
 @strawberry.type
 class Query(
+    AnalyticsQuery,
     CatalogQuery,
     OrdersQuery,
 ):
@@ -20,5 +28,28 @@ class Mutation(
     pass
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+@strawberry.type
+class Subscription(
+    CatalogSubscription,
+    OrdersSubscription,
+):
+    pass
+
+
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=[
+        OperationScopeExtension,
+        # resolves hash-only requests and serves cached documents before parsing
+        PersistedQueryExtension,
+        TracingExtension,
+        # cheap rejection first, over-budget documents do not spend rate limit tokens
+        QueryCostExtension,
+        RateLimitExtension,
+        # after the rate limit check, whose session and user lookups stay on the primary
+        ReplicaReadExtension,
+    ],
+)
 
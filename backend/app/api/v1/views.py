@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest, HttpResponse
+from django.http.request import HttpHeaders
+from django.views.decorators.http import require_GET
+from strawberry.channels import GraphQLWSConsumer
+from strawberry.django.context import StrawberryDjangoContext
+from strawberry.django.views import AsyncGraphQLView
+
+from app.api.v1.common.loaders import Loaders
+from app.api.v1.common.metrics import render_metrics
+
+
+@dataclass
+class GraphQLContext(StrawberryDjangoContext):
+    loaders: Loaders = field(default_factory=Loaders)
+
+
+class GraphQLView(AsyncGraphQLView):
+    async def get_context(self, request: HttpRequest, response: HttpResponse) -> GraphQLContext:
+        return GraphQLContext(request=request, response=response)
+
+
+class SocketRequest:
+    """The parts of HttpRequest the schema extensions and resolvers read, taken from a websocket handshake."""
+
+    def __init__(self, scope: Dict[str, Any]) -> None:
+        client = scope.get("client") or ("", 0)
+        self.META: Dict[str, str] = {"REMOTE_ADDR": client[0]}
+        for name, value in scope.get("headers", []):
+            self.META["HTTP_" + name.decode("latin1").upper().replace("-", "_")] = value.decode("latin1")
+        self.headers = HttpHeaders(self.META)
+        self.COOKIES: Dict[str, str] = scope.get("cookies", {})
+        # resolved by AuthMiddlewareStack from the session cookie before the consumer starts
+        self.user = scope.get("user") or AnonymousUser()
+
+    async def auser(self):
+        return self.user
+
+
+class GraphQLSocketConsumer(GraphQLWSConsumer):
+    """
+    Subscriptions (stockChanged, orderStatusChanged) over graphql-transport-ws.
+    The context lives as long as the connection, loaders included, so the
+    socket is meant for subscriptions; queries belong on the HTTP view.
+    """
+
+    async def get_context(self, request: GraphQLWSConsumer, response: GraphQLWSConsumer) -> GraphQLContext:
+        return GraphQLContext(request=SocketRequest(request.scope), response=None)
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
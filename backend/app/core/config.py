@@ -43,6 +43,17 @@ class Settings(BaseSettings):
     postgres_password: str
     postgres_host: str = "localhost"
     postgres_port: int = 5432
+    # "host" or "host:port" of streaming replicas, same database and credentials
+    postgres_replica_hosts: List[str] = Field(default_factory=list)
+
+    # DB CONNECTIONS
+    db_pool_mode: str = Field(default="pool", description="pool|pgbouncer|none")
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_pool_timeout: float = 5.0
+    replica_sticky_seconds: int = 5
+    replica_max_lag_seconds: float = 2.0
+    replica_health_interval: float = 5.0
 
     # BACKEND
     debug: bool = False
@@ -56,14 +67,94 @@ class Settings(BaseSettings):
     # REDIS
     redis_url: AnyUrl
 
+    # STOCK
+    stock_backend: str = Field(default="redis", description="redis|db")
+    stock_sync_batch_size: int = 500
+
+    # OUTBOX
+    outbox_batch_size: int = 200
+    outbox_max_batches_per_run: int = 50
+    outbox_stream_prefix: str = "outbox:"
+    outbox_stream_maxlen: int = 100_000
+
+    # IDEMPOTENCY
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    idempotency_inflight_seconds: int = 30
+
+    # RATE LIMIT
+    rate_limit_enabled: bool = True
+    rate_limit_ip_multiplier: int = 5
+
+    # CATALOG CACHE
+    catalog_cache_ttl: int = 30
+    catalog_cache_local_ttl: float = 2.0
+    catalog_cache_local_size: int = 10_000
+    catalog_cache_lock_seconds: float = 2.0
+
+    # PAGINATION
+    pagination_max_page_size: int = 100
+
+    # QUERY COST
+    query_max_cost: int = 5000
+    query_max_depth: int = 10
+    query_cost_default_list_size: int = 10
+
+    # PERSISTED QUERIES
+    apq_ttl_seconds: int = 7 * 24 * 60 * 60
+    graphql_document_cache_size: int = 1000
+
+    # TRACING
+    tracing_sample_rate: float = 0.1
+    tracing_log_min_ms: float = 0.0
+
+    # RESERVATIONS
+    reservation_ttl_seconds: int = 15 * 60
+    reservation_sweep_batch_size: int = 1000
+    reservation_sweep_max_batches: int = 100
+
+    # ORDERS
+    order_transition_batch_size: int = 1000
+    order_summary_cache_size: int = 50
+    order_summary_cache_ttl: int = 300
+    order_summary_check_seconds: int = 60 * 60
+
+    # ANALYTICS
+    analytics_rollup_overlap_seconds: int = 120
+    analytics_max_points: int = 2000
+
+    # WAITING ROOM
+    waiting_room_admission_seconds: int = 120
+    waiting_room_target_latency_ms: float = 250.0
+    waiting_room_backoff: float = 0.7
+
+    # LIVE UPDATES
+    live_stock_max_pushes_per_second: float = 2.0
+
+    # FETCHER (Go worker)
+    fetcher_queue_key: str = "fetcher:queue"
+    fetcher_result_prefix: str = "fetcher:result:"
+    fetcher_enqueue_chunk: int = 500
+    fetcher_result_ttl: int = 300
+    fetcher_timeout_seconds: float = 30.0
+
+    # PAYMENT WEBHOOKS
+    stripe_webhook_secret: str = "dev_stripe_webhook_secret"
+    stripe_webhook_tolerance_seconds: int = 300
+    webhook_dedup_days: int = 3
+    webhook_batch_size: int = 500
+    webhook_max_batches_per_run: int = 40
+
     run: RunModel = RunModel()
     api: ApiPrefix = ApiPrefix()
 
     @property
     def database_url(self) -> str:
+        return self.database_url_for(self.postgres_host, self.postgres_port)
+
+    def database_url_for(self, host: str, port: int) -> str:
         return (
             f"postgresql://{self.postgres_user}:{self.postgres_password}"
-            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+            f"@{host}:{port}/{self.postgres_db}"
         )
 
 
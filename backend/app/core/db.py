@@ -0,0 +1,117 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# seconds the replica is behind; 0 when it has replayed everything it received,
+# NULL on a primary (a promoted replica is as fresh as it gets)
+_LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+# replica alias reads are sent to in this context, None reads from the primary
+_read_alias: ContextVar[Optional[str]] = ContextVar("db_read_alias", default=None)
+
+
+class ReplicaHealth:
+    """
+    Per-process replica health, probed lazily: the first caller after
+    REPLICA_HEALTH_INTERVAL runs one lag query while the others keep using
+    the previous verdict.
+    """
+
+    def __init__(self) -> None:
+        # alias -> (checked at, healthy, lag seconds or error)
+        self._state: Dict[str, Tuple[float, bool, object]] = {}
+        self._lock = threading.Lock()
+
+    def healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            checked_at, ok, detail = self._state.get(alias, (float("-inf"), False, None))
+            if now - checked_at < settings.REPLICA_HEALTH_INTERVAL:
+                return ok
+            self._state[alias] = (now, ok, detail)
+        ok, detail = probe(alias)
+        with self._lock:
+            self._state[alias] = (now, ok, detail)
+        return ok
+
+    def pick(self) -> Optional[str]:
+        """A healthy replica at random, None (read from the primary) when there is none."""
+        healthy = [alias for alias in settings.DATABASE_REPLICAS if self.healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+
+def probe(alias: str) -> Tuple[bool, object]:
+    """Returns (healthy, lag seconds) or (False, error) for `alias`."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(_LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError as exc:
+        logger.warning("Replica %s failed its health check: %s", alias, exc)
+        connections[alias].close()
+        return False, exc
+    lag = float(lag or 0)
+    if lag > settings.REPLICA_MAX_LAG_SECONDS:
+        logger.warning("Replica %s is %.1fs behind, reading from the primary", alias, lag)
+        return False, lag
+    return True, lag
+
+
+replica_health = ReplicaHealth()
+
+
+def start_replica_reads(alias: Optional[str]) -> Token:
+    return _read_alias.set(alias)
+
+
+def stop_replica_reads(token: Token) -> None:
+    _read_alias.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Reads in the block go to the primary even inside a replica-routed operation."""
+    token = start_replica_reads(None)
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+class ReplicaRouter:
+    """
+    Sends ORM reads to the replica chosen for the current context (see
+    ReplicaReadExtension), writes and migrations to the primary. Reads inside
+    a transaction stay on the primary, so locking reads and read-modify-write
+    code never see replica data.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
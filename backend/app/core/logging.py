@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Tuple
+
+from django.db.backends.signals import connection_created
+
+
+@dataclass
+class SQLStats:
+    queries: int = 0
+    seconds: float = 0.0
+    # time in statements that take row locks (FOR UPDATE, UPDATE, DELETE),
+    # an upper bound on lock wait: Postgres does not report the wait itself
+    lock_seconds: float = 0.0
+
+
+# every stats object here is charged for each statement run in this context
+_targets: ContextVar[Tuple[SQLStats, ...]] = ContextVar("sql_stats_targets", default=())
+
+_LOCKING_PREFIXES = ("UPDATE", "DELETE")
+_LOCKING_CLAUSES = (" FOR UPDATE", " FOR NO KEY UPDATE", " FOR SHARE", " FOR KEY SHARE")
+
+
+def _takes_locks(sql: str) -> bool:
+    return sql.startswith(_LOCKING_PREFIXES) or any(clause in sql for clause in _LOCKING_CLAUSES)
+
+
+def _execute_wrapper(execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+    targets = _targets.get()
+    if not targets:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        locking = _takes_locks(sql)
+        for stats in targets:
+            stats.queries += 1
+            stats.seconds += elapsed
+            if locking:
+                stats.lock_seconds += elapsed
+
+
+def start_recording(*stats: SQLStats) -> Token:
+    """
+    Charges statements run in this context, including sync_to_async threads and
+    tasks started from it, to `stats`. Replaces any outer recording until
+    stop_recording(token).
+    """
+    return _targets.set(stats)
+
+
+def stop_recording(token: Token) -> None:
+    _targets.reset(token)
+
+
+@contextmanager
+def record_sql(*stats: SQLStats) -> Iterator[None]:
+    token = start_recording(*stats)
+    try:
+        yield
+    finally:
+        stop_recording(token)
+
+
+def _install(sender, connection, **kwargs) -> None:
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def install_sql_instrumentation() -> None:
+    """Adds the wrapper to every new DB connection; it costs one ContextVar read outside record_sql."""
+    connection_created.connect(_install, dispatch_uid="app.core.logging.sql_instrumentation")
@@ -3,4 +3,25 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app_project.settings")
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported once Django is set up, they load models
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+from django.urls import re_path  # noqa: E402
+
+from app.api.v1.schema import schema  # noqa: E402
+from app.api.v1.views import GraphQLSocketConsumer  # noqa: E402
+
+# HTTP stays on Django; websockets on /graphql/ carry GraphQL subscriptions
+application = ProtocolTypeRouter({
+    "http": django_application,
+    "websocket": AllowedHostsOriginValidator(
+        AuthMiddlewareStack(
+            URLRouter([
+                re_path(r"^graphql/$", GraphQLSocketConsumer.as_asgi(schema=schema)),
+            ])
+        )
+    ),
+})
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
     "app.api.v1.catalog.apps.V1CatalogConfig",
     "app.api.v1.orders.apps.V1OrdersConfig",
     "app.api.v1.payments.apps.V1PaymentsConfig",
+    "app.api.v1.fetcher.apps.V1FetcherConfig",
+    "app.api.v1.analytics.apps.V1AnalyticsConfig",
 ]
 # Middleware
 MIDDLEWARE = [
@@ -74,14 +76,46 @@ ASGI_APPLICATION = 'app_project.asgi.application'
 WSGI_APPLICATION = 'app_project.wsgi.application'
 
 # Database
+def _database(url: str) -> dict:
+    if s.db_pool_mode == "pool":
+        # psycopg pool per process, borrowed per request; persistent connections must be off
+        config = dj_database_url.parse(url, conn_max_age=0, ssl_require=False)
+        config.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": s.db_pool_min_size,
+            "max_size": s.db_pool_max_size,
+            "timeout": s.db_pool_timeout,
+        }
+        return config
+
+    config = dj_database_url.parse(url, conn_max_age=60, ssl_require=False)
+    if s.db_pool_mode == "pgbouncer":
+        # transaction pooling: no server-side cursors or prepared statements outlive a transaction
+        config["DISABLE_SERVER_SIDE_CURSORS"] = True
+        config.setdefault("OPTIONS", {})["prepare_threshold"] = None
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.parse(
-        s.database_url,
-        conn_max_age=60,
-        ssl_require=False,
-    )
+    'default': _database(s.database_url),
 }
 
+# Query operations read from these (app.core.db.ReplicaRouter); a client that ran a mutation
+# reads from the primary for REPLICA_STICKY_SECONDS. Replicas lagging over REPLICA_MAX_LAG_SECONDS
+# or failing a health check (at most every REPLICA_HEALTH_INTERVAL per process) are skipped.
+DATABASE_REPLICAS = []
+for _index, _replica in enumerate(s.postgres_replica_hosts):
+    _host, _, _port = _replica.partition(":")
+    DATABASES[f"replica_{_index}"] = {
+        **_database(s.database_url_for(_host, int(_port or s.postgres_port))),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{_index}")
+
+DATABASE_ROUTERS = ["app.core.db.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = s.replica_sticky_seconds
+REPLICA_MAX_LAG_SECONDS = s.replica_max_lag_seconds
+REPLICA_HEALTH_INTERVAL = s.replica_health_interval
+
 # Static
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'static'
@@ -97,6 +131,134 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "analytics-roll-up-sales": {
+        "task": "analytics.roll_up_sales",
+        "schedule": 30.0,
+    },
+    "catalog-sync-stock": {
+        "task": "catalog.sync_stock",
+        "schedule": 1.0,
+    },
+    "catalog-reconcile-stock": {
+        "task": "catalog.reconcile_stock",
+        "schedule": 300.0,
+    },
+    "common-relay-outbox": {
+        "task": "common.relay_outbox",
+        "schedule": 0.5,
+    },
+    "common-prune-idempotency-keys": {
+        "task": "common.prune_idempotency_keys",
+        "schedule": 3600.0,
+    },
+    "orders-expire-reservations": {
+        "task": "orders.expire_reservations",
+        "schedule": 5.0,
+    },
+    "orders-adapt-admission": {
+        "task": "orders.adapt_admission",
+        "schedule": 5.0,
+    },
+    "orders-check-summaries": {
+        "task": "orders.check_summaries",
+        "schedule": 300.0,
+    },
+    "payments-process-webhooks": {
+        "task": "payments.process_webhooks",
+        "schedule": 0.5,
+    },
+}
+
+# Stock reservation ("redis" keeps hot counters in Redis, "db" locks Stock rows; only "db" can spread a hot
+# SKU over StockShard rows with manage.py shard_stock, the redis counter is one key per product)
+STOCK_BACKEND = s.stock_backend
+STOCK_SYNC_BATCH_SIZE = s.stock_sync_batch_size
+
+# Outbox relay (OutboxEvent -> Redis Stream per topic)
+OUTBOX_BATCH_SIZE = s.outbox_batch_size
+OUTBOX_MAX_BATCHES_PER_RUN = s.outbox_max_batches_per_run
+OUTBOX_STREAM_PREFIX = s.outbox_stream_prefix
+OUTBOX_STREAM_MAXLEN = s.outbox_stream_maxlen
+
+# Idempotent mutations (Idempotency-Key header)
+IDEMPOTENCY_TTL_SECONDS = s.idempotency_ttl_seconds
+IDEMPOTENCY_INFLIGHT_SECONDS = s.idempotency_inflight_seconds
+
+# GraphQL rate limits, token buckets per user and per IP (IP gets x RATE_LIMIT_IP_MULTIPLIER)
+RATE_LIMIT_ENABLED = s.rate_limit_enabled
+RATE_LIMIT_IP_MULTIPLIER = s.rate_limit_ip_multiplier
+RATE_LIMITS = {
+    "query": {"rate": 20, "burst": 60},
+    "mutation": {"rate": 5, "burst": 20},
+    "createOrder": {"rate": 1, "burst": 3},
+    # own bucket, so queued clients polling their position do not starve their other queries
+    "waitingRoomStatus": {"rate": 2, "burst": 10},
+    # charged when a subscription starts, not per push
+    "subscription": {"rate": 1, "burst": 20},
+}
+
+# Catalog read-through cache: in-process LRU (LOCAL_TTL) -> Redis (TTL) -> Postgres
+CATALOG_CACHE_TTL = s.catalog_cache_ttl
+CATALOG_CACHE_LOCAL_TTL = s.catalog_cache_local_ttl
+CATALOG_CACHE_LOCAL_SIZE = s.catalog_cache_local_size
+CATALOG_CACHE_LOCK_SECONDS = s.catalog_cache_lock_seconds
+
+# Hard cap for limit/first arguments on list and connection fields
+PAGINATION_MAX_PAGE_SIZE = s.pagination_max_page_size
+
+# GraphQL cost analysis: operations over QUERY_MAX_COST or QUERY_MAX_DEPTH are rejected before execution.
+# Fields cost 1 (objects) or 0 (scalars) unless weighted here; lists multiply by limit/first.
+QUERY_MAX_COST = s.query_max_cost
+QUERY_MAX_DEPTH = s.query_max_depth
+QUERY_COST_DEFAULT_LIST_SIZE = s.query_cost_default_list_size
+QUERY_COST_WEIGHTS = {
+    "Mutation.createOrder": 10,
+    "Mutation.transitionOrders": 10,
+    "Mutation.placeHold": 5,
+}
+
+# Automatic persisted queries: documents registered by sha256 hash live in Redis for APQ_TTL_SECONDS
+# (refreshed on use); parsed and validated ASTs are kept per process in an LRU of this size.
+APQ_TTL_SECONDS = s.apq_ttl_seconds
+GRAPHQL_DOCUMENT_CACHE_SIZE = s.graphql_document_cache_size
+
+# GraphQL tracing: share of operations timed per resolver with SQL counts (0 disables, 1 traces all),
+# exported at /metrics/; traced operations slower than TRACING_LOG_MIN_MS are also logged as JSON.
+TRACING_SAMPLE_RATE = s.tracing_sample_rate
+TRACING_LOG_MIN_MS = s.tracing_log_min_ms
+
+# Stock holds (Reservation rows), released by the sweeper RESERVATION_TTL_SECONDS after placement
+RESERVATION_TTL_SECONDS = s.reservation_ttl_seconds
+RESERVATION_SWEEP_BATCH_SIZE = s.reservation_sweep_batch_size
+RESERVATION_SWEEP_MAX_BATCHES = s.reservation_sweep_max_batches
+
+# Orders moved per transaction by bulk status transitions
+ORDER_TRANSITION_BATCH_SIZE = s.order_transition_batch_size
+
+# myOrders reads OrderSummary rows projected from the outbox; the newest ORDER_SUMMARY_CACHE_SIZE per user
+# are cached in Redis. The periodic check compares orders of the last ORDER_SUMMARY_CHECK_SECONDS with them.
+ORDER_SUMMARY_CACHE_SIZE = s.order_summary_cache_size
+ORDER_SUMMARY_CACHE_TTL = s.order_summary_cache_ttl
+ORDER_SUMMARY_CHECK_SECONDS = s.order_summary_check_seconds
+
+# Sales rollups (SalesMinute / SalesHour, read by the analytics queries): each run recomputes the minutes of
+# orders written since its watermark, rescanning ANALYTICS_ROLLUP_OVERLAP_SECONDS before it for late commits.
+# A sales series returns at most ANALYTICS_MAX_POINTS buckets.
+ANALYTICS_ROLLUP_OVERLAP_SECONDS = s.analytics_rollup_overlap_seconds
+ANALYTICS_MAX_POINTS = s.analytics_max_points
+
+# Drop waiting rooms (Redis FIFO in front of createOrder, opened with manage.py waiting_room):
+# an admitted token buys one order within WAITING_ROOM_ADMISSION_SECONDS; adaptive rooms cut
+# their rate by WAITING_ROOM_BACKOFF while mean order latency is over the target.
+WAITING_ROOM_ADMISSION_SECONDS = s.waiting_room_admission_seconds
+WAITING_ROOM_TARGET_LATENCY_MS = s.waiting_room_target_latency_ms
+WAITING_ROOM_BACKOFF = s.waiting_room_backoff
+
+# GraphQL subscriptions (websockets on /graphql/, app_project.asgi): the outbox relay publishes stock levels
+# and order statuses to Redis pub/sub, each ASGI worker fans them out to its subscribers. Stock pushes
+# per SKU are coalesced to at most LIVE_STOCK_MAX_PUSHES_PER_SECOND, the latest level wins.
+LIVE_STOCK_MAX_PUSHES_PER_SECOND = s.live_stock_max_pushes_per_second
 
 # Security
 if not DEBUG:
@@ -136,9 +298,17 @@ REST_FRAMEWORK = {
 }
 
 # Webhooks / Go fetcher
-STRIPE_WEBHOOK_SECRET = getattr(s, "stripe_webhook_secret", "dev_stripe_webhook_secret")
-FETCHER_QUEUE_KEY = getattr(s, "fetcher_queue_key", "fetcher:queue")
-FETCHER_RESULT_PREFIX = getattr(s, "fetcher_result_prefix", "fetcher:result:")
+STRIPE_WEBHOOK_SECRET = s.stripe_webhook_secret
+STRIPE_WEBHOOK_TOLERANCE_SECONDS = s.stripe_webhook_tolerance_seconds
+# Redis dedup window (provider retries span ~3 days) and batch sizes of the processing task
+WEBHOOK_DEDUP_DAYS = s.webhook_dedup_days
+WEBHOOK_BATCH_SIZE = s.webhook_batch_size
+WEBHOOK_MAX_BATCHES_PER_RUN = s.webhook_max_batches_per_run
+FETCHER_QUEUE_KEY = s.fetcher_queue_key
+FETCHER_RESULT_PREFIX = s.fetcher_result_prefix
+FETCHER_ENQUEUE_CHUNK = s.fetcher_enqueue_chunk
+FETCHER_RESULT_TTL = s.fetcher_result_ttl
+FETCHER_TIMEOUT_SECONDS = s.fetcher_timeout_seconds
 
 # Logging
 LOGGING = {
@@ -169,6 +339,13 @@ LOGGING = {
             "formatter": "colored" if DEBUG else "json",
             "level": "DEBUG",
         },
+        # traced operations are always emitted as JSON, whatever DEBUG says
+        "json_console": {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": "json",
+            "level": "DEBUG",
+        },
     },
     "root": {
         "handlers": ["console"],
@@ -180,6 +357,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        "app.api.v1.common.tracing": {
+            "handlers": ["json_console"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 
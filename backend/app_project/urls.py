@@ -1,11 +1,12 @@
 from django.contrib import admin
-from django.urls import path
-
-from strawberry.django.views import GraphQLView
+from django.urls import include, path
 
 from app.api.v1.schema import schema
+from app.api.v1.views import GraphQLView, metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("graphql/", GraphQLView.as_view(schema=schema)),
+    path("api/v1/payments/", include("app.api.v1.payments.urls")),
+    path("metrics/", metrics_view),
 ]
@@ -14,7 +14,14 @@ logger.addHandler(handler)
 
 app = Celery("backend")
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks(["app.api.v1"])
+app.autodiscover_tasks([
+    "app.api.v1.analytics",
+    "app.api.v1.catalog",
+    "app.api.v1.common",
+    "app.api.v1.orders",
+    "app.api.v1.payments",
+    "app.api.v1.fetcher",
+])
 
 app.conf.update(
     worker_hijack_root_logger=False,
@@ -0,0 +1,305 @@
+// Command go_fetcher drains the fetch queue filled by backend/app/api/v1/fetcher/client.py.
+//
+// Jobs are JSON objects on FETCHER_QUEUE_KEY. A dispatcher pops them in batches
+// (BLPOP for the first, LPOP COUNT for the rest) and hands them to a fixed pool of
+// FETCHER_CONCURRENCY goroutines; when the pool is busy the dispatcher blocks, so
+// the backlog stays in Redis instead of memory. Results are pushed to each job's
+// reply_to list by a single writer that pipelines RPUSH/EXPIRE in batches.
+//
+// With -fake-server the binary serves a local HTTP endpoint with fixed latency
+// instead, used as the target of `manage.py bench_fetcher`.
+package main
+
+import (
+	"context"
+	"encoding/json"
+	"errors"
+	"flag"
+	"fmt"
+	"io"
+	"log"
+	"net/http"
+	"os"
+	"os/signal"
+	"strconv"
+	"strings"
+	"sync"
+	"syscall"
+	"time"
+
+	"github.com/redis/go-redis/v9"
+)
+
+type job struct {
+	ID         string  `json:"id"`
+	URL        string  `json:"url"`
+	Method     string  `json:"method"`
+	TimeoutMs  int     `json:"timeout_ms"`
+	MaxBody    int     `json:"max_body"`
+	ReplyTo    string  `json:"reply_to"`
+	ReplyTTL   int     `json:"reply_ttl"`
+	EnqueuedAt float64 `json:"enqueued_at"`
+}
+
+type result struct {
+	ID        string  `json:"id"`
+	Status    int     `json:"status"`
+	Bytes     int64   `json:"bytes"`
+	QueuedMs  float64 `json:"queued_ms"`
+	ElapsedMs float64 `json:"elapsed_ms"`
+	Error     string  `json:"error,omitempty"`
+	Body      string  `json:"body,omitempty"`
+
+	replyTo  string
+	replyTTL time.Duration
+}
+
+type config struct {
+	redisURL    string
+	queueKey    string
+	concurrency int
+	popBatch    int
+	flushEvery  time.Duration
+	flushSize   int
+}
+
+func env(name, fallback string) string {
+	if value := os.Getenv(name); value != "" {
+		return value
+	}
+	return fallback
+}
+
+func envInt(name string, fallback int) int {
+	value, err := strconv.Atoi(env(name, strconv.Itoa(fallback)))
+	if err != nil || value <= 0 {
+		log.Fatalf("%s must be a positive integer", name)
+	}
+	return value
+}
+
+func loadConfig() config {
+	return config{
+		redisURL:    env("REDIS_URL", "redis://localhost:6379/0"),
+		queueKey:    env("FETCHER_QUEUE_KEY", "fetcher:queue"),
+		concurrency: envInt("FETCHER_CONCURRENCY", 256),
+		popBatch:    envInt("FETCHER_POP_BATCH", 128),
+		flushEvery:  time.Duration(envInt("FETCHER_FLUSH_MS", 2)) * time.Millisecond,
+		flushSize:   envInt("FETCHER_FLUSH_SIZE", 256),
+	}
+}
+
+// dispatch pops jobs until ctx is canceled, then closes jobs.
+func dispatch(ctx context.Context, rdb *redis.Client, cfg config, jobs chan<- job) {
+	defer close(jobs)
+	for ctx.Err() == nil {
+		popped, err := rdb.BLPop(ctx, time.Second, cfg.queueKey).Result()
+		if errors.Is(err, redis.Nil) || ctx.Err() != nil {
+			continue
+		}
+		if err != nil {
+			log.Printf("blpop: %v", err)
+			time.Sleep(time.Second)
+			continue
+		}
+		raw := []string{popped[1]}
+		if cfg.popBatch > 1 {
+			more, err := rdb.LPopCount(ctx, cfg.queueKey, cfg.popBatch-1).Result()
+			if err != nil && !errors.Is(err, redis.Nil) {
+				log.Printf("lpop: %v", err)
+			}
+			raw = append(raw, more...)
+		}
+		for _, item := range raw {
+			var j job
+			if err := json.Unmarshal([]byte(item), &j); err != nil || j.ID == "" || j.ReplyTo == "" {
+				log.Printf("dropping malformed job: %.200s", item)
+				continue
+			}
+			// popped jobs are always handed over, shutdown waits for them
+			jobs <- j
+		}
+	}
+}
+
+// fetch has a named result so the deferred timing lands in what it returns.
+func fetch(client *http.Client, j job) (res result) {
+	res = result{ID: j.ID, replyTo: j.ReplyTo, replyTTL: time.Duration(j.ReplyTTL) * time.Second}
+	started := time.Now()
+	if j.EnqueuedAt > 0 {
+		res.QueuedMs = float64(started.UnixMicro())/1000 - j.EnqueuedAt*1000
+	}
+	defer func() { res.ElapsedMs = float64(time.Since(started).Microseconds()) / 1000 }()
+
+	timeout := time.Duration(j.TimeoutMs) * time.Millisecond
+	if timeout <= 0 {
+		timeout = 10 * time.Second
+	}
+	ctx, cancel := context.WithTimeout(context.Background(), timeout)
+	defer cancel()
+
+	method := strings.ToUpper(j.Method)
+	if method == "" {
+		method = http.MethodGet
+	}
+	req, err := http.NewRequestWithContext(ctx, method, j.URL, nil)
+	if err != nil {
+		res.Error = err.Error()
+		return res
+	}
+	resp, err := client.Do(req)
+	if err != nil {
+		res.Error = err.Error()
+		return res
+	}
+	defer resp.Body.Close()
+	res.Status = resp.StatusCode
+
+	if j.MaxBody > 0 {
+		body, err := io.ReadAll(io.LimitReader(resp.Body, int64(j.MaxBody)))
+		res.Body = string(body)
+		res.Bytes = int64(len(body))
+		if err != nil {
+			res.Error = err.Error()
+			return res
+		}
+	}
+	// drain the rest so the connection goes back to the pool
+	rest, err := io.Copy(io.Discard, resp.Body)
+	res.Bytes += rest
+	if err != nil {
+		res.Error = err.Error()
+	}
+	return res
+}
+
+// writeResults pipelines result pushes until results is closed.
+func writeResults(rdb *redis.Client, cfg config, results <-chan result) {
+	pending := make([]result, 0, cfg.flushSize)
+	flush := func() {
+		if len(pending) == 0 {
+			return
+		}
+		ctx, cancel := context.WithTimeout(context.Background(), 5*time.Second)
+		defer cancel()
+		pipe := rdb.Pipeline()
+		ttls := make(map[string]time.Duration)
+		for _, res := range pending {
+			payload, _ := json.Marshal(res)
+			pipe.RPush(ctx, res.replyTo, payload)
+			ttls[res.replyTo] = res.replyTTL
+		}
+		for key, ttl := range ttls {
+			if ttl > 0 {
+				pipe.Expire(ctx, key, ttl)
+			}
+		}
+		if _, err := pipe.Exec(ctx); err != nil {
+			log.Printf("push %d results: %v", len(pending), err)
+		}
+		pending = pending[:0]
+	}
+
+	ticker := time.NewTicker(cfg.flushEvery)
+	defer ticker.Stop()
+	for {
+		select {
+		case res, ok := <-results:
+			if !ok {
+				flush()
+				return
+			}
+			pending = append(pending, res)
+			if len(pending) >= cfg.flushSize {
+				flush()
+			}
+		case <-ticker.C:
+			flush()
+		}
+	}
+}
+
+func runWorker(ctx context.Context, cfg config) error {
+	opts, err := redis.ParseURL(cfg.redisURL)
+	if err != nil {
+		return fmt.Errorf("redis url: %w", err)
+	}
+	// blocking pops hold a connection each, leave room for the writer
+	opts.PoolSize = 8
+	rdb := redis.NewClient(opts)
+	defer rdb.Close()
+	if err := rdb.Ping(ctx).Err(); err != nil {
+		return fmt.Errorf("redis ping: %w", err)
+	}
+
+	client := &http.Client{Transport: &http.Transport{
+		MaxIdleConns:        cfg.concurrency,
+		MaxIdleConnsPerHost: cfg.concurrency,
+		IdleConnTimeout:     90 * time.Second,
+	}}
+
+	jobs := make(chan job, cfg.concurrency)
+	results := make(chan result, cfg.concurrency)
+
+	var pool sync.WaitGroup
+	for i := 0; i < cfg.concurrency; i++ {
+		pool.Add(1)
+		go func() {
+			defer pool.Done()
+			for j := range jobs {
+				results <- fetch(client, j)
+			}
+		}()
+	}
+
+	written := make(chan struct{})
+	go func() {
+		writeResults(rdb, cfg, results)
+		close(written)
+	}()
+
+	log.Printf("fetching from %s with %d workers", cfg.queueKey, cfg.concurrency)
+	dispatch(ctx, rdb, cfg, jobs)
+	pool.Wait()
+	close(results)
+	<-written
+	return nil
+}
+
+func runFakeServer(ctx context.Context, addr string, latency time.Duration, size int) error {
+	body := []byte(strings.Repeat("x", size))
+	server := &http.Server{Addr: addr, Handler: http.HandlerFunc(func(w http.ResponseWriter, _ *http.Request) {
+		time.Sleep(latency)
+		w.Header().Set("Content-Length", strconv.Itoa(len(body)))
+		_, _ = w.Write(body)
+	})}
+	go func() {
+		<-ctx.Done()
+		_ = server.Shutdown(context.Background())
+	}()
+	log.Printf("fake server on %s, latency %s, %d byte bodies", addr, latency, size)
+	if err := server.ListenAndServe(); !errors.Is(err, http.ErrServerClosed) {
+		return err
+	}
+	return nil
+}
+
+func main() {
+	fakeAddr := flag.String("fake-server", "", "serve a fake HTTP target on this address instead of fetching")
+	fakeLatency := flag.Duration("fake-latency", 20*time.Millisecond, "fake server response delay")
+	fakeSize := flag.Int("fake-size", 1024, "fake server body size in bytes")
+	flag.Parse()
+
+	ctx, stop := signal.NotifyContext(context.Background(), syscall.SIGINT, syscall.SIGTERM)
+	defer stop()
+
+	var err error
+	if *fakeAddr != "" {
+		err = runFakeServer(ctx, *fakeAddr, *fakeLatency, *fakeSize)
+	} else {
+		err = runWorker(ctx, loadConfig())
+	}
+	if err != nil {
+		log.Fatal(err)
+	}
+}